@@ -0,0 +1,64 @@
+"""add hot path indexes
+
+Revision ID: 3c9d2f4a7b18
+Revises: 181f440078ea
+Create Date: 2026-10-19 09:12:27.104311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9d2f4a7b18'
+down_revision = '181f440078ea'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('lesson_instances', schema=None) as batch_op:
+        batch_op.create_index('ix_lesson_instances_lesson_id_start', ['lesson_id', 'start_datetime'], unique=False)
+
+    with op.batch_alter_table('lessons', schema=None) as batch_op:
+        batch_op.create_index('ix_lessons_status_start', ['status', 'start_datetime'], unique=False)
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_conversation_id_sent_at', ['conversation_id', 'sent_at'], unique=False)
+
+    with op.batch_alter_table('conversation_participants', schema=None) as batch_op:
+        batch_op.create_index('ix_conversation_participants_user_id_conversation_id', ['user_id', 'conversation_id'], unique=False)
+
+    with op.batch_alter_table('calendar_blocks', schema=None) as batch_op:
+        batch_op.create_index('ix_calendar_blocks_user_id_start', ['user_id', 'start_datetime'], unique=False)
+
+    # (player_id, lesson_instance_id) and (coach_id, lesson_id) are already
+    # covered by their unique constraints; index the other side of each link.
+    with op.batch_alter_table('presences', schema=None) as batch_op:
+        batch_op.create_index('ix_presences_lesson_instance_id', ['lesson_instance_id'], unique=False)
+
+    with op.batch_alter_table('coach_in_lesson', schema=None) as batch_op:
+        batch_op.create_index('ix_coach_in_lesson_lesson_id', ['lesson_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('coach_in_lesson', schema=None) as batch_op:
+        batch_op.drop_index('ix_coach_in_lesson_lesson_id')
+
+    with op.batch_alter_table('presences', schema=None) as batch_op:
+        batch_op.drop_index('ix_presences_lesson_instance_id')
+
+    with op.batch_alter_table('calendar_blocks', schema=None) as batch_op:
+        batch_op.drop_index('ix_calendar_blocks_user_id_start')
+
+    with op.batch_alter_table('conversation_participants', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversation_participants_user_id_conversation_id')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_conversation_id_sent_at')
+
+    with op.batch_alter_table('lessons', schema=None) as batch_op:
+        batch_op.drop_index('ix_lessons_status_start')
+
+    with op.batch_alter_table('lesson_instances', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_instances_lesson_id_start')
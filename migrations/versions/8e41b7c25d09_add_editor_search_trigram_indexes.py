@@ -0,0 +1,52 @@
+"""add editor search trigram indexes
+
+Revision ID: 8e41b7c25d09
+Revises: 3c9d2f4a7b18
+Create Date: 2026-10-19 11:40:03.518220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e41b7c25d09'
+down_revision = '3c9d2f4a7b18'
+branch_labels = None
+depends_on = None
+
+# (index, table, column) for the columns the editor searches on.
+TRIGRAM_INDEXES = [
+    ('ix_users_name_trgm', 'users', 'name'),
+    ('ix_users_username_trgm', 'users', 'username'),
+    ('ix_clubs_name_trgm', 'clubs', 'name'),
+    ('ix_lessons_title_trgm', 'lessons', 'title'),
+    ('ix_messages_text_trgm', 'messages', 'text'),
+    ('ix_coach_levels_label_trgm', 'coach_levels', 'label'),
+]
+
+
+def upgrade():
+    # pg_trgm GIN indexes only exist on Postgres; elsewhere the editor's
+    # ILIKE search simply runs unindexed.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for name, table, _ in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -3,13 +3,51 @@ from tempfile import mkdtemp
 
 from flask import Flask
 from flask_cors import CORS
-from flask_assets import Bundle, Environment
-from flask_login import LoginManager
-from flask_session import Session
 from flask_jwt_extended import JWTManager
 from .auth import register_jwt_handlers
 
-from . import cli, mail, modules, sql_db
+from . import cli, compression, jobs, mail, modules, sql_db, storage
+from .tools import occupancy_tools, sync_tools
+from .tools.http_cache_tools import NO_STORE
+
+# "api" serves the JWT app API only, "admin" the session-based editor
+# (with its assets, sessions and login), "full" both.
+PROFILES = ("api", "admin", "full")
+
+
+def _init_admin(app):
+    # Imported here so API-only processes never load pyScss and friends.
+    from flask_assets import Bundle, Environment
+    from flask_login import LoginManager
+    from flask_session import Session
+
+    app.config["SESSION_FILE_DIR"] = mkdtemp()
+    Session(app)
+
+    # Assets
+    assets = Environment(app)
+    scss_bundle = Bundle(
+        "styles/scss/main.scss",
+        filters="pyscss",
+        depends="styles/scss/*.scss",
+        output="styles/styles.css",
+    )
+    assets.register("scss", scss_bundle)
+
+    scss_bundle_backend = Bundle(
+        "styles/scss/main_backend.scss",
+        filters="pyscss",
+        depends="styles/scss/*.scss",
+        output="styles/styles_backend.css",
+    )
+    assets.register("scss_backend", scss_bundle_backend)
+
+    # Login manager
+    login_manager = LoginManager(app)
+    from .auth import setup_login_manager
+
+    setup_login_manager(login_manager)
+    app.login_manager = login_manager
 
 
 def create_app(test_config=None):
@@ -37,10 +75,19 @@ def create_app(test_config=None):
 
         app.config.from_object(DevConfig)
 
+    profile = app.config.get("APP_PROFILE", "full")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown APP_PROFILE: {profile}")
+    app.config["APP_PROFILE"] = profile
+
     # Ensure responses aren't cached
     @app.after_request
     def after_request(response):
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+        # Endpoints with their own policy (tools.http_cache_tools.cache_policy
+        # or an explicit Cache-Control) keep it; everything else is no-store.
+        if "Cache-Control" in response.headers:
+            return response
+        response.headers["Cache-Control"] = NO_STORE
         response.headers["Expires"] = 0
         response.headers["Pragma"] = "no-cache"
         return response
@@ -48,8 +95,8 @@ def create_app(test_config=None):
     with app.app_context():
         modules.startup.add_to_session()
 
-    app.config["SESSION_FILE_DIR"] = mkdtemp()
-    Session(app)
+    if profile != "api":
+        _init_admin(app)
 
     jwt = JWTManager(app)
     register_jwt_handlers(jwt)
@@ -62,34 +109,14 @@ def create_app(test_config=None):
     except OSError:
         pass
 
-    modules.register_blueprints(app)
-
-    # Assets
-    assets = Environment(app)
-    scss_bundle = Bundle(
-        "styles/scss/main.scss",
-        filters="pyscss",
-        depends="styles/scss/*.scss",
-        output="styles/styles.css",
-    )
-    assets.register("scss", scss_bundle)
-
-    scss_bundle_backend = Bundle(
-        "styles/scss/main_backend.scss",
-        filters="pyscss",
-        depends="styles/scss/*.scss",
-        output="styles/styles_backend.css",
-    )
-    assets.register("scss_backend", scss_bundle_backend)
-
-    # Login manager
-    login_manager = LoginManager(app)
-    from .auth import setup_login_manager
-
-    setup_login_manager(login_manager)
-    app.login_manager = login_manager
+    modules.register_blueprints(app, profile)
 
     sql_db.init_db(app)
+    occupancy_tools.register_listeners()
+    sync_tools.register_listeners()
+    storage.init_storage(app)
+    jobs.init_jobs(app)
+    compression.init_compression(app)
     cli.register_cli(app)
 
     @app.teardown_appcontext
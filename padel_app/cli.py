@@ -87,3 +87,194 @@ def register_cli(app):
         db.session.commit()
 
         click.echo(f"✅ Reset {len(table_names)} table(s): {', '.join(table_names)}")
+
+    @app.cli.command("db-explain")
+    @click.option("--coach-id", type=int, help="Coach to plan against (default: first).")
+    @click.option("--user-id", type=int, help="User to plan against (default: coach's user).")
+    @click.option(
+        "--min-rows",
+        default=10000,
+        show_default=True,
+        help="Tables with at least this many rows must not be sequentially scanned.",
+    )
+    def db_explain(coach_id, user_id, min_rows):
+        """EXPLAIN the calendar, dashboard and inbox queries; fail on seq scans."""
+        from padel_app.models import Coach
+        from padel_app.tools.explain_tools import check_query_plans
+
+        if coach_id is None:
+            coach = Coach.query.order_by(Coach.id).first()
+            if not coach:
+                click.echo("ℹ️  No coaches found, nothing to plan.")
+                return
+            coach_id = coach.id
+            user_id = user_id or coach.user_id
+
+        plans, violations = check_query_plans(
+            coach_id=coach_id, user_id=user_id or 0, min_rows=min_rows
+        )
+
+        for name, tables in plans.items():
+            scans = ", ".join(tables) if tables else "index only"
+            click.echo(f"{name}: {scans}")
+
+        if violations:
+            for v in violations:
+                click.echo(
+                    f"❌ {v['query']} scans {v['table']} ({v['rows']} rows)"
+                )
+            raise SystemExit(1)
+
+        click.echo("✅ No sequential scans over large tables.")
+
+    @app.cli.command("bench")
+    @click.option("--clubs", default=2, show_default=True)
+    @click.option("--coaches", default=10, show_default=True)
+    @click.option("--players", default=200, show_default=True)
+    @click.option("--lessons-per-coach", default=8, show_default=True)
+    @click.option("--weeks", default=12, show_default=True)
+    @click.option("--messages", default=20, show_default=True, help="Messages per conversation.")
+    @click.option("--seed", default=42, show_default=True, help="RNG seed for the dataset.")
+    @click.option("--iterations", default=20, show_default=True)
+    @click.option("--output", type=click.Path(dir_okay=False), help="Write the JSON report here.")
+    @click.option(
+        "--yes",
+        is_flag=True,
+        help="Confirm writing (and then deleting) synthetic data (required).",
+    )
+    @click.option(
+        "--allow-any-database",
+        is_flag=True,
+        help="Also run against databases whose name doesn't mention test or bench.",
+    )
+    def bench(
+        clubs, coaches, players, lessons_per_coach, weeks, messages, seed, iterations,
+        output, yes, allow_any_database,
+    ):
+        """Generate synthetic data and benchmark the hot app endpoints (DEV ONLY)."""
+        import json
+
+        from padel_app.tools.bench_tools import (
+            BenchScale,
+            benchmark_report,
+            drop_dataset,
+            generate_dataset,
+            is_scratch_database,
+            run_benchmark,
+        )
+
+        if not yes:
+            click.echo("❌ Aborted. Use --yes to confirm.")
+            return
+
+        url = db.engine.url
+        if not (allow_any_database or is_scratch_database(url)):
+            click.echo(
+                f"❌ Refusing to write to {url.render_as_string(hide_password=True)}: "
+                "not a test database. Use --allow-any-database to override."
+            )
+            raise SystemExit(1)
+
+        scale = BenchScale(
+            clubs=clubs,
+            coaches=coaches,
+            players=players,
+            lessons_per_coach=lessons_per_coach,
+            weeks=weeks,
+            messages_per_conversation=messages,
+            seed=seed,
+        )
+
+        dataset = None
+        try:
+            click.echo("ℹ️  Generating dataset…")
+            dataset = generate_dataset(scale)
+            target = dataset["coaches"][0]
+
+            click.echo(f"ℹ️  Running {iterations} iteration(s) per scenario…")
+            results = run_benchmark(
+                app,
+                coach_id=target["coachId"],
+                user_id=target["userId"],
+                iterations=iterations,
+            )
+        finally:
+            # generate_dataset commits once at the end, so if it fails the
+            # rollback is all the cleanup there is.
+            db.session.rollback()
+            if dataset is not None:
+                drop_dataset(dataset)
+                click.echo("ℹ️  Removed the synthetic dataset.")
+        report = benchmark_report(scale, dataset, results, iterations=iterations)
+
+        for name, r in results.items():
+            click.echo(
+                f"{name}: p50 {r['p50Ms']}ms  p95 {r['p95Ms']}ms  "
+                f"{r['queries']} queries  peak {r['peakKib']} KiB"
+            )
+
+        if output:
+            with open(output, "w") as f:
+                json.dump(report, f, indent=2)
+            click.echo(f"✅ Report written to {output}")
+        else:
+            click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("worker")
+    @click.option("--once", is_flag=True, help="Run the jobs that are due, then exit.")
+    @click.option("--batch", default=10, show_default=True, help="Jobs claimed per poll.")
+    @click.option("--poll-interval", default=2.0, show_default=True, help="Seconds between polls.")
+    def worker(once, batch, poll_interval):
+        """Run queued background jobs (emails, image derivatives)."""
+        from padel_app import jobs
+
+        click.echo(f"👷 Worker {jobs.worker_id()} started")
+        try:
+            processed = jobs.work(batch=batch, poll_interval=poll_interval, once=once)
+        except KeyboardInterrupt:
+            click.echo("⚠️  Worker stopped.")
+            return
+        click.echo(f"✅ Ran {processed} job(s).")
+
+    @app.cli.command("bench-startup")
+    @click.option(
+        "--profile",
+        "profiles",
+        multiple=True,
+        type=click.Choice(["api", "admin", "full"]),
+        help="Profile(s) to measure. Defaults to all.",
+    )
+    @click.option("--runs", default=5, show_default=True, help="Fresh processes per profile.")
+    def bench_startup(profiles, runs):
+        """Measure import, create_app and first-request time per app profile."""
+        from padel_app.tools.bench_tools import startup_benchmark
+
+        for profile in profiles or ("api", "admin", "full"):
+            r = startup_benchmark(profile, runs=runs)
+            click.echo(
+                f"{profile}: import {r['importMs']}ms  create_app {r['createAppMs']}ms  "
+                f"first request {r['firstRequestMs']}ms  total {r['totalMs']}ms  "
+                f"{r['modules']} modules"
+            )
+
+    @app.cli.command("rebuild-occupancy")
+    def rebuild_occupancy():
+        """Rebuild the open-seat index (class_occupancy) from lessons and instances."""
+        from padel_app.tools.occupancy_tools import rebuild
+
+        rows = rebuild()
+        db.session.commit()
+        click.echo(f"✅ Indexed {rows} lesson/instance row(s).")
+
+    @app.cli.command("prune-changelog")
+    @click.option("--days", type=int, help="Keep this many days. Defaults to SYNC_RETENTION_DAYS.")
+    def prune_changelog(days):
+        """Delete sync changelog rows older than the retention window."""
+        from datetime import datetime, timedelta
+
+        from padel_app.tools.sync_tools import prune
+
+        days = app.config.get("SYNC_RETENTION_DAYS", 30) if days is None else days
+        removed = prune(datetime.utcnow() - timedelta(days=days))
+        db.session.commit()
+        click.echo(f"✅ Pruned {removed} changelog row(s) older than {days} day(s).")
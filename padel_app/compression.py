@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: pip install padel_app[brotli]
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "text/calendar",
+    "text/css",
+    "text/csv",
+    "text/event-stream",
+    "text/html",
+    "text/plain",
+)
+
+
+def encodings():
+    """Supported encodings, in order of preference."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def etag_variants(etag):
+    """The ETags a response with `etag` may carry once compressed."""
+    return [etag] + [f"{etag}-{encoding}" for encoding in ("br", "gzip")]
+
+
+class BodyCache:
+    """Thread-safe LRU of response bodies, bounded by total bytes."""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# Compressed bodies of ETagged (i.e. repeatedly fetched) responses, keyed
+# on (digest of the uncompressed body, encoding). The digest rather than
+# the ETag: cache_policy ETags hash a version, not the body, so keying on
+# them would serve old bytes whenever a version misses a change.
+body_cache = BodyCache()
+
+
+def compress(data, encoding, level):
+    if encoding == "br":
+        return brotli.compress(data, quality=level["br"])
+    return gzip.compress(data, compresslevel=level["gzip"], mtime=0)
+
+
+def compress_stream(chunks, encoding, level):
+    """
+    Compress an iterable of chunks incrementally, flushing after each one
+    so streamed events reach the client as they are produced.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level["br"])
+
+        def process(chunk):
+            return compressor.process(chunk) + compressor.flush()
+
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(level["gzip"], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+        def process(chunk):
+            return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        finish = compressor.flush
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield process(chunk)
+        yield finish()
+    finally:
+        # Lets generator views run their cleanup when the client goes away.
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def _choose_encoding():
+    return request.accept_encodings.best_match(encodings())
+
+
+def _compressible(response):
+    return (
+        request.method != "HEAD"
+        and 200 <= response.status_code < 300
+        and response.status_code != 204
+        and "Content-Encoding" not in response.headers
+        and not response.direct_passthrough
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+    )
+
+
+def _suffix_etag(response, encoding):
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+    return etag, weak
+
+
+def compress_response(response, app):
+    """after_request hook: gzip/brotli the body when the client accepts it."""
+    if not app.config.get("COMPRESS_ENABLED", True) or not _compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    level = {
+        "gzip": app.config.get("COMPRESS_GZIP_LEVEL", 6),
+        "br": app.config.get("COMPRESS_BR_QUALITY", 5),
+    }
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+
+    if response.is_streamed and response.content_length is None:
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop("Content-Length", None)
+        response.headers["Content-Encoding"] = encoding
+        _suffix_etag(response, encoding)
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    key = None
+    if response.get_etag()[0]:
+        key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+    body = body_cache.get(key) if key else None
+    if body is None:
+        body = compress(data, encoding, level)
+        if len(body) >= len(data):
+            return response
+        if key:
+            body_cache.put(key, body)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    _suffix_etag(response, encoding)
+    return response
+
+
+def init_compression(app):
+    body_cache.max_bytes = app.config.get("COMPRESS_CACHE_BYTES", 16 * 1024 * 1024)
+
+    @app.after_request
+    def compress_after_request(response):
+        return compress_response(response, app)
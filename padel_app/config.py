@@ -17,6 +17,91 @@ class Config:
 
     SQLALCHEMY_DATABASE_URI = f"postgresql://{POSTGRES_USER}:{POSTGRES_PW}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+    # Connection pool (Postgres only, see sql_db.build_engine_options)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+    # Read replica (optional, used by views marked with sql_db.replica_read)
+    POSTGRES_REPLICA_HOST = os.getenv("POSTGRES_REPLICA_HOST")
+    SQLALCHEMY_BINDS = (
+        {
+            "replica": f"postgresql://{POSTGRES_USER}:{POSTGRES_PW}@{POSTGRES_REPLICA_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+        }
+        if POSTGRES_REPLICA_HOST
+        else {}
+    )
+    DB_REPLICA_MAX_LAG_SECONDS = int(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "10"))
+    DB_REPLICA_CHECK_INTERVAL = int(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+    DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+
+    # What create_app loads: "api" (JWT app API only), "admin" (editor,
+    # sessions, assets, login) or "full"
+    APP_PROFILE = os.getenv("APP_PROFILE", "full")
+
+    # File storage: "gcs" in deployments, "local" (files under
+    # STORAGE_LOCAL_ROOT, served at /uploads) for dev, "fake" (in-memory)
+    # for tests
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+    GCS_UPLOADS_BUCKET = os.getenv("GCS_UPLOADS_BUCKET")
+    STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT")
+
+    # Seconds a JWT caller's identity (user, coach, player, club ids) is
+    # reused across requests with the same token; 0 disables the cache
+    IDENTITY_CACHE_SECONDS = int(os.getenv("IDENTITY_CACHE_SECONDS", "30"))
+
+    # Background jobs: "thread" (in-process pool), "database" (jobs table,
+    # only for deployments that also run `flask worker`) or "immediate"
+    # (inline, tests)
+    JOBS_BACKEND = os.getenv("JOBS_BACKEND", "thread")
+    JOBS_BACKOFF_SECONDS = int(os.getenv("JOBS_BACKOFF_SECONDS", "10"))
+    JOBS_BACKOFF_MAX_SECONDS = int(os.getenv("JOBS_BACKOFF_MAX_SECONDS", "3600"))
+    JOBS_LOCK_TIMEOUT_SECONDS = int(os.getenv("JOBS_LOCK_TIMEOUT_SECONDS", "900"))
+
+    # /api/app/calendar: expand recurring lessons in SQL (generate_series,
+    # Postgres only) instead of with dateutil in Python
+    CALENDAR_SQL_EXPANSION = os.getenv("CALENDAR_SQL_EXPANSION", "false").lower() == "true"
+
+    # How far ahead /api/app/availability/conflicts checks open-ended
+    # recurring classes
+    AVAILABILITY_HORIZON_WEEKS = int(os.getenv("AVAILABILITY_HORIZON_WEEKS", "12"))
+
+    # /api/app/sync: changes younger than SYNC_SETTLE_SECONDS are held
+    # back so a slower transaction with a lower change id is not skipped;
+    # changelog rows older than SYNC_RETENTION_DAYS are pruned
+    SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+    SYNC_SETTLE_SECONDS = int(os.getenv("SYNC_SETTLE_SECONDS", "2"))
+    SYNC_RETENTION_DAYS = int(os.getenv("SYNC_RETENTION_DAYS", "30"))
+
+    # /api/app/batch: sub-requests per batch, and threads for parallel GETs
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
+    # Response compression (gzip, or brotli when installed) for bodies of
+    # at least COMPRESS_MIN_SIZE bytes; compressed bodies of responses with
+    # a strong ETag are kept in a COMPRESS_CACHE_BYTES process cache
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "5"))
+    COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+    # /api/app/calendar/feed: days of lessons and instances around today a
+    # calendar feed covers
+    ICS_PAST_DAYS = int(os.getenv("ICS_PAST_DAYS", "90"))
+    ICS_FUTURE_DAYS = int(os.getenv("ICS_FUTURE_DAYS", "365"))
+
+    # Editor list views: "prefix" (ILIKE 'term%') or "trigram" (ILIKE
+    # '%term%', served by the pg_trgm indexes on the searchable columns)
+    EDITOR_SEARCH_MODE = os.getenv("EDITOR_SEARCH_MODE", "trigram")
+
+    # Hard cap on rows per page from /api/query/<model>
+    API_QUERY_MAX_ROWS = int(os.getenv("API_QUERY_MAX_ROWS", "1000"))
+
     # Secret key (fallback only for dev)
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret")
@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from padel_app.helpers.calendar_helpers import (
+    load_calendar_blocks_for_user,
+    load_lesson_instances_for_coach,
+    load_lessons_for_coach,
+    load_lessons_for_player,
+    load_player_calendar_instances,
+)
+from padel_app.models import Association_CoachPlayer, Player
+from padel_app.tools.availability_tools import IntervalSet, from_minutes, to_minutes
+from padel_app.tools.calendar_tools import expand_occurrences
+
+# Occurrences that started before the range can still overlap it.
+LOOKBEHIND = timedelta(days=1)
+
+
+def busy_intervals(lessons, instances_by_key, blocks, range_start, range_end):
+    """
+    Yield (start, end, event id) minute intervals for lesson occurrences,
+    materialized instances (which replace their occurrence; canceled ones
+    are free) and calendar blocks. Event ids match the calendar's.
+    """
+    expand_from = range_start - LOOKBEHIND
+
+    for lesson in lessons:
+        duration = lesson.end_datetime - lesson.start_datetime
+        for occ_start in expand_occurrences(
+            lesson.start_datetime,
+            lesson.recurrence_rule,
+            lesson.recurrence_end,
+            expand_from,
+            range_end,
+        ):
+            if (lesson.id, occ_start.date()) in instances_by_key:
+                continue
+            start = to_minutes(occ_start)
+            yield start, start + int(duration.total_seconds() // 60), (
+                f"lesson-{lesson.id}-{occ_start.date()}"
+            )
+
+    for instance in instances_by_key.values():
+        if instance.status == "canceled":
+            continue
+        yield (
+            to_minutes(instance.start_datetime),
+            to_minutes(instance.end_datetime),
+            f"lessoninstance-{instance.id}",
+        )
+
+    for block in blocks:
+        duration = block.end_datetime - block.start_datetime
+        for occ_start in expand_occurrences(
+            block.start_datetime,
+            block.recurrence_rule,
+            block.recurrence_end,
+            expand_from,
+            range_end,
+        ):
+            start = to_minutes(occ_start)
+            yield start, start + int(duration.total_seconds() // 60), (
+                f"block-{block.id}-{occ_start}"
+            )
+
+
+def coach_availability(coach_id, user_id, range_start, range_end) -> IntervalSet:
+    lessons = load_lessons_for_coach(coach_id, range_start, range_end)
+    instances_by_key = load_lesson_instances_for_coach(coach_id, range_start, range_end)
+    blocks = load_calendar_blocks_for_user(user_id, range_start, range_end)
+    return IntervalSet(
+        busy_intervals(lessons, instances_by_key, blocks, range_start, range_end)
+    )
+
+
+def player_availability(player_id, user_id, range_start, range_end) -> IntervalSet:
+    lessons = load_lessons_for_player(player_id, range_start, range_end)
+    instances_by_key, _ = load_player_calendar_instances(player_id, range_start, range_end)
+    blocks = load_calendar_blocks_for_user(user_id, range_start, range_end)
+    return IntervalSet(
+        busy_intervals(lessons, instances_by_key, blocks, range_start, range_end)
+    )
+
+
+def players_outside_roster(coach_id, player_ids):
+    """The ids in `player_ids` that aren't linked to the coach."""
+    player_ids = set(player_ids)
+    if not player_ids:
+        return set()
+    linked = {
+        player_id
+        for (player_id,) in Association_CoachPlayer.query.with_entities(
+            Association_CoachPlayer.player_id
+        ).filter(
+            Association_CoachPlayer.coach_id == coach_id,
+            Association_CoachPlayer.player_id.in_(player_ids),
+        )
+    }
+    return player_ids - linked
+
+
+def players_availability(player_ids, range_start, range_end):
+    """{player id: IntervalSet} for the given players."""
+    players = Player.query.filter(Player.id.in_(player_ids)).all()
+    return {
+        p.id: player_availability(p.id, p.user_id, range_start, range_end)
+        for p in players
+    }
+
+
+def serialize_slot(start, end):
+    return {
+        "start": from_minutes(start).isoformat(),
+        "end": from_minutes(end).isoformat(),
+    }
+
+
+def find_conflicts(occurrences, duration_minutes, schedules):
+    """
+    Conflicts for a proposed class.
+
+    `occurrences` are the proposed start datetimes, `schedules` a dict
+    of owner label ("coach", "player-<id>") to IntervalSet. Returns one
+    entry per occurrence that clashes with anything.
+    """
+    results = []
+    for occ_start in occurrences:
+        start = to_minutes(occ_start)
+        end = start + duration_minutes
+        clashes = [
+            {"owner": owner, "eventId": label, **serialize_slot(s, e)}
+            for owner, schedule in schedules.items()
+            for s, e, label in schedule.conflicts(start, end)
+        ]
+        if clashes:
+            results.append(
+                {"date": occ_start.date().isoformat(), **serialize_slot(start, end),
+                 "conflicts": clashes}
+            )
+    return results
@@ -1,20 +1,27 @@
-from padel_app.tools.calendar_tools import expand_occurrences
+from sqlalchemy import Date, DateTime, Integer, and_, case, cast, func, literal_column, or_, select, true, union
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import joinedload, selectinload
+
+from padel_app.sql_db import db
+from padel_app.tools.calendar_tools import WEEKDAY_MAP, ensure_utc, expand_occurrences
 from padel_app.models import (
     Lesson,
     LessonInstance,
     CalendarBlock,
     Association_CoachLesson,
+    Association_CoachLessonInstance,
     Association_PlayerLesson,
     Association_PlayerLessonInstance,
     Presence,
 )
 from padel_app.serializers.calendar_event import serialize_calendar_event
+from padel_app.serializers.fields import pick
 
 
 # ----------------------------
 # Coach
 # ----------------------------
-def load_lessons_for_coach(coach_id, range_start, range_end):
+def lessons_for_coach_query(coach_id, range_start, range_end):
     return (
         Lesson.query
         .join(Lesson.coaches_relations)
@@ -28,30 +35,55 @@ def load_lessons_for_coach(coach_id, range_start, range_end):
                 | (Lesson.recurrence_end >= range_start.date())
             ),
         )
-        .all()
     )
 
 
-def load_lesson_instances_for_coach(coach_id, range_start, range_end):
-    instances = (
+def load_lessons_for_coach(coach_id, range_start, range_end):
+    return lessons_for_coach_query(coach_id, range_start, range_end).all()
+
+
+def lesson_instances_for_coach_query(coach_id, range_start, range_end):
+    """
+    Instances in range of the coach's lessons, plus instances assigned to the
+    coach directly. Both halves are driven by the coach association so the
+    planner can use the (lesson_id, start_datetime) index.
+    """
+    in_range = (
+        LessonInstance.start_datetime >= range_start,
+        LessonInstance.start_datetime <= range_end,
+    )
+    via_lesson = (
         LessonInstance.query
-        .join(Lesson)
-        .filter(
-            LessonInstance.start_datetime >= range_start,
-            LessonInstance.start_datetime <= range_end,
+        .join(
+            Association_CoachLesson,
+            Association_CoachLesson.lesson_id == LessonInstance.lesson_id,
         )
-        .all()
+        .filter(Association_CoachLesson.coach_id == coach_id, *in_range)
+    )
+    via_instance = (
+        LessonInstance.query
+        .join(
+            Association_CoachLessonInstance,
+            Association_CoachLessonInstance.lesson_instance_id == LessonInstance.id,
+        )
+        .filter(Association_CoachLessonInstance.coach_id == coach_id, *in_range)
+    )
+    return via_lesson.union(via_instance).options(
+        selectinload(LessonInstance.coaches_relations)
     )
 
+
+def load_lesson_instances_for_coach(coach_id, range_start, range_end):
+    instances = lesson_instances_for_coach_query(
+        coach_id, range_start, range_end
+    ).all()
+
     indexed = {}
     for instance in instances:
-        instance_coaches = (
-            [rel.coach_id for rel in instance.coaches_relations]
-            if instance.coaches_relations
-            else [rel.coach_id for rel in instance.lesson.coaches_relations]
-        )
-
-        if coach_id not in instance_coaches:
+        # Instance-level coaches override the lesson's coaches.
+        if instance.coaches_relations and coach_id not in [
+            rel.coach_id for rel in instance.coaches_relations
+        ]:
             continue
 
         indexed[(instance.lesson_id, instance.original_lesson_occurence_date)] = instance
@@ -62,9 +94,9 @@ def load_lesson_instances_for_coach(coach_id, range_start, range_end):
 # ----------------------------
 # Player
 # ----------------------------
-def load_lessons_for_player(player_id, range_start, range_end, *, only_active: bool = True):
+def lessons_for_player_query(player_id, range_start, range_end, *, only_active: bool = True):
     """
-    Return base Lesson objects that the player is associated with (recurring templates).
+    Query for the base Lesson objects that the player is associated with (recurring templates).
 
     This uses the player<->lesson association (Association_PlayerLesson).
     """
@@ -75,6 +107,8 @@ def load_lessons_for_player(player_id, range_start, range_end, *, only_active: b
             Association_PlayerLesson.player_id == player_id,
             Lesson.start_datetime <= range_end,
         )
+        # serialize_calendar_event counts participants
+        .options(selectinload(Lesson.players_relations))
     )
 
     if only_active:
@@ -87,10 +121,16 @@ def load_lessons_for_player(player_id, range_start, range_end, *, only_active: b
         | (Lesson.recurrence_end >= range_start.date())
     )
 
-    return q.all()
+    return q
 
 
-def load_lesson_instances_for_player(
+def load_lessons_for_player(player_id, range_start, range_end, *, only_active: bool = True):
+    return lessons_for_player_query(
+        player_id, range_start, range_end, only_active=only_active
+    ).all()
+
+
+def lesson_instances_for_player_query(
     player_id,
     range_start,
     range_end,
@@ -99,59 +139,110 @@ def load_lesson_instances_for_player(
     include_confirmed_only: bool = False,
 ):
     """
-    Return a dict indexed by (lesson_id, original_lesson_occurence_date) -> LessonInstance
-    for instances relevant to this player.
+    Instances in range that the player has a presence on or is assigned to,
+    as (LessonInstance, invited, confirmed, presence status) rows.
 
-    Priority / source of truth:
-      1) Presence rows (invited/confirmed etc)
-      2) Association_PlayerLessonInstance (if you use it)
+    The two sources are combined with a UNION of instance ids, and the
+    player's presence is outer-joined back on, so one statement returns
+    both the instances and their flags (None when there is no presence).
     """
-    indexed = {}
+    via_presence = select(Presence.lesson_instance_id.label("instance_id")).where(
+        Presence.player_id == player_id
+    )
+    if include_confirmed_only:
+        via_presence = via_presence.where(Presence.confirmed == True)  # noqa: E712
+    elif not include_invited:
+        via_presence = via_presence.where(Presence.invited == False)  # noqa: E712
 
-    pres_q = (
-        Presence.query
-        .join(LessonInstance, Presence.lesson_instance_id == LessonInstance.id)
+    via_instance = select(Association_PlayerLessonInstance.lesson_instance_id).where(
+        Association_PlayerLessonInstance.player_id == player_id
+    )
+    ids = union(via_presence, via_instance).subquery()
+
+    return (
+        db.session.query(
+            LessonInstance, Presence.invited, Presence.confirmed, Presence.status
+        )
+        .join(ids, ids.c.instance_id == LessonInstance.id)
+        .outerjoin(
+            Presence,
+            and_(
+                Presence.lesson_instance_id == LessonInstance.id,
+                Presence.player_id == player_id,
+            ),
+        )
         .filter(
-            Presence.player_id == player_id,
             LessonInstance.start_datetime >= range_start,
             LessonInstance.start_datetime <= range_end,
         )
+        .options(
+            joinedload(LessonInstance.lesson),
+            selectinload(LessonInstance.players_relations),
+        )
     )
 
-    if include_confirmed_only:
-        pres_q = pres_q.filter(Presence.confirmed == True)  # noqa: E712
-    elif not include_invited:
-        pres_q = pres_q.filter(Presence.invited == False)  # noqa: E712
 
-    presences = pres_q.all()
+def load_player_calendar_instances(player_id, range_start, range_end, **filters):
+    """
+    Return (instances_by_key, presence_by_instance_id) for a player.
 
-    for p in presences:
-        instance = p.lesson_instance
-        if not instance:
-            continue
+    instances_by_key is indexed by (lesson_id, original_lesson_occurence_date)
+    like load_lesson_instances_for_coach; presence_by_instance_id holds the
+    player's invited/confirmed/presenceStatus flags for build_lesson_events.
+    """
+    indexed, presence = {}, {}
+    rows = lesson_instances_for_player_query(
+        player_id, range_start, range_end, **filters
+    ).all()
+
+    for instance, invited, confirmed, status in rows:
         indexed[(instance.lesson_id, instance.original_lesson_occurence_date)] = instance
+        presence[instance.id] = {
+            "invited": bool(invited),
+            "confirmed": bool(confirmed),
+            "presenceStatus": status,
+        }
 
-    rel_instances = (
-        LessonInstance.query
-        .join(Association_PlayerLessonInstance, Association_PlayerLessonInstance.lesson_instance_id == LessonInstance.id)
-        .filter(
-            Association_PlayerLessonInstance.player_id == player_id,
-            LessonInstance.start_datetime >= range_start,
-            LessonInstance.start_datetime <= range_end,
-        )
-        .all()
-    )
+    return indexed, presence
 
-    for instance in rel_instances:
-        key = (instance.lesson_id, instance.original_lesson_occurence_date)
-        indexed.setdefault(key, instance)
 
+def load_lesson_instances_for_player(
+    player_id,
+    range_start,
+    range_end,
+    *,
+    include_invited: bool = True,
+    include_confirmed_only: bool = False,
+):
+    """
+    Return a dict indexed by (lesson_id, original_lesson_occurence_date) -> LessonInstance
+    for instances relevant to this player (presences and direct assignments).
+    """
+    indexed, _ = load_player_calendar_instances(
+        player_id,
+        range_start,
+        range_end,
+        include_invited=include_invited,
+        include_confirmed_only=include_confirmed_only,
+    )
     return indexed
 
 
-def build_lesson_events(lessons, instances_by_key, range_start, range_end):
+def build_lesson_events(lessons, instances_by_key, range_start, range_end, presence=None, fields=None):
+    """
+    Calendar events for lesson occurrences in range, materialized instances
+    taking the place of their occurrence. `presence` maps instance ids to
+    extra fields (the player's presence flags) merged into their events.
+    `fields` is the sparse fieldset the events are cut down to.
+    """
+    presence = presence or {}
     events = []
 
+    def instance_event(instance):
+        event = serialize_calendar_event(instance, fields=fields)
+        event.update(pick(presence.get(instance.id, {}), fields))
+        return event
+
     rendered_instance_ids = set()
     for lesson in lessons:
         occurrences = expand_occurrences(
@@ -169,7 +260,7 @@ def build_lesson_events(lessons, instances_by_key, range_start, range_end):
             instance = instances_by_key.get(key)
 
             if instance:
-                events.append(serialize_calendar_event(instance))
+                events.append(instance_event(instance))
                 rendered_instance_ids.add(instance.id)
             else:
                 events.append(
@@ -177,17 +268,228 @@ def build_lesson_events(lessons, instances_by_key, range_start, range_end):
                         lesson,
                         override_id=f"lesson-{lesson.id}-{occ_date}",
                         override_date=occ_date.isoformat(),
+                        fields=fields,
                     )
                 )
 
     for instance in instances_by_key.values():
         if instance.id not in rendered_instance_ids:
-            events.append(serialize_calendar_event(instance))
+            events.append(instance_event(instance))
 
     return events
 
 
-def load_calendar_blocks_for_user(user_id, range_start, range_end):
+# ----------------------------
+# Occurrences in SQL
+# ----------------------------
+# A flat JSON object of scalars and arrays of scalars, the shape rules are
+# saved in. Anything this matches is valid JSON, so casting it can't fail.
+_WS = r"[ \t\n\r]*"
+_STRING = r'"([^"\\\x01-\x1f]|\\["\\/bfnrt])*"'
+_SCALAR = rf"({_STRING}|-?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?|true|false|null)"
+_VALUE = rf"({_SCALAR}|\[{_WS}({_SCALAR}({_WS},{_WS}{_SCALAR})*)?{_WS}\])"
+_MEMBER = rf"{_STRING}{_WS}:{_WS}{_VALUE}"
+_JSON_OBJECT = rf"^{_WS}\{{{_WS}({_MEMBER}({_WS},{_WS}{_MEMBER})*)?{_WS}\}}{_WS}$"
+
+
+def _naive_utc(dt):
+    return ensure_utc(dt).replace(tzinfo=None)
+
+
+def lesson_occurrences_query(lessons, range_start, range_end, with_instances=True):
+    """
+    (Lesson, LessonInstance or None, occurrence start) rows for the
+    occurrences in range of the lessons in `lessons` (a Lesson query),
+    expanded by Postgres in one statement.
+
+    Each lesson is joined to a generate_series of days from the later of
+    its start and `range_start` up to the earlier of `range_end` and its
+    recurrence end, at the lesson's time of day. Days are kept when their
+    day of week is in the rule's `daysOfWeek` (read from the JSON text)
+    or, when it names none, is the start's, as build_rrule does. The
+    materialized instance of each occurrence is LEFT JOINed on
+    (lesson_id, original_lesson_occurence_date); without `with_instances`
+    the rows are (Lesson, occurrence start) and there is no join.
+    Non-recurring lessons give their start, when in range.
+    """
+    range_start, range_end = _naive_utc(range_start), _naive_utc(range_end)
+    one_day = literal_column("interval '1 day'")
+    # Same test as expand_occurrences. Only rules matching _JSON_OBJECT are
+    # cast, so a malformed rule can't fail the statement; it gets a NULL
+    # rule and, as in build_rrule, no occurrences.
+    recurring = func.coalesce(Lesson.recurrence_rule, "") != ""
+    json_object = Lesson.recurrence_rule.op("~")(_JSON_OBJECT)
+    rule = cast(case((and_(recurring, json_object), Lesson.recurrence_rule)), JSONB)
+    days = func.coalesce(rule["daysOfWeek"], func.jsonb_build_array(), type_=JSONB)
+
+    start_day = func.date_trunc("day", Lesson.start_datetime)
+    until = cast(Lesson.recurrence_end, DateTime) + one_day
+    series = (
+        func.generate_series(
+            case(
+                (
+                    recurring,
+                    func.date_trunc("day", func.greatest(Lesson.start_datetime, range_start))
+                    + (Lesson.start_datetime - start_day),
+                ),
+                else_=Lesson.start_datetime,
+            ),
+            case((recurring, func.least(range_end, until)), else_=Lesson.start_datetime),
+            one_day,
+        )
+        .table_valued("start")
+        .render_derived(name="occurrence")
+        .lateral()
+    )
+    occurrence = series.c.start
+
+    dow = cast(func.extract("dow", occurrence), Integer)
+    named_days = or_(*(days.contains(func.to_jsonb(day)) for day in WEEKDAY_MAP))
+    weekly = and_(
+        rule["frequency"].astext == "weekly",
+        or_(
+            days.contains(func.to_jsonb(dow)),
+            and_(~named_days, dow == cast(func.extract("dow", Lesson.start_datetime), Integer)),
+        ),
+        occurrence >= Lesson.start_datetime,
+        or_(Lesson.recurrence_end.is_(None), occurrence < until),
+    )
+
+    entities = [Lesson]
+    joined = Lesson.__table__.join(series, true())
+    if with_instances:
+        entities.append(LessonInstance)
+        joined = joined.outerjoin(
+            LessonInstance.__table__,
+            and_(
+                LessonInstance.lesson_id == Lesson.id,
+                LessonInstance.original_lesson_occurence_date == cast(occurrence, Date),
+            ),
+        )
+
+    return (
+        db.session.query(*entities, occurrence.label("occurrence_start"))
+        .select_from(joined)
+        .filter(
+            Lesson.id.in_(lessons.with_entities(Lesson.id)),
+            occurrence >= range_start,
+            occurrence <= range_end,
+            or_(~recurring, weekly),
+        )
+        .order_by(occurrence, Lesson.id)
+    )
+
+
+def _expand_lesson_occurrences(lessons, range_start, range_end, with_instances):
+    lessons = lessons.all()
+    by_key = {}
+    if with_instances:
+        instances = (
+            LessonInstance.query
+            .filter(
+                LessonInstance.lesson_id.in_([lesson.id for lesson in lessons]),
+                LessonInstance.original_lesson_occurence_date
+                >= ensure_utc(range_start).date(),
+                LessonInstance.original_lesson_occurence_date
+                <= ensure_utc(range_end).date(),
+            )
+            .all()
+        )
+        by_key = {
+            (instance.lesson_id, instance.original_lesson_occurence_date): instance
+            for instance in instances
+        }
+
+    rows = [
+        (lesson, by_key.get((lesson.id, occurrence.date())), occurrence)
+        for lesson in lessons
+        for occurrence in expand_occurrences(
+            lesson.start_datetime,
+            lesson.recurrence_rule,
+            lesson.recurrence_end,
+            range_start,
+            range_end,
+        )
+    ]
+    return sorted(rows, key=lambda row: (row[2], row[0].id))
+
+
+def load_lesson_occurrences(lessons, range_start, range_end, with_instances=True):
+    """
+    (Lesson, LessonInstance or None, UTC occurrence start) rows, ordered
+    by start: from lesson_occurrences_query on Postgres, and from
+    expand_occurrences on other backends. Without `with_instances` the
+    instances aren't loaded and are all None.
+    """
+    bind = db.session().get_bind(mapper=Lesson.__mapper__)
+    if bind.dialect.name != "postgresql":
+        return _expand_lesson_occurrences(
+            lessons, range_start, range_end, with_instances
+        )
+
+    query = lesson_occurrences_query(lessons, range_start, range_end, with_instances)
+    if not with_instances:
+        return [(lesson, None, ensure_utc(occurrence)) for lesson, occurrence in query]
+    return [
+        (lesson, instance, ensure_utc(occurrence))
+        for lesson, instance, occurrence in query
+    ]
+
+
+def build_occurrence_events(rows, presence=None, fields=None):
+    """
+    Calendar events for load_lesson_occurrences rows, as build_lesson_events
+    renders them. Instances not on an occurrence of their lesson aren't in
+    the rows; callers that can have them add them separately.
+    """
+    presence = presence or {}
+    events = []
+    for lesson, instance, occurrence in rows:
+        if instance is not None:
+            event = serialize_calendar_event(instance, fields=fields)
+            event.update(pick(presence.get(instance.id, {}), fields))
+        else:
+            occ_date = occurrence.date()
+            event = serialize_calendar_event(
+                lesson,
+                override_id=f"lesson-{lesson.id}-{occ_date}",
+                override_date=occ_date.isoformat(),
+                fields=fields,
+            )
+        events.append(event)
+    return events
+
+
+def build_lesson_occurrence_events(
+    lessons, instances_by_key, range_start, range_end, presence=None, fields=None
+):
+    """
+    build_lesson_events for `lessons` as a Lesson query, its occurrences
+    from load_lesson_occurrences. Occurrences are matched to the caller's
+    `instances_by_key`, so they are loaded without instances, and the
+    events are the ones build_lesson_events gives: occurrences in start
+    order, then the instances not on one.
+    """
+    occurrences = load_lesson_occurrences(
+        lessons, range_start, range_end, with_instances=False
+    )
+    rows = [
+        (lesson, instances_by_key.get((lesson.id, occurrence.date())), occurrence)
+        for lesson, _, occurrence in occurrences
+    ]
+    events = build_occurrence_events(rows, presence=presence, fields=fields)
+
+    presence = presence or {}
+    rendered_instance_ids = {instance.id for _, instance, _ in rows if instance is not None}
+    for instance in instances_by_key.values():
+        if instance.id not in rendered_instance_ids:
+            event = serialize_calendar_event(instance, fields=fields)
+            event.update(pick(presence.get(instance.id, {}), fields))
+            events.append(event)
+    return events
+
+
+def calendar_blocks_for_user_query(user_id, range_start, range_end):
     return (
         CalendarBlock.query
         .filter(
@@ -199,11 +501,14 @@ def load_calendar_blocks_for_user(user_id, range_start, range_end):
                 | (CalendarBlock.recurrence_end >= range_start.date())
             ),
         )
-        .all()
     )
 
 
-def build_block_events(blocks, range_start, range_end):
+def load_calendar_blocks_for_user(user_id, range_start, range_end):
+    return calendar_blocks_for_user_query(user_id, range_start, range_end).all()
+
+
+def build_block_events(blocks, range_start, range_end, fields=None):
     events = []
 
     for block in blocks:
@@ -222,6 +527,7 @@ def build_block_events(blocks, range_start, range_end):
                     block,
                     override_id=f"block-{block.id}-{occ_start}",
                     override_date=occ_date.isoformat(),
+                    fields=fields,
                 )
             )
 
@@ -242,8 +548,12 @@ def build_coach_calendar_events(coach_id, user_id, range_start, range_end, *, in
 
 def build_player_calendar_events(player_id, user_id, range_start, range_end, *, include_blocks: bool = True):
     lessons = load_lessons_for_player(player_id, range_start, range_end)
-    instances_by_key = load_lesson_instances_for_player(player_id, range_start, range_end)
-    lesson_events = build_lesson_events(lessons, instances_by_key, range_start, range_end)
+    instances_by_key, presence = load_player_calendar_instances(
+        player_id, range_start, range_end
+    )
+    lesson_events = build_lesson_events(
+        lessons, instances_by_key, range_start, range_end, presence=presence
+    )
 
     if not include_blocks:
         return lesson_events
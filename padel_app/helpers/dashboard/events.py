@@ -8,7 +8,7 @@ from padel_app.helpers.calendar_helpers import (
     load_lessons_for_coach,
     load_lesson_instances_for_coach,
     load_lessons_for_player,
-    load_lesson_instances_for_player,
+    load_player_calendar_instances,
 )
 
 from padel_app.tools.tools import _date_label, _safe_int
@@ -41,14 +41,19 @@ def build_dashboard_event_lists(
     # ----------------------------
     # Load lessons + instances by role
     # ----------------------------
+    presence = None
     if coach_id is not None:
         lessons = load_lessons_for_coach(coach_id, range_start, range_end)
         instances_by_key = load_lesson_instances_for_coach(coach_id, range_start, range_end)
     else:
         lessons = load_lessons_for_player(player_id, range_start, range_end)
-        instances_by_key = load_lesson_instances_for_player(player_id, range_start, range_end)
+        instances_by_key, presence = load_player_calendar_instances(
+            player_id, range_start, range_end
+        )
 
-    lesson_events = build_lesson_events(lessons, instances_by_key, range_start, range_end)
+    lesson_events = build_lesson_events(
+        lessons, instances_by_key, range_start, range_end, presence=presence
+    )
 
     scheduled = [e for e in lesson_events if e.get("status") == "scheduled"]
     scheduled_sorted = sorted(scheduled, key=_event_dt)
@@ -71,7 +76,7 @@ def build_dashboard_event_lists(
 
         secondary_items = [_to_list_item(e, with_missing_badge=True) for e in needs_players_sorted]
     else:
-        # Player secondary list: invites to confirm (only if your serializer exposes presence flags)
+        # Player secondary list: invites to confirm
         invites = [
             e for e in scheduled
             if (e.get("invited") is True) and (e.get("confirmed") is False)
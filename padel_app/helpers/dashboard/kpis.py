@@ -74,6 +74,19 @@ def compute_player_kpis(*, player_id: int) -> PlayerKpis:
         invites_to_confirm=int(invites_to_confirm),
     )
 
+def pending_validations_query(*, coach_id: int):
+    ACL = Association_CoachLesson
+
+    return (
+        db.session.query(func.count(Presence.id))
+        .join(LessonInstance, Presence.lesson_instance_id == LessonInstance.id)
+        .join(Lesson, LessonInstance.lesson_id == Lesson.id)
+        .join(ACL, ACL.lesson_id == Lesson.id)
+        .filter(ACL.coach_id == coach_id)
+        .filter(Presence.validated == False)  # noqa: E712
+    )
+
+
 def compute_coach_kpis(*, coach_id: int, scheduled_count: int) -> CoachKpis:
     """
     Compute KPIs for coach dashboard.
@@ -91,17 +104,7 @@ def compute_coach_kpis(*, coach_id: int, scheduled_count: int) -> CoachKpis:
         .scalar()
     ) or 0
 
-    ACL = Association_CoachLesson
-
-    pending_validations = (
-        db.session.query(func.count(Presence.id))
-        .join(LessonInstance, Presence.lesson_instance_id == LessonInstance.id)
-        .join(Lesson, LessonInstance.lesson_id == Lesson.id)
-        .join(ACL, ACL.lesson_id == Lesson.id)
-        .filter(ACL.coach_id == coach_id)
-        .filter(Presence.validated == False)
-        .scalar()
-    ) or 0
+    pending_validations = pending_validations_query(coach_id=coach_id).scalar() or 0
 
     monthly_revenue = 0
 
@@ -6,7 +6,31 @@ from typing import Any, Dict, Optional, Tuple
 from sqlalchemy import func
 
 from padel_app.sql_db import db
-from padel_app.models import ConversationParticipant, Message, User
+from padel_app.models import Conversation, ConversationParticipant, Message, User
+
+
+def unread_messages_query(*entities, user_id: int):
+    """Messages from others in the user's conversations sent after their last read."""
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    CP = ConversationParticipant
+    M = Message
+
+    return (
+        db.session.query(*entities)
+        .join(CP, CP.conversation_id == M.conversation_id)
+        .filter(CP.user_id == user_id)
+        .filter(M.sender_id != user_id)
+        .filter(M.sent_at > func.coalesce(CP.last_read_at, epoch))
+    )
+
+
+def conversations_for_user_query(*, user_id: int):
+    return (
+        Conversation.query
+        .join(ConversationParticipant)
+        .filter(ConversationParticipant.user_id == user_id)
+    )
 
 
 def compute_message_overview(*, user_id: int) -> Tuple[int, int, Optional[Dict[str, Any]]]:
@@ -22,28 +46,16 @@ def compute_message_overview(*, user_id: int) -> Tuple[int, int, Optional[Dict[s
             - conversations_to_reply: number of conversations with unread messages
             - latest: dict with sender/preview or None
     """
-    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
-
     CP = ConversationParticipant
     M = Message
     U = User
 
-    unread_total = (
-        db.session.query(func.count(M.id))
-        .join(CP, CP.conversation_id == M.conversation_id)
-        .filter(CP.user_id == user_id)
-        .filter(M.sender_id != user_id)
-        .filter(M.sent_at > func.coalesce(CP.last_read_at, epoch))
-        .scalar()
-    ) or 0
+    unread_total = unread_messages_query(func.count(M.id), user_id=user_id).scalar() or 0
 
     conversations_to_reply = (
-        db.session.query(func.count(func.distinct(M.conversation_id)))
-        .join(CP, CP.conversation_id == M.conversation_id)
-        .filter(CP.user_id == user_id)
-        .filter(M.sender_id != user_id)
-        .filter(M.sent_at > func.coalesce(CP.last_read_at, epoch))
-        .scalar()
+        unread_messages_query(
+            func.count(func.distinct(M.conversation_id)), user_id=user_id
+        ).scalar()
     ) or 0
 
     latest_msg = (
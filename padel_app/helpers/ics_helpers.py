@@ -0,0 +1,319 @@
+"""
+Per-user iCalendar feeds, for subscribing from external calendar apps.
+
+A feed has the lessons, instances and blocks of /calendar, but as
+series rather than expanded occurrences: a recurring lesson or block is
+one VEVENT with an RRULE, its cancelled instances are EXDATEs and its
+other materialized instances override their occurrence through
+RECURRENCE-ID. Instances that don't sit on an occurrence of their
+lesson (or whose lesson isn't in the feed) are events of their own, as
+in build_lesson_events. Series only cover `feed_window`, the span their
+instances are loaded for.
+
+Calendar apps can't send a JWT, so feeds are addressed by a token that
+signs the user id together with the user's calendar_feed_secret;
+resetting the secret revokes every URL issued before. Rendered feeds are
+cached per user and calendar version; on a miss the feed is streamed
+while it is rendered.
+"""
+import datetime as dt
+import hmac
+import secrets
+from collections import defaultdict
+from functools import wraps
+from itertools import chain
+
+from flask import Response, abort, current_app, stream_with_context
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from padel_app.compression import BodyCache
+from padel_app.helpers.calendar_helpers import (
+    load_calendar_blocks_for_user,
+    load_lesson_instances_for_coach,
+    load_lessons_for_coach,
+    load_lessons_for_player,
+    load_player_calendar_instances,
+)
+from padel_app.helpers.version_helpers import calendar_version
+from padel_app.identity import act_as, current_identity, current_user
+from padel_app.sql_db import db
+from padel_app.tools.calendar_tools import ensure_utc
+from padel_app.tools.ics_tools import (
+    escape_text,
+    fold,
+    format_datetime,
+    recurrence,
+    render,
+)
+
+CALENDAR_NAME = "LevelUp"
+PRODID = "-//LevelUp//Padel calendar//EN"
+CHUNK_SIZE = 16 * 1024
+
+feed_cache = BodyCache(max_bytes=32 * 1024 * 1024)
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="calendar-feed")
+
+
+def reset_feed_secret(user):
+    """Give `user` a new feed secret, revoking their current feed URL."""
+    user.calendar_feed_secret = secrets.token_urlsafe(32)
+    db.session.commit()
+
+
+def feed_token(user):
+    if not user.calendar_feed_secret:
+        reset_feed_secret(user)
+    return _serializer().dumps([user.id, user.calendar_feed_secret])
+
+
+def feed_token_claims(token):
+    """(user id, feed secret) a token was issued for, or None if it isn't valid."""
+    try:
+        user_id, secret = _serializer().loads(token)
+        return int(user_id), str(secret)
+    except (BadSignature, TypeError, ValueError):
+        return None
+
+
+def feed_token_required(view):
+    """
+    Authenticate a feed view by its `token` URL argument instead of a JWT.
+    Tokens of inactive users, or signed with a secret since reset, are 404s.
+    """
+
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        claims = feed_token_claims(kwargs["token"])
+        if claims is None:
+            abort(404)
+        user_id, secret = claims
+        act_as(user_id)
+        user = current_user()
+        if user.status != "active" or not hmac.compare_digest(
+            user.calendar_feed_secret or "", secret
+        ):
+            abort(404)
+        return view(*args, **kwargs)
+
+    return decorated_function
+
+
+def feed_window(today=None):
+    today = today or dt.datetime.now(dt.timezone.utc).date()
+    start = dt.datetime.combine(today, dt.time.min, tzinfo=dt.timezone.utc)
+    return (
+        start - dt.timedelta(days=current_app.config.get("ICS_PAST_DAYS", 90)),
+        start + dt.timedelta(days=current_app.config.get("ICS_FUTURE_DAYS", 365)),
+    )
+
+
+def _uid(kind, id):
+    return f"{kind}-{id}@levelup"
+
+
+def _event(uid, obj, start, end, title, description, *extra):
+    stamp = obj.updated_at or obj.created_at or start
+    return render("VEVENT", [
+        ("UID", uid),
+        ("DTSTAMP", format_datetime(stamp)),
+        ("DTSTART", format_datetime(start)),
+        ("DTEND", format_datetime(end)),
+        ("SUMMARY", escape_text(title or "")),
+        ("DESCRIPTION", escape_text(description) if description else None),
+        *extra,
+    ])
+
+
+def _instance_event(uid, instance, *extra):
+    status = "CANCELLED" if instance.status == "canceled" else None
+    return _event(
+        uid,
+        instance,
+        instance.start_datetime,
+        instance.end_datetime,
+        instance.title,
+        instance.notes,
+        ("STATUS", status),
+        *extra,
+    )
+
+
+def _bounded(obj, window):
+    """
+    (first occurrence, Recurrence) of `obj`'s series cut down to `window`,
+    or None when no occurrence falls inside it. Instances are only loaded
+    for the window, so occurrences outside it would show without their
+    EXDATEs and overrides.
+
+    Raises:
+        ValueError: As `recurrence`.
+    """
+    range_start, range_end = (ensure_utc(d) for d in window)
+    rule = recurrence(obj.recurrence_rule, obj.start_datetime, obj.recurrence_end)
+    if rule is None:
+        return None
+    first = rule.rule.after(range_start, inc=True)
+    if first is None or first > range_end:
+        return None
+    until = range_end if rule.until is None else min(rule.until, range_end)
+    return first, recurrence(obj.recurrence_rule, first, until)
+
+
+def _series(uid, obj, start, title, description, rule, exdates=()):
+    # RFC 5545 always counts DTSTART, dateutil only if the rule matches it.
+    if start not in rule:
+        exdates = [start, *exdates]
+    return _event(
+        uid,
+        obj,
+        start,
+        start + (obj.end_datetime - obj.start_datetime),
+        title,
+        description,
+        ("RRULE", rule.rrule),
+        ("EXDATE", [format_datetime(d) for d in sorted(exdates)]),
+    )
+
+
+def lesson_components(lessons, instances_by_key, window):
+    instances = defaultdict(list)
+    for instance in instances_by_key.values():
+        instances[instance.lesson_id].append(instance)
+
+    for lesson in lessons:
+        own = instances.pop(lesson.id, [])
+        uid = _uid("lesson", lesson.id)
+        try:
+            bounded = _bounded(lesson, window)
+        except ValueError:
+            # No occurrences in /calendar either; instances stand alone.
+            instances[lesson.id] = own
+            continue
+
+        if not lesson.recurrence_rule:
+            replacement = instances_by_key.get((lesson.id, lesson.start_datetime.date()))
+            if replacement is not None:
+                own.remove(replacement)
+                yield _instance_event(uid, replacement)
+            else:
+                yield _event(
+                    uid, lesson, lesson.start_datetime, lesson.end_datetime,
+                    lesson.title, lesson.description,
+                )
+            instances[lesson.id] = own
+            continue
+        if bounded is None:
+            instances[lesson.id] = own
+            continue
+
+        first, rule = bounded
+        exdates, overrides, loose = [], [], []
+        for instance in own:
+            occurrence = dt.datetime.combine(
+                instance.original_lesson_occurence_date, lesson.start_datetime.time()
+            ) if instance.original_lesson_occurence_date else None
+            if occurrence is None or occurrence not in rule:
+                loose.append(instance)
+            elif instance.status == "canceled":
+                exdates.append(occurrence)
+            else:
+                overrides.append((occurrence, instance))
+        instances[lesson.id] = loose
+
+        yield _series(uid, lesson, first, lesson.title, lesson.description, rule, exdates)
+        for occurrence, instance in sorted(overrides, key=lambda pair: pair[0]):
+            yield _instance_event(uid, instance, ("RECURRENCE-ID", format_datetime(occurrence)))
+
+    for loose in instances.values():
+        for instance in loose:
+            yield _instance_event(_uid("lessoninstance", instance.id), instance)
+
+
+def block_components(blocks, window):
+    for block in blocks:
+        uid = _uid("block", block.id)
+        try:
+            bounded = _bounded(block, window)
+        except ValueError:
+            continue
+        if not block.recurrence_rule:
+            yield _event(
+                uid, block, block.start_datetime, block.end_datetime,
+                block.title, block.description,
+            )
+        elif bounded is not None:
+            first, rule = bounded
+            yield _series(uid, block, first, block.title, block.description, rule)
+
+
+def load_feed(identity, range_start, range_end):
+    """(lessons, instances_by_key, blocks) for the feed of `identity`."""
+    if identity.coach_id:
+        lessons = load_lessons_for_coach(identity.coach_id, range_start, range_end)
+        instances_by_key = load_lesson_instances_for_coach(
+            identity.coach_id, range_start, range_end
+        )
+    elif identity.player_id:
+        lessons = load_lessons_for_player(identity.player_id, range_start, range_end)
+        instances_by_key, _ = load_player_calendar_instances(
+            identity.player_id, range_start, range_end
+        )
+    else:
+        abort(403, "User has no coach or player profile")
+
+    blocks = load_calendar_blocks_for_user(identity.user_id, range_start, range_end)
+    return lessons, instances_by_key, blocks
+
+
+def render_feed(lessons, instances_by_key, blocks, window, chunk_size=CHUNK_SIZE):
+    """
+    The VCALENDAR as chunks of about `chunk_size` bytes. Series are cut
+    down to `window`, the (start, end) the rows were loaded for.
+    """
+    buffer = bytearray(b"".join(fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{CALENDAR_NAME}",
+    )))
+    components = chain(
+        lesson_components(lessons, instances_by_key, window),
+        block_components(blocks, window),
+    )
+    for component in components:
+        buffer += component
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += fold("END:VCALENDAR")
+    yield bytes(buffer)
+
+
+def _caching(key, chunks):
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    # Only reached when the whole feed was rendered.
+    feed_cache.put(key, b"".join(parts))
+
+
+def calendar_feed_response():
+    """The caller's feed: from the cache, or streamed as it is rendered."""
+    identity = current_identity()
+    key = (identity.user_id, calendar_version())
+    body = feed_cache.get(key)
+    if body is not None:
+        return Response(body, mimetype="text/calendar")
+
+    window = feed_window()
+    lessons, instances_by_key, blocks = load_feed(identity, *window)
+    chunks = render_feed(lessons, instances_by_key, blocks, window)
+    return Response(
+        stream_with_context(_caching(key, chunks)), mimetype="text/calendar"
+    )
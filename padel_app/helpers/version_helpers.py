@@ -0,0 +1,110 @@
+"""
+Versions of the app endpoints' data, for http_cache_tools.cache_policy.
+
+Each function is a handful of aggregate lookups that change whenever
+the matching endpoint's response would. Rows edited through the change
+log's entities are covered by it; the rest rely on counts, max ids and
+`updated_at` maxima.
+"""
+from datetime import date
+
+from sqlalchemy import func, select
+
+from padel_app.identity import current_identity
+from padel_app.models import (
+    Association_CoachPlayer,
+    Association_PlayerClub,
+    CoachLevel,
+    ConversationParticipant,
+    Message,
+    Player,
+    User,
+)
+from padel_app.sql_db import db
+from padel_app.tools.http_cache_tools import url_epoch
+from padel_app.tools.sync_tools import latest_change
+
+CALENDAR_ENTITIES = (
+    "lessons",
+    "lessonInstances",
+    "presences",
+    "calendarBlocks",
+    "lessonPlayers",
+    "lessonInstancePlayers",
+    "lessonCoaches",
+)
+
+
+def _aggregate(query, *columns):
+    row = query.with_entities(
+        func.count(), *[agg(column) for agg, column in columns]
+    ).one()
+    return tuple(row)
+
+
+def calendar_version():
+    # Past events are reported as "completed", so the day matters too.
+    identity = current_identity()
+    return latest_change(identity, CALENDAR_ENTITIES), date.today().isoformat()
+
+
+def coach_levels_version():
+    identity = current_identity()
+    return _aggregate(
+        db.session.query(CoachLevel).filter(CoachLevel.coach_id == identity.coach_id),
+        (func.max, CoachLevel.id),
+        (func.max, CoachLevel.updated_at),
+    )
+
+
+def _players_query(identity):
+    query = db.session.query(Player).join(User, User.id == Player.user_id)
+    if identity.coach_id:
+        return query.join(
+            Association_CoachPlayer, Association_CoachPlayer.player_id == Player.id
+        ).filter(Association_CoachPlayer.coach_id == identity.coach_id)
+    if identity.club_id:
+        return query.join(
+            Association_PlayerClub, Association_PlayerClub.player_id == Player.id
+        ).filter(Association_PlayerClub.club_id == identity.club_id)
+    return query
+
+
+def players_version():
+    """Version of /players and /coach_players."""
+    identity = current_identity()
+    links = None
+    if identity.coach_id:
+        links = latest_change(identity, ("coachPlayers",))
+    return links, _aggregate(
+        _players_query(identity),
+        (func.max, Player.id),
+        (func.max, Player.updated_at),
+        (func.max, User.updated_at),
+    )
+
+
+def conversations_version():
+    identity = current_identity()
+    own = select(ConversationParticipant.conversation_id).where(
+        ConversationParticipant.user_id == identity.user_id
+    )
+    messages = select(func.count(Message.id), func.max(Message.id)).where(
+        Message.conversation_id.in_(own)
+    )
+    participants = (
+        db.session.query(ConversationParticipant)
+        .join(User, User.id == ConversationParticipant.user_id)
+        .filter(ConversationParticipant.conversation_id.in_(own))
+    )
+    return (
+        tuple(db.session.execute(messages).one()),
+        _aggregate(
+            participants,
+            (func.max, ConversationParticipant.id),
+            (func.max, ConversationParticipant.last_read_at),
+            (func.max, User.updated_at),
+        ),
+        # Avatars may be signed URLs.
+        url_epoch(),
+    )
@@ -0,0 +1,197 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from flask import abort, current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event, select
+from sqlalchemy.orm import contains_eager
+
+from padel_app.models import Association_CoachClub, Club, Coach, Player, User
+from padel_app.sql_db import RoutingSession, db
+
+
+@dataclass(frozen=True)
+class Identity:
+    """What JWT endpoints need to know about the caller, as plain values."""
+
+    user_id: int
+    username: str
+    name: str
+    is_admin: bool
+    coach_id: Optional[int]
+    player_id: Optional[int]
+    club_id: Optional[int]
+
+    @property
+    def roles(self):
+        return ["coach"] if self.coach_id else ["player"]
+
+
+class IdentityCache:
+    """Thread-safe TTL cache of Identity keyed on (user id, token iat)."""
+
+    def __init__(self, max_entries=10000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            identity, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            return identity
+
+    def put(self, key, identity, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (identity, self.clock() + ttl)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def _current_club_id():
+    # Coach.current_club is the last of clubs_relations, which are ordered
+    # newest first: the club the coach joined first.
+    return (
+        select(Association_CoachClub.club_id)
+        .where(Association_CoachClub.coach_id == Coach.id)
+        .order_by(Association_CoachClub.created_at.asc(), Association_CoachClub.id.asc())
+        .limit(1)
+        .correlate(Coach)
+        .scalar_subquery()
+    )
+
+
+def load_user(user_id):
+    """
+    User with coach, player and current club, in one query.
+
+    Returns (user, club); user is None if there is no such user.
+    """
+    row = (
+        db.session.query(User, Club)
+        .outerjoin(User.coach)
+        .outerjoin(User.player)
+        .outerjoin(Club, Club.id == _current_club_id())
+        .options(contains_eager(User.coach), contains_eager(User.player))
+        .filter(User.id == user_id)
+        .first()
+    )
+    return row if row else (None, None)
+
+
+def _identity_for(user, club):
+    return Identity(
+        user_id=user.id,
+        username=user.username,
+        name=user.name,
+        is_admin=bool(user.is_admin),
+        coach_id=user.coach.id if user.coach else None,
+        player_id=user.player.id if user.player else None,
+        club_id=club.id if club else None,
+    )
+
+
+def _jwt_user_id():
+    user_id = get_jwt_identity()
+    if user_id is None:
+        abort(401, "Missing or invalid JWT")
+    return int(user_id)
+
+
+def _cache_key(user_id):
+    return (user_id, get_jwt().get("iat"))
+
+
+def _use(user_id):
+    user, club = load_user(user_id)
+    if user is None:
+        abort(404)
+    g.current_user = user
+    g.current_club = club
+    g.identity = _identity_for(user, club)
+    return user
+
+
+def current_user():
+    """The caller's User, loaded once per request together with coach, player and club."""
+    if "current_user" not in g:
+        user = _use(_jwt_user_id())
+        identity_cache.put(
+            _cache_key(user.id),
+            g.identity,
+            current_app.config.get("IDENTITY_CACHE_SECONDS", 30),
+        )
+    return g.current_user
+
+
+def act_as(user_id):
+    """
+    Make `user_id` the caller for the rest of the request, for endpoints
+    authenticated by something other than a JWT (e.g. calendar feed tokens).
+    """
+    _use(user_id)
+    return g.identity
+
+
+def current_identity():
+    """
+    The caller's Identity, without touching the database when possible.
+
+    Repeated requests with the same token are served from a short-lived
+    process cache (IDENTITY_CACHE_SECONDS), keyed on the token's iat so a
+    new login always reloads.
+    """
+    if "identity" not in g:
+        cached = identity_cache.get(_cache_key(_jwt_user_id()))
+        if cached is not None:
+            g.identity = cached
+        else:
+            current_user()
+    return g.identity
+
+
+def current_coach():
+    return current_user().coach
+
+
+def current_player():
+    return current_user().player
+
+
+def current_club():
+    current_user()
+    return g.current_club
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _invalidate_identities(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            identity_cache.invalidate_user(obj.id)
+        elif isinstance(obj, (Coach, Player)):
+            identity_cache.invalidate_user(obj.user_id)
+        elif isinstance(obj, Association_CoachClub):
+            # Rare, and mapping a coach back to its user would need a query.
+            identity_cache.clear()
@@ -0,0 +1,235 @@
+import importlib
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_
+
+# From the module: padel_app.models imports this one (via image_tools).
+from .models.jobs import DEFAULT_MAX_ATTEMPTS, Job
+from .sql_db import db
+
+BACKENDS = ("database", "thread", "immediate")
+
+# Modules whose @task functions must be registered before a worker runs.
+TASK_MODULES = ("padel_app.tools.email_tools", "padel_app.tools.image_tools")
+
+_tasks = {}
+_thread_pool = None
+_thread_pool_lock = threading.Lock()
+
+
+def task(name, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Register a function as a job; its keyword arguments must be JSON-serialisable."""
+
+    def decorator(func):
+        func.job_name = name
+        func.max_attempts = max_attempts
+        _tasks[name] = func
+        return func
+
+    return decorator
+
+
+def get_task(name):
+    if name not in _tasks:
+        raise LookupError(f"Unknown job: {name}")
+    return _tasks[name]
+
+
+def backoff(app, attempts):
+    """Delay before retry number `attempts` (1-based): base * 2^(n-1), capped."""
+    base = app.config.get("JOBS_BACKOFF_SECONDS", 10)
+    cap = app.config.get("JOBS_BACKOFF_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def _backend(app):
+    backend = app.config.get("JOBS_BACKEND", "thread")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JOBS_BACKEND: {backend}")
+    return backend
+
+
+def init_jobs(app):
+    _backend(app)
+    for module in TASK_MODULES:
+        importlib.import_module(module)
+
+
+def enqueue(name, *, delay=None, max_attempts=None, **kwargs):
+    """
+    Run job `name` with `kwargs` outside the request.
+
+    With JOBS_BACKEND "thread" (the default) it runs on an in-process pool
+    (retries included); "database" commits a row to the jobs table for
+    `flask worker` to pick up; "immediate" runs it inline, for tests. Returns
+    a Future, the Job row, or the task's return value respectively.
+
+    Raises:
+        ValueError: If `delay` is given with the "immediate" backend.
+    """
+    func = get_task(name)
+    app = current_app._get_current_object()
+    max_attempts = max_attempts or func.max_attempts
+    payload = json.dumps(kwargs)
+
+    backend = _backend(app)
+    if backend == "immediate":
+        if delay:
+            raise ValueError("The immediate jobs backend can't delay a job")
+        return func(**kwargs)
+    if backend == "thread":
+        future = Future()
+        args = (app, name, json.loads(payload), max_attempts, future)
+        if delay:
+            timer = threading.Timer(delay.total_seconds(), _submit, args)
+            timer.daemon = True
+            timer.start()
+        else:
+            _submit(*args)
+        return future
+
+    job = Job(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=datetime.utcnow() + (delay or timedelta()),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        with _thread_pool_lock:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix="jobs"
+                )
+    return _thread_pool
+
+
+def _submit(app, name, kwargs, max_attempts, future, attempt=1):
+    _get_thread_pool().submit(_run_attempt, app, name, kwargs, max_attempts, future, attempt)
+
+
+def _run_attempt(app, name, kwargs, max_attempts, future, attempt):
+    """
+    One attempt of a thread-backend job. A failed attempt is resubmitted
+    after its backoff by a timer, so waiting for a retry doesn't hold a
+    pool worker; `future` gets the outcome of the last attempt.
+    """
+    with app.app_context():
+        try:
+            result = get_task(name)(**kwargs)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception("Job %s failed (attempt %s)", name, attempt)
+            if attempt == max_attempts:
+                future.set_exception(e)
+                return
+            retry = threading.Timer(
+                backoff(app, attempt).total_seconds(),
+                _submit,
+                (app, name, kwargs, max_attempts, future, attempt + 1),
+            )
+            retry.daemon = True
+            retry.start()
+            return
+    future.set_result(result)
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim_jobs(limit=10, worker=None, now=None):
+    """
+    Lock up to `limit` due jobs for this worker.
+
+    Jobs left "running" longer than JOBS_LOCK_TIMEOUT_SECONDS (a worker
+    died mid-job) are claimed again. On Postgres, SKIP LOCKED lets several
+    workers poll the table without handing out the same job twice.
+    """
+    now = now or datetime.utcnow()
+    stale = now - timedelta(
+        seconds=current_app.config.get("JOBS_LOCK_TIMEOUT_SECONDS", 900)
+    )
+    jobs = (
+        Job.query.filter(
+            or_(
+                (Job.status == "queued") & (Job.run_at <= now),
+                (Job.status == "running") & (Job.locked_at < stale),
+            )
+        )
+        .order_by(Job.run_at, Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in jobs:
+        job.status = "running"
+        job.locked_at = now
+        job.locked_by = worker or worker_id()
+    db.session.commit()
+    return jobs
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome. Returns True on success."""
+    app = current_app._get_current_object()
+    job.attempts += 1
+    # Committed up front so a worker that dies mid-job still uses up an attempt.
+    db.session.commit()
+    try:
+        get_task(job.name)(**job.arguments)
+    except Exception:
+        db.session.rollback()
+        job.last_error = traceback.format_exc()[-4000:]
+        job.locked_at = job.locked_by = None
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = "queued"
+            job.run_at = datetime.utcnow() + backoff(app, job.attempts)
+        db.session.commit()
+        app.logger.warning("Job %s #%s failed (attempt %s)", job.name, job.id, job.attempts)
+        return False
+
+    job.status = "done"
+    job.finished_at = datetime.utcnow()
+    job.locked_at = job.locked_by = None
+    job.last_error = None
+    db.session.commit()
+    return True
+
+
+def work(*, batch=10, poll_interval=2.0, once=False, stop=None):
+    """
+    Worker loop: claim due jobs, run them, sleep when the queue is empty.
+
+    With `once`, returns as soon as no job is due. `stop` is an optional
+    threading.Event for shutting the loop down. Returns the number of jobs run.
+    """
+    worker = worker_id()
+    processed = 0
+    while not (stop and stop.is_set()):
+        jobs = claim_jobs(batch, worker)
+        for job in jobs:
+            run_job(job)
+            processed += 1
+        if not jobs:
+            if once:
+                break
+            time.sleep(poll_interval)
+    return processed
@@ -1,8 +1,8 @@
-import os
+import json
 from datetime import timedelta, datetime
+from functools import lru_cache
 
 from flask import url_for
-from google.cloud import storage
 from sqlalchemy import (
     BigInteger,
     Boolean,
@@ -10,16 +10,35 @@ from sqlalchemy import (
     ForeignKey,
     Integer,
     String,
+    Text,
     DateTime,
     inspect,
 )
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import class_mapper, relationship
+from sqlalchemy.orm import relationship
+from sqlalchemy.orm.util import identity_key
 
+from . import storage
 from .sql_db import db
+from .tools.pagination_tools import (
+    estimated_count,
+    is_searchable,
+    keyset_paginate,
+    search_clause,
+)
+
+
+@lru_cache(maxsize=None)
+def _class_metadata(cls):
+    """Mapper and relationship map for a model class, computed once per class."""
+    mapper = inspect(cls)
+    return mapper, {rel.key: rel for rel in mapper.relationships}
 
-GCS_BUCKET = os.environ.get("GCS_UPLOADS_BUCKET")
-PUBLIC_BASE = f"https://storage.googleapis.com/{GCS_BUCKET}"
+
+def _coerce_id(value):
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
 
 
 class Model:
@@ -121,10 +140,13 @@ class Model:
         - Collection rels (MANYTOMANY / ONETOMANY) append missing items (no removals).
         Pass names in `_replace_collections` to replace instead of append.
         - Columns: booleans set when changed; other columns set when non-None and changed.
+
+        Referenced ids are resolved up front: identity-map hits first, then one
+        SELECT per target model for everything still missing.
         """
+        mapper, rel_map = _class_metadata(type(self))
         with db.session.no_autoflush:
-            mapper = inspect(self.__class__)
-            rel_map = {rel.key: rel for rel in class_mapper(type(self)).relationships}
+            resolved = self._resolve_related_ids(values, rel_map)
 
             for key, incoming in values.items():
                 if key in rel_map:
@@ -135,6 +157,7 @@ class Model:
                         incoming,
                         rel_map[key],
                         mapper,
+                        resolved,
                         replace=(key in _replace_collections),
                     )
                 else:
@@ -143,18 +166,53 @@ class Model:
 
     # ---------- helpers ----------
 
+    @staticmethod
+    def _resolve_related_ids(values, rel_map):
+        """Map target class -> {id: instance} for every id referenced in values."""
+        wanted = {}
+        for key, incoming in values.items():
+            relationship = rel_map.get(key)
+            if relationship is None or not incoming:
+                continue
+            items = incoming if isinstance(incoming, (list, tuple)) else [incoming]
+            if relationship.direction.name == "MANYTOONE":
+                items = items[:1]
+            cls = relationship.mapper.class_
+            ids = wanted.setdefault(cls, set())
+            for item in items:
+                if item is not None and not hasattr(item, "__mapper__"):
+                    ids.add(_coerce_id(item))
+
+        resolved = {}
+        identity_map = db.session.identity_map
+        for cls, ids in wanted.items():
+            found = resolved.setdefault(cls, {})
+            missing = []
+            for id_ in ids:
+                inst = identity_map.get(identity_key(cls, id_))
+                if inst is not None:
+                    found[id_] = inst
+                else:
+                    missing.append(id_)
+            if missing:
+                for inst in cls.query.filter(cls.id.in_(missing)).all():
+                    found[inst.id] = inst
+        return resolved
+
     def _apply_relationship(
-        self, key, incoming, relationship, mapper, *, replace: bool
+        self, key, incoming, relationship, mapper, resolved, *, replace: bool
     ) -> None:
         direction = (
             relationship.direction.name
         )  # 'MANYTOONE' | 'ONETOMANY' | 'MANYTOMANY'
         if direction == "MANYTOONE":
-            self._apply_many_to_one(key, incoming, relationship, mapper)
+            self._apply_many_to_one(key, incoming, relationship, mapper, resolved)
         elif direction in ("MANYTOMANY", "ONETOMANY"):
-            self._apply_collection(key, incoming, relationship, replace=replace)
+            self._apply_collection(
+                key, incoming, relationship, resolved, replace=replace
+            )
 
-    def _resolve_instance(self, relationship, incoming):
+    def _resolve_instance(self, relationship, incoming, resolved):
         """Return ORM instance from id/[id]/instance; None if not found."""
         if hasattr(incoming, "__mapper__"):
             return incoming
@@ -163,10 +221,10 @@ class Model:
         if incoming is None:
             return None
         cls = relationship.mapper.class_
-        return cls.query.filter_by(id=incoming).first()
+        return resolved.get(cls, {}).get(_coerce_id(incoming))
 
-    def _apply_many_to_one(self, key, incoming, relationship, mapper) -> None:
-        inst = self._resolve_instance(relationship, incoming)
+    def _apply_many_to_one(self, key, incoming, relationship, mapper, resolved) -> None:
+        inst = self._resolve_instance(relationship, incoming, resolved)
         if inst is None:
             return
         if getattr(self, key) is not inst:
@@ -177,13 +235,20 @@ class Model:
             if getattr(self, fk_attr, None) != getattr(inst, "id", None):
                 setattr(self, fk_attr, getattr(inst, "id", None))
 
-    def _apply_collection(self, key, incoming, relationship, *, replace: bool) -> None:
+    def _apply_collection(
+        self, key, incoming, relationship, resolved, *, replace: bool
+    ) -> None:
         cls = relationship.mapper.class_
         if incoming and hasattr(incoming[0], "__mapper__"):
             instances = list(incoming)
         else:
             ids = list(incoming) if isinstance(incoming, (list, tuple)) else [incoming]
-            instances = cls.query.filter(cls.id.in_(ids)).all()
+            found = resolved.get(cls, {})
+            instances = [
+                found[_coerce_id(id_)]
+                for id_ in ids
+                if id_ is not None and _coerce_id(id_) in found
+            ]
 
         coll = getattr(self, key)
         if replace:
@@ -225,25 +290,45 @@ class Model:
         # Define this method in each derived class
         raise NotImplementedError
 
-    def get_display_all_data(self, page=1, per_page=100):
+    def get_display_all_data(
+        self, per_page=100, after=None, before=None, search=None, search_mode="prefix"
+    ):
         model_class = type(self)
-        sort_order = getattr(self, "sort_order", "oldest")
-        if sort_order == "newest":
-            ordered_query = self.query.order_by(model_class.id.desc())
-        else:
-            ordered_query = self.query.order_by(model_class.id.asc())
+        descending = getattr(self, "sort_order", "oldest") == "newest"
         searchable_column, table_columns = self.display_all_info()
-        pagination = ordered_query.paginate(
-            page=page, per_page=per_page, error_out=False
+
+        search_path = (
+            getattr(model_class, "searchable_path", None) or searchable_column["field"]
+        )
+        server_search = is_searchable(model_class, search_path)
+
+        query = self.query
+        if search and server_search:
+            query = query.filter(
+                search_clause(model_class, search, search_mode, path=search_path)
+            )
+
+        page = keyset_paginate(
+            query,
+            model_class.id,
+            per_page=per_page,
+            after=after,
+            before=before,
+            descending=descending,
         )
+        if not search:
+            page.total, page.total_is_estimate = estimated_count(model_class)
+
         data = {
             "dispalay_all_url": url_for("editor.display_all", model=self.model_name),
             "title": self.page_title,
             "create_url": url_for("editor.create", model=self.model_name),
             "searchable_column": searchable_column,
+            "server_search": server_search,
+            "search": search or "",
             "table_columns": table_columns,
-            "objects": pagination.items,
-            "pagination": pagination,
+            "objects": page.items,
+            "pagination": page,
             "general_delete_url": url_for("api.delete", model=self.model_name, id=""),
             "download_csv_url": url_for("api.download_csv", model=self.model_name),
             "upload_csv_url": url_for("api.upload_csv_to_db", model=self.model_name),
@@ -313,6 +398,8 @@ class Image(db.Model):
     content_type = Column(String(128))
     size_bytes = Column(BigInteger)
     is_public = Column(Boolean, nullable=False, default=True)
+    # JSON {size name: object key}, filled in by image_tools.generate_derivatives
+    derivatives = Column(Text)
 
     imageable_id = Column(
         Integer, ForeignKey("imageables.imageable_id", ondelete="CASCADE")
@@ -337,19 +424,33 @@ class Image(db.Model):
         db.session.commit()
         return True
 
-    def _blob(self):
-        return storage.Client().bucket(GCS_BUCKET).blob(self.object_key)
+    @property
+    def derivative_keys(self):
+        return json.loads(self.derivatives) if self.derivatives else {}
+
+    def key_for(self, size=None):
+        """Object key of the `size` derivative, or the original until it exists."""
+        if size is None:
+            return self.object_key
+        return self.derivative_keys.get(size, self.object_key)
 
-    def public_url(self):
-        return f"{PUBLIC_BASE}/{self.object_key}"
+    def public_url(self, size=None):
+        return storage.public_url(self.key_for(size))
 
-    def signed_url(self, minutes=5, method="GET"):
-        return self._blob().generate_signed_url(
-            version="v4", expiration=timedelta(minutes=minutes), method=method
+    def signed_url(self, minutes=5, method="GET", size=None):
+        return storage.signed_url(
+            self.key_for(size), lifetime=timedelta(minutes=minutes), method=method
         )
 
-    def url(self):
-        return self.public_url() if self.is_public else self.signed_url()
+    def url(self, size=None):
+        return self.public_url(size) if self.is_public else self.signed_url(size=size)
+
+    @staticmethod
+    def prime_urls(images, size=None):
+        """Sign every private image in one batch so later url() calls hit the cache."""
+        storage.signed_urls(
+            img.key_for(size) for img in images if img is not None and not img.is_public
+        )
 
 
 class Imageable(db.Model):
@@ -19,6 +19,9 @@ from .Association_CoachPlayer import Association_CoachPlayer
 from .Association_PlayerClub import Association_PlayerClub
 from .Association_PlayerLesson import Association_PlayerLesson
 from .Association_PlayerLessonInstance import Association_PlayerLessonInstance
+from .class_occupancy import ClassOccupancy
+from .change_log import ChangeLog
+from .jobs import Job
 
 MODELS = {
     "backend_app": Backend_App,
@@ -43,3 +46,31 @@ MODELS = {
     "association_playerlesson": Association_PlayerLesson,
     "association_playerlessoninstance": Association_PlayerLessonInstance,
 }
+
+__all__ = [
+    "Backend_App",
+    "Club",
+    "CoachLevel",
+    "Coach",
+    "LessonInstance",
+    "Lesson",
+    "Message",
+    "PlayerLevelHistory",
+    "Player",
+    "User",
+    "Presence",
+    "CalendarBlock",
+    "Conversation",
+    "ConversationParticipant",
+    "Association_CoachClub",
+    "Association_CoachLesson",
+    "Association_CoachLessonInstance",
+    "Association_CoachPlayer",
+    "Association_PlayerClub",
+    "Association_PlayerLesson",
+    "Association_PlayerLessonInstance",
+    "ClassOccupancy",
+    "ChangeLog",
+    "Job",
+    "MODELS",
+]
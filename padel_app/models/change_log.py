@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+
+from padel_app.sql_db import db
+
+
+class ChangeLog(db.Model):
+    """
+    Append-only record of writes to the entities /api/app/sync serves.
+
+    `id` is the sync cursor. The scope columns say who may see the change
+    and are captured at write time, so a tombstone can still be routed
+    after its row is gone. Written by tools.sync_tools; never edited.
+    """
+
+    __tablename__ = "change_log"
+    # Ids must never be reused, even after pruning.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    entity = Column(String(40), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # "upsert" or "delete"
+    op = Column(String(10), nullable=False)
+
+    lesson_id = Column(Integer)
+    coach_id = Column(Integer)
+    player_id = Column(Integer)
+    user_id = Column(Integer)
+    conversation_id = Column(Integer)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Date, Text, String, Index
+
+from padel_app.sql_db import db
+
+
+class ClassOccupancy(db.Model):
+    """
+    Derived open-seat index: one row per active lesson (its recurring
+    template) and one per lesson instance. Maintained by
+    tools.occupancy_tools on every flush that touches lessons, instances
+    or their player associations; never edited directly.
+    """
+
+    __tablename__ = "class_occupancy"
+    __table_args__ = (
+        Index("ix_class_occupancy_club_level_start", "club_id", "level_id", "start_datetime"),
+        Index("ix_class_occupancy_lesson_id", "lesson_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False)
+    # NULL for the lesson's own (template) row
+    lesson_instance_id = Column(
+        Integer, ForeignKey("lesson_instances.id", ondelete="CASCADE"), unique=True
+    )
+    club_id = Column(Integer, ForeignKey("clubs.id", ondelete="CASCADE"), nullable=False)
+    level_id = Column(Integer, ForeignKey("coach_levels.id", ondelete="SET NULL"))
+
+    start_datetime = Column(DateTime, nullable=False)
+    end_datetime = Column(DateTime, nullable=False)
+    # Template rows: the lesson's recurrence. Instance rows: the
+    # occurrence they replace.
+    recurrence_rule = Column(Text)
+    recurrence_end = Column(Date)
+    occurrence_date = Column(Date)
+    status = Column(String(20))
+
+    max_players = Column(Integer, nullable=False)
+    participant_count = Column(Integer, nullable=False)
+    open_seats = Column(Integer, nullable=False)
@@ -87,6 +87,9 @@ class Coach(db.Model, model.Model):
     def name_str(self):
         return self.name
 
+    # `name` is a Python property; editor search goes through the user.
+    searchable_path = "user.name"
+
     @classmethod
     def display_all_info(cls):
         searchable_column = {"field": "name", "label": "Name"}
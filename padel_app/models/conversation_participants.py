@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from padel_app.sql_db import db
@@ -8,7 +8,14 @@ from padel_app.tools.input_tools import Block, Field, Form
 
 class ConversationParticipant(db.Model, model.Model):
     __tablename__ = "conversation_participants"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index(
+            "ix_conversation_participants_user_id_conversation_id",
+            "user_id",
+            "conversation_id",
+        ),
+        {"extend_existing": True},
+    )
     page_title = "Conversation Partipants"
     model_name = "ConversationParticipant"
 
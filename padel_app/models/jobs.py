@@ -0,0 +1,36 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+
+from padel_app.sql_db import db
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+class Job(db.Model):
+    """
+    A queued call of a padel_app.jobs task, for JOBS_BACKEND "database".
+    Claimed and run by `flask worker`.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_at", "status", "run_at"),)
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(120), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    # queued -> running -> done, or back to queued until attempts run out
+    status = Column(String(16), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=DEFAULT_MAX_ATTEMPTS)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime)
+    locked_by = Column(String(120))
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    @property
+    def arguments(self):
+        return json.loads(self.payload or "{}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Text, String, Date
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Text, String, Date, Index
 from sqlalchemy.orm import relationship
 
 
@@ -9,7 +9,10 @@ from padel_app.tools.input_tools import Block, Field, Form
 
 class LessonInstance(db.Model, model.Model):
     __tablename__ = "lesson_instances"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_lesson_instances_lesson_id_start", "lesson_id", "start_datetime"),
+        {"extend_existing": True},
+    )
 
     page_title = "Lesson Instances"
     model_name = "LessonInstance"
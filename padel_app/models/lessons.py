@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date, DateTime, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date, DateTime, Boolean, Enum, Index
 from sqlalchemy.orm import relationship
 
 from padel_app.sql_db import db
@@ -8,7 +8,10 @@ from padel_app.tools.input_tools import Block, Field, Form
 
 class Lesson(db.Model, model.Model):
     __tablename__ = "lessons"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_lessons_status_start", "status", "start_datetime"),
+        {"extend_existing": True},
+    )
 
     page_title = "Lessons"
     model_name = "Lesson"
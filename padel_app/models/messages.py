@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from padel_app.sql_db import db
 from padel_app import model
@@ -8,7 +8,10 @@ from padel_app.tools.input_tools import Block, Field, Form
 
 class Message(db.Model, model.Model):
     __tablename__ = "messages"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_messages_conversation_id_sent_at", "conversation_id", "sent_at"),
+        {"extend_existing": True},
+    )
 
     page_title = "Message"
     model_name = "Message"
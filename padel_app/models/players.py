@@ -89,6 +89,9 @@ class Player(db.Model, model.Model):
     def display_name(self):
         return self.name
 
+    # `name` is a Python property; editor search goes through the user.
+    searchable_path = "user.name"
+
     @classmethod
     def display_all_info(cls):
         searchable = {"field": "name", "label": "Name"}
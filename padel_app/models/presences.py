@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 
 from padel_app.sql_db import db
@@ -44,6 +44,7 @@ class Presence(db.Model, model.Model):
             "player_id", "lesson_instance_id",
             name="uq_presence_player_lesson_instance"
         ),
+        Index("ix_presences_lesson_instance_id", "lesson_instance_id"),
     )
 
     @classmethod
@@ -21,6 +21,8 @@ class User(db.Model, model.Model, UserMixin):
     password = Column(String(255), nullable=True)
     is_admin = Column(Boolean, default=False, nullable=False)
     generated_code = Column(Integer)
+    # Signed into calendar feed URLs; replacing it revokes the old URL.
+    calendar_feed_secret = Column(String(43), nullable=True)
 
     user_image_id = Column(Integer, ForeignKey("images.id", ondelete="SET NULL"))
     user_image = relationship("Image", foreign_keys=[user_image_id])
@@ -52,6 +54,9 @@ class User(db.Model, model.Model, UserMixin):
     def user_image_url(self):
         return self.user_image.url() if self.user_image else None
 
+    def avatar_url(self, size):
+        return self.user_image.url(size) if self.user_image else None
+
     def display_all_info(self):
         searchable = {"field": "username", "label": "Username"}
         fields = [
@@ -1,22 +1,25 @@
-from . import (
-    api,
-    auth,
-    editor,
-    main,
-    frontend_api,
-    api_auth,
-    startup,
+import importlib
+
+from . import startup
+
+# Blueprint modules, in registration order, and the app profiles that
+# serve them. Modules are only imported when their profile needs them.
+BLUEPRINTS = (
+    ("main", ("admin", "full")),
+    ("auth", ("admin", "full")),
+    ("api", ("admin", "full")),
+    ("editor", ("admin", "full")),
+    ("frontend_api", ("api", "full")),
+    ("api_auth", ("api", "full")),
 )
 
 
 # Register Blueprints
-def register_blueprints(app):
-    app.register_blueprint(main.bp)
-    app.register_blueprint(auth.bp)
-    app.register_blueprint(api.bp)
-    app.register_blueprint(editor.bp)
-    app.register_blueprint(frontend_api.bp)
-    app.register_blueprint(api_auth.bp)
+def register_blueprints(app, profile="full"):
+    for name, profiles in BLUEPRINTS:
+        if profile in profiles:
+            module = importlib.import_module(f"{__name__}.{name}")
+            app.register_blueprint(module.bp)
     return True
 
 
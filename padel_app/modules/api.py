@@ -1,7 +1,22 @@
-from flask import Blueprint, abort, jsonify, redirect, render_template, request, url_for
-
+import io
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
+
+from padel_app import storage
 from padel_app.model import Image
-from padel_app.tools import tools
+from padel_app.sql_db import db
+from padel_app.tools import batch_tools, query_tools, tools
 from padel_app.models import MODELS
 
 bp = Blueprint("api", __name__, url_prefix="/api")
@@ -76,20 +91,50 @@ def delete(model, id):
     return jsonify(sucess=False)
 
 
+@bp.post("/batch_delete/<model>")
+def batch_delete(model):
+    model_name = model.lower()
+    model_cls = MODELS.get(model_name)
+    if not model_cls:
+        return jsonify(success=False, error=f"Model {model_name} not found"), 404
+
+    data = request.get_json() or {}
+    try:
+        deleted = batch_tools.delete_many(model_cls, data.get("ids") or [])
+    except (TypeError, ValueError):
+        db.session.rollback()
+        return jsonify(success=False, error="ids must be a list of integers"), 400
+
+    db.session.commit()
+    return jsonify(
+        success=True,
+        deleted=deleted,
+        url=url_for("editor.display_all", model=model_name),
+    )
+
+
 @bp.route("/query/<model>", methods=("GET", "POST"))
 def query(model):
     model_name = model.lower()
-    model_cls = MODELS[model_name]
+    model_cls = MODELS.get(model_name)
+    if not model_cls:
+        return jsonify(success=False, error=f"Model {model_name} not found"), 404
 
-    instances = model_cls.query.all()
+    if request.is_json:
+        args = request.get_json() or {}
+    else:
+        args = request.args.to_dict()
+        args["where"] = request.args.getlist("where")
 
-    def serialize(instance):
-        return {
-            column.name: getattr(instance, column.name)
-            for column in instance.__table__.columns
-        }
+    try:
+        spec = query_tools.parse_query_spec(
+            model_cls, args, max_limit=current_app.config.get("API_QUERY_MAX_ROWS", 1000)
+        )
+    except query_tools.QueryError as e:
+        return jsonify(success=False, error=str(e)), 400
 
-    return jsonify([serialize(instance) for instance in instances])
+    body = query_tools.stream_query(model_cls, spec, current_app.json.dumps)
+    return Response(stream_with_context(body), mimetype="application/json")
 
 
 @bp.route("/remove_relationship", methods=("GET", "POST"))
@@ -114,6 +159,26 @@ def remove_relationship():
     return jsonify(sucess=True)
 
 
+@bp.post("/remove_relationships")
+def remove_relationships():
+    data = request.get_json() or {}
+
+    model = MODELS.get((data.get("model_name1") or "").lower())
+    if not model:
+        return jsonify(success=False, error="Model not found"), 404
+
+    try:
+        removed = batch_tools.remove_relationships(
+            model, data.get("field_name"), data.get("pairs") or []
+        )
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify(success=False, error=str(e)), 400
+
+    db.session.commit()
+    return jsonify(success=True, removed=removed)
+
+
 @bp.route("/modal_create_page/<model>", methods=("GET", "POST"))
 def modal_create_page(model):
     model_name = model.lower()
@@ -133,20 +198,40 @@ def modal_create_page(model):
 @bp.route("/download_csv/<model>", methods=["GET", "POST"])
 def download_csv(model):
     model_name = model.lower()
-    model = MODELS[model_name]
-    filepath = tools.create_csv_for_model(model)
-    return filepath
+    model = MODELS.get(model_name)
+    if not model:
+        return jsonify(success=False, error=f"Model {model_name} not found"), 404
+
+    columns = [c for c in request.args.get("columns", "").split(",") if c]
+    compress = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+    try:
+        tools.csv_columns(model, columns)
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    filename = f"{model_name}.csv.gz" if compress else f"{model_name}.csv"
+    body = tools.stream_csv_for_model(model, columns=columns, compress=compress)
+    return Response(
+        stream_with_context(body),
+        mimetype="application/gzip" if compress else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @bp.route("/upload_csv_to_db/<model>", methods=["GET", "POST"])
 def upload_csv_to_db(model):
     model_name = model
-    model = MODELS[model_name]
-    check = tools.upload_csv_to_model(model)
-    if check:
-        return jsonify(url_for("editor.display_all", model=model_name))
-    else:
-        return jsonify(sucess=False)
+    model = MODELS.get(model_name.lower())
+    if not model:
+        return jsonify(success=False, error=f"Model {model_name} not found"), 404
+
+    upload = request.files.get("file")
+    fileobj = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="") if upload else None
+    result = tools.upload_csv_to_model(model, fileobj)
+
+    if result.errors:
+        return jsonify(success=False, **result.to_dict()), 422
+    return jsonify(url_for("editor.display_all", model=model_name))
 
 
 @bp.get("/image/<int:image_id>")
@@ -155,5 +240,10 @@ def image_by_id(image_id):
     if not img:
         abort(404)
     resp = redirect(img.url(), code=302)
-    resp.headers["Cache-Control"] = "public, max-age=86400"
+    if img.is_public:
+        resp.headers["Cache-Control"] = "public, max-age=86400"
+    else:
+        # The redirect target is a signed URL; don't outlive its signature.
+        max_age = int(storage.SIGNED_URL_MARGIN.total_seconds())
+        resp.headers["Cache-Control"] = f"private, max-age={max_age}"
     return resp
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required
 from werkzeug.security import check_password_hash
 
+from padel_app.identity import current_identity
 from padel_app.models import User
 
 bp = Blueprint("auth_api", __name__, url_prefix="/api/auth")
@@ -36,13 +37,12 @@ def login():
 @bp.get("/me")
 @jwt_required()
 def me():
-    user_id = int(get_jwt_identity())
-    user = User.query.get_or_404(user_id)
+    identity = current_identity()
 
     return jsonify({
-        "id": user.id,
-        "username": user.username,
-        "name": user.name,
-        "roles": ["coach"] if user.coach else ["player"],
-        "coachId": user.coach.id if user.coach else None,
+        "id": identity.user_id,
+        "username": identity.username,
+        "name": identity.name,
+        "roles": identity.roles,
+        "coachId": identity.coach_id,
     })
\ No newline at end of file
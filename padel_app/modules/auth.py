@@ -77,7 +77,7 @@ def forgot_password():
                 generated_code=generated_code,
             )
 
-            email_tools.send_email("Authentication code", [email], html=mail_body)
+            email_tools.queue_email("Authentication code", [email], html=mail_body)
 
             return redirect(url_for("auth.verify_generated_code", user_id=user.id))
 
@@ -118,7 +118,7 @@ def generate_new_code(user_id):
     mail_body = render_template(
         "messages/forgot_password_email.html", user=user, generated_code=generated_code
     )
-    email_tools.send_email("Código autenticação", [email], html=mail_body)
+    email_tools.queue_email("Código autenticação", [email], html=mail_body)
     return redirect(url_for("auth.verify_generated_code", user_id=user.id))
 
 
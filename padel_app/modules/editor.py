@@ -1,6 +1,7 @@
-from flask import Blueprint, redirect, render_template, request, url_for, jsonify
+from flask import Blueprint, current_app, redirect, render_template, request, url_for, jsonify
 
 from padel_app.models import Backend_App, MODELS
+from padel_app.sql_db import pool_status
 from padel_app.tools import auth_tools
 from padel_app.tools.documentation_tools import build_models_doc
 
@@ -21,13 +22,18 @@ def index():
 
 @bp.route("/display/<model>", methods=("GET", "POST"))
 def display_all(model):
-    page_num = request.args.get("page", 1, type=int)
     per_page = 100
 
     page = f"editor_{model}_all"
     model = MODELS[model.lower()]
     empty_instance = model()
-    data = empty_instance.get_display_all_data(page=page_num, per_page=per_page)
+    data = empty_instance.get_display_all_data(
+        per_page=per_page,
+        after=request.args.get("after", type=int),
+        before=request.args.get("before", type=int),
+        search=request.args.get("q", "").strip() or None,
+        search_mode=current_app.config.get("EDITOR_SEARCH_MODE", "prefix"),
+    )
 
     return render_template("editor/display_all.html", page=page, data=data)
 
@@ -69,3 +75,8 @@ def documentation():
         page="editor_documentation",
         data={"models": models_doc},
     )
+
+
+@bp.route("/metrics", methods=("GET",))
+def metrics():
+    return jsonify({"pool": pool_status()})
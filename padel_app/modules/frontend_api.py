@@ -1,33 +1,48 @@
-from flask import Blueprint, jsonify, request, abort, g, Response
+from flask import Blueprint, current_app, jsonify, request, abort, Response, url_for
 from datetime import datetime, timezone, time, timedelta
 from dateutil import parser
 import json
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func, or_
-
-from padel_app.sql_db import db
+from sqlalchemy.orm import selectinload
+
+from padel_app.sql_db import db, replica_read
+from padel_app.identity import (
+    current_club,
+    current_coach,
+    current_identity,
+    current_player,
+    current_user,
+)
+from padel_app.model import Image
 from padel_app.models import *
+from padel_app.models import Association_PlayerClub
 from padel_app.tools.request_adapter import JsonRequestAdapter
 from padel_app.tools.calendar_tools import build_datetime
 
 from padel_app.serializers.calendar_event import serialize_calendar_event
+from padel_app.serializers.fields import nested, pick, requested_fields, wants
 from padel_app.serializers.lesson import (
+    class_instance_options,
+    lesson_options,
     serialize_lesson,
     serialize_lesson_instance,
     serialize_class_instance
 )
-from padel_app.serializers.user import serialize_user
+from padel_app.serializers.user import serialize_user, user_options
 from padel_app.serializers.presence import serialize_presence
 from padel_app.serializers.calendar import serialize_calendar_block
 from padel_app.serializers.message import serialize_message
 from padel_app.serializers.conversation import serialize_conversation_detail, serialize_conversation
 from padel_app.serializers.coach_level import serialize_coach_level
 from padel_app.helpers.calendar_helpers import (
+    lessons_for_coach_query,
+    lessons_for_player_query,
     load_lessons_for_coach, 
     load_lesson_instances_for_coach,
-    load_lessons_for_player,
-    load_lesson_instances_for_player,
+    load_player_calendar_instances,
     build_lesson_events, 
+    build_lesson_occurrence_events,
     load_calendar_blocks_for_user, 
     build_block_events
 )
@@ -43,6 +58,36 @@ from padel_app.helpers.lesson_services import (
     add_presences
 )
 from padel_app.helpers.dashboard_services import build_dashboard_payload
+from padel_app.helpers.ics_helpers import (
+    calendar_feed_response,
+    feed_token,
+    feed_token_required,
+    reset_feed_secret,
+)
+from padel_app.helpers.version_helpers import (
+    calendar_version,
+    coach_levels_version,
+    conversations_version,
+    players_version,
+)
+from padel_app.helpers.availability_helpers import (
+    coach_availability,
+    find_conflicts,
+    players_availability,
+    players_outside_roster,
+    serialize_slot,
+)
+from padel_app.tools.availability_tools import daily_windows
+from padel_app.tools.occupancy_tools import search_open_classes
+from padel_app.tools.query_tools import QueryError
+from padel_app.tools.http_cache_tools import cache_policy
+from padel_app.tools.subrequest_tools import BatchError, dispatch_batch, parse_subrequests
+from padel_app.tools.sync_tools import SyncReset, changes_since, latest_cursor
+from padel_app.tools.calendar_tools import expand_occurrences
+from padel_app.helpers.dashboard.messages import (
+    conversations_for_user_query,
+    unread_messages_query,
+)
 from padel_app.helpers.player_services import create_player_helper, edit_player_helper
 from padel_app.realtime import publish, subscribe, unsubscribe
 
@@ -67,38 +112,6 @@ def events():
 # Helpers
 # -------------------------------------------------------------------
 
-def current_user():
-    if 'current_user' not in g:
-        user_id = get_jwt_identity()
-        if user_id is None:
-            abort(401, "Missing or invalid JWT")
-
-        g.current_user = (
-            User.query.get_or_404(int(user_id))
-        )
-    return g.current_user
-
-def current_coach():
-    if 'current_coach' not in g:
-        user = current_user()
-        if not user.coach:
-            g.current_coach = None
-        g.current_coach = user.coach
-    return g.current_coach
-
-def current_player():
-    if 'current_player' not in g:
-        user = current_user()
-        if not user.player:
-            g.current_player = None
-        g.current_player = user.player
-    return g.current_player
-
-def current_club():
-    coach = current_coach()
-    return coach.current_club
-
-
 def get_or_materialize_instance(lesson: Lesson, date: datetime.date):
     instance = LessonInstance.query.filter_by(
         lesson_id=lesson.id,
@@ -138,27 +151,21 @@ def get_or_materialize_instance(lesson: Lesson, date: datetime.date):
 
 @bp.get("/messages/unread_count")
 @jwt_required()
+@replica_read
 def unread_total():
 
-    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
     user_id = int(get_jwt_identity())
 
-    CP = ConversationParticipant
-    M = Message
-
-    unread = (
-        db.session.query(func.count(M.id))
-        .join(CP, CP.conversation_id == M.conversation_id)
-        .filter(CP.user_id == user_id)
-        .filter(M.sender_id != user_id)
-        .filter(M.sent_at > func.coalesce(CP.last_read_at, epoch))
-        .scalar()
-    )
+    unread = unread_messages_query(
+        func.count(Message.id), user_id=user_id
+    ).scalar()
 
     return jsonify({"unreadCount": int(unread or 0)})
 
 @bp.get("/calendar")
 @jwt_required()
+@replica_read
+@cache_policy(calendar_version)
 def calendar():
     start = request.args.get("from")
     end = request.args.get("to")
@@ -172,45 +179,87 @@ def calendar():
 
     range_start = parser.isoparse(start).astimezone(timezone.utc)
     range_end = parser.isoparse(end).astimezone(timezone.utc)
+    fields = requested_fields()
 
+    presence = None
     if coach is not None:
-        lessons = load_lessons_for_coach(coach.id, range_start, range_end)
+        lessons = lessons_for_coach_query(coach.id, range_start, range_end)
         instances_by_key = load_lesson_instances_for_coach(coach.id, range_start, range_end)
     elif player is not None:
-        lessons = load_lessons_for_player(player.id, range_start, range_end)
-        instances_by_key = load_lesson_instances_for_player(player.id, range_start, range_end)
+        lessons = lessons_for_player_query(player.id, range_start, range_end)
+        instances_by_key, presence = load_player_calendar_instances(
+            player.id, range_start, range_end
+        )
     else:
         abort(403, "User has no coach or player profile")
 
-    lesson_events = build_lesson_events(
+    if current_app.config.get("CALENDAR_SQL_EXPANSION", False):
+        build_events = build_lesson_occurrence_events
+    else:
+        build_events = build_lesson_events
+        lessons = lessons.all()
+
+    lesson_events = build_events(
         lessons,
         instances_by_key,
         range_start,
         range_end,
+        presence=presence,
+        fields=fields,
     )
 
     blocks = load_calendar_blocks_for_user(user.id, range_start, range_end)
-    block_events = build_block_events(blocks, range_start, range_end)
+    block_events = build_block_events(blocks, range_start, range_end, fields=fields)
 
     return jsonify(lesson_events + block_events)
 
+@bp.get("/calendar/feed")
+@jwt_required()
+def calendar_feed_url():
+    """Subscription URL of the caller's iCalendar feed."""
+    token = feed_token(current_user())
+    return jsonify({"url": url_for(".calendar_feed", token=token, _external=True)})
+
+@bp.post("/calendar/feed/reset")
+@jwt_required()
+def reset_calendar_feed():
+    """Revoke the caller's feed URL and return a new one."""
+    user = current_user()
+    reset_feed_secret(user)
+    token = feed_token(user)
+    return jsonify({"url": url_for(".calendar_feed", token=token, _external=True)})
+
+@bp.get("/calendar/feed/<token>.ics")
+@replica_read
+@feed_token_required
+@cache_policy(calendar_version, vary=())
+def calendar_feed(token):
+    return calendar_feed_response()
+
 @bp.get("/lesson_instance/<int:instance_id>")
 def lesson_instance_detail(instance_id):
     instance = LessonInstance.query.get_or_404(instance_id)
+    fields = requested_fields()
 
-    presences = Presence.query.filter_by(
-        lesson_instance_id=instance.id
-    ).all()
+    data = {}
+    if wants(fields, "lessonInstance"):
+        data["lessonInstance"] = serialize_lesson_instance(
+            instance, nested(fields, "lessonInstance")
+        )
+    if wants(fields, "presences"):
+        presences = Presence.query.filter_by(
+            lesson_instance_id=instance.id
+        ).all()
+        data["presences"] = [
+            serialize_presence(p, nested(fields, "presences")) for p in presences
+        ]
 
-    return jsonify({
-        "lessonInstance": serialize_lesson_instance(instance),
-        "presences": [serialize_presence(p) for p in presences],
-    })
+    return jsonify(data)
 
 @bp.get("/register/user/<user_id>")
 def get_user_for_registration(user_id):
     user = User.query.get_or_404(user_id)
-    return jsonify(serialize_user(user))
+    return jsonify(serialize_user(user, requested_fields()))
 
 @bp.post("/activate/user/<user_id>")
 def activate_user(user_id):
@@ -231,6 +280,7 @@ def activate_user(user_id):
 
 @bp.get("/dashboard")
 @jwt_required()
+@replica_read
 def dashboard():
     user = current_user()
     coach = current_coach()
@@ -241,30 +291,43 @@ def dashboard():
     
 @bp.get("/conversations")
 @jwt_required()
+@replica_read
+@cache_policy(conversations_version)
 def conversations():
     user = current_user()
     if not user.id:
         abort(400, "user_id is required")
 
+    fields = requested_fields()
+    avatars = wants(fields, "participantAvatar")
+    participants = (
+        selectinload(Conversation.participants)
+        .selectinload(ConversationParticipant.user)
+    )
     conversations = (
-        Conversation.query
-        .join(ConversationParticipant)
-        .filter(ConversationParticipant.user_id == user.id)
+        conversations_for_user_query(user_id=user.id)
+        .options(participants.selectinload(User.user_image) if avatars else participants)
         .all()
     )
+    if avatars:
+        Image.prime_urls(
+            (p.user.user_image for c in conversations for p in c.participants),
+            size="thumb",
+        )
 
     return jsonify([
-        serialize_conversation(c, user.id)
+        serialize_conversation(c, user.id, fields)
         for c in conversations
     ])
     
 @bp.get("/conversation/<int:conversation_id>")
 @jwt_required()
+@replica_read
 def conversation_detail(conversation_id):
     user = current_user()
     conversation = Conversation.query.get_or_404(conversation_id)
     return jsonify(
-        serialize_conversation_detail(conversation, user.id)
+        serialize_conversation_detail(conversation, user.id, requested_fields())
     )
     
 @bp.post("/conversation/<int:conversation_id>/read")
@@ -290,13 +353,16 @@ def mark_conversation_read(conversation_id):
 @jwt_required()
 def coach_detail():
     coach = current_coach()
-    return jsonify({
-        "id": coach.id,
-        "user": serialize_user(coach.user),
-    })
+    fields = requested_fields()
+    data = {"id": coach.id}
+    if wants(fields, "user"):
+        data["user"] = serialize_user(coach.user, nested(fields, "user"))
+    return jsonify(pick(data, fields))
     
 @bp.get("/players")
 @jwt_required()
+@replica_read
+@cache_policy(players_version)
 def players():
     coach = current_coach()
     club = current_club()
@@ -325,17 +391,24 @@ def players():
 @jwt_required()
 def users():
 
-    users = User.query.filter_by(
-        status="active"
-    ).all()
+    fields = requested_fields()
+    users = (
+        User.query.filter_by(status="active")
+        .options(*user_options(fields))
+        .all()
+    )
+    if wants(fields, "avatarUrl"):
+        Image.prime_urls((u.user_image for u in users), size="medium")
 
     return jsonify([
-        serialize_user(u)
+        serialize_user(u, fields)
         for u in users
     ])
     
 @bp.get("/coach_players")
 @jwt_required()
+@replica_read
+@cache_policy(players_version)
 def coach_players():
     coach = current_coach()
     
@@ -350,26 +423,31 @@ def coach_players():
     
 @bp.get("/coach_levels")
 @jwt_required()
+@replica_read
+@cache_policy(coach_levels_version)
 def coach_levels():
     coach = current_coach()
+    fields = requested_fields()
     return jsonify(
         [
-            serialize_coach_level(l) 
+            serialize_coach_level(l, fields)
             for l in coach.levels
             ]
         )
     
 @bp.get("/lessons")
 def lessons():
+    fields = requested_fields()
     return jsonify([
-        serialize_lesson(lesson)
-        for lesson in Lesson.query.all()
+        serialize_lesson(lesson, fields)
+        for lesson in Lesson.query.options(*lesson_options(fields)).all()
     ])
     
 @bp.get("/calendar_block")
 def calendar_block():
+    fields = requested_fields()
     return jsonify([
-        serialize_calendar_block(calendar_block)
+        serialize_calendar_block(calendar_block, fields)
         for calendar_block in CalendarBlock.query.all()
     ])
 
@@ -399,18 +477,247 @@ def lesson_instances():
         instances_by_key,
         range_start,
         range_end,
+        fields=requested_fields(),
     )
     
     return lesson_events
     
+@bp.get("/availability")
+@jwt_required()
+@replica_read
+def availability():
+    """
+    Free slots of at least `length` minutes for the coach (and, with
+    playerIds, those players too) between `from` and `to`, optionally
+    limited to dayStart-dayEnd (HH:MM, UTC) each day.
+    """
+    start = request.args.get("from")
+    end = request.args.get("to")
+    coach = current_coach()
+
+    if not coach:
+        abort(403, "User is not a coach")
+
+    if not start or not end:
+        abort(400, "from and to are required")
+
+    try:
+        length = int(request.args.get("length", 60))
+        day_start = request.args.get("dayStart")
+        day_end = request.args.get("dayEnd")
+        day_start = datetime.strptime(day_start, "%H:%M").time() if day_start else None
+        day_end = datetime.strptime(day_end, "%H:%M").time() if day_end else None
+        player_ids = [int(p) for p in request.args.getlist("playerIds")]
+    except ValueError:
+        abort(400, "length must be minutes, dayStart/dayEnd HH:MM, playerIds integers")
+    if length <= 0:
+        abort(400, "length must be positive")
+    if players_outside_roster(coach.id, player_ids):
+        abort(403, "Players are not linked to this coach")
+
+    range_start = parser.isoparse(start).astimezone(timezone.utc)
+    range_end = parser.isoparse(end).astimezone(timezone.utc)
+
+    busy = coach_availability(coach.id, current_user().id, range_start, range_end)
+    for schedule in players_availability(player_ids, range_start, range_end).values():
+        busy = busy.union(schedule)
+
+    slots = [
+        serialize_slot(s, e)
+        for lo, hi in daily_windows(range_start, range_end, day_start, day_end)
+        for s, e in busy.free_slots(lo, hi, length)
+    ]
+    return jsonify({"length": length, "freeSlots": slots})
+
+
+@bp.post("/availability/conflicts")
+@jwt_required()
+@replica_read
+def availability_conflicts():
+    """
+    Conflicts of a proposed class (same fields as /add_class) with the
+    coach's and its players' calendars, one entry per clashing occurrence.
+    Open-ended recurrences are checked AVAILABILITY_HORIZON_WEEKS ahead.
+    """
+    data = request.get_json() or {}
+    coach = current_coach()
+
+    if not coach:
+        abort(403, "User is not a coach")
+
+    try:
+        first_start = datetime.strptime(
+            f"{data['date']} {data['startTime']}", "%Y-%m-%d %H:%M"
+        ).replace(tzinfo=timezone.utc)
+        first_end = datetime.strptime(
+            f"{data['date']} {data['endTime']}", "%Y-%m-%d %H:%M"
+        ).replace(tzinfo=timezone.utc)
+        end_date = data.get("endDate")
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+    except (KeyError, TypeError, ValueError):
+        abort(400, "date, startTime and endTime are required")
+
+    try:
+        player_ids = [int(p) for p in data.get("playerIds") or []]
+    except (TypeError, ValueError):
+        abort(400, "playerIds must be integers")
+    if players_outside_roster(coach.id, player_ids):
+        abort(403, "Players are not linked to this coach")
+
+    duration = int((first_end - first_start).total_seconds() // 60)
+    if duration <= 0:
+        abort(400, "endTime must be after startTime")
+
+    horizon_weeks = current_app.config.get("AVAILABILITY_HORIZON_WEEKS", 12)
+    horizon = first_start + timedelta(weeks=horizon_weeks)
+    if end_date:
+        horizon = min(
+            horizon, datetime.combine(end_date, time.max).replace(tzinfo=timezone.utc)
+        )
+
+    recurrence_rule = data.get("recurrenceRule") if data.get("isRecurring") else None
+    occurrences = expand_occurrences(
+        first_start,
+        json.dumps(recurrence_rule) if recurrence_rule else None,
+        end_date,
+        first_start,
+        horizon,
+    )
+
+    range_end = horizon + timedelta(minutes=duration)
+    schedules = {
+        "coach": coach_availability(coach.id, current_user().id, first_start, range_end)
+    }
+    player_schedules = players_availability(player_ids, first_start, range_end)
+    schedules.update(
+        {f"player-{pid}": schedule for pid, schedule in player_schedules.items()}
+    )
+
+    return jsonify({
+        "occurrences": len(occurrences),
+        "conflicts": find_conflicts(occurrences, duration, schedules),
+    })
+
+
+@bp.get("/open_classes")
+@jwt_required()
+@replica_read
+def open_classes():
+    """
+    Classes with free seats in one of the caller's clubs between `from`
+    and `to`, across all coaches, optionally for one levelId and with at
+    least minSeats seats. Paginated with limit/cursor.
+    """
+    start = request.args.get("from")
+    end = request.args.get("to")
+    if not start or not end:
+        abort(400, "from and to are required")
+
+    try:
+        club_id = request.args.get("clubId", type=int)
+        level_id = request.args.get("levelId", type=int)
+        min_seats = int(request.args.get("minSeats", 1))
+        limit = min(int(request.args.get("limit", 20)), 100)
+        range_start = parser.isoparse(start).astimezone(timezone.utc)
+        range_end = parser.isoparse(end).astimezone(timezone.utc)
+    except ValueError:
+        abort(400, "from/to must be ISO datetimes, minSeats and limit integers")
+    if limit <= 0 or min_seats <= 0:
+        abort(400, "minSeats and limit must be positive")
+
+    identity = current_identity()
+    club_ids = {identity.club_id} if identity.club_id else set()
+    if identity.player_id:
+        club_ids.update(
+            cid for (cid,) in db.session.query(Association_PlayerClub.club_id)
+            .filter(Association_PlayerClub.player_id == identity.player_id)
+        )
+    if club_id is None:
+        if len(club_ids) != 1:
+            abort(400, "clubId is required")
+        club_id = next(iter(club_ids))
+    elif club_id not in club_ids:
+        abort(403, "Not a member of this club")
+
+    try:
+        items, next_cursor = search_open_classes(
+            club_id,
+            range_start,
+            range_end,
+            level_id=level_id,
+            min_seats=min_seats,
+            limit=limit,
+            cursor=request.args.get("cursor"),
+        )
+    except QueryError as e:
+        abort(400, str(e))
+    return jsonify({"items": items, "nextCursor": next_cursor})
+
+
+@bp.post("/batch")
+@jwt_required()
+def batch():
+    """
+    Several API calls in one round trip, e.g. the app's startup reads.
+
+    Body: {"requests": [{"id", "method", "path", "query", "body"}, ...],
+    "parallel": bool}. Sub-requests run as the caller and share its
+    identity; with `parallel`, GETs run concurrently. Returns
+    {"responses": [{"id", "status", "body"}, ...]} in request order.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        subrequests = parse_subrequests(
+            payload.get("requests"), current_app.config.get("BATCH_MAX_REQUESTS", 20)
+        )
+    except BatchError as e:
+        abort(400, str(e))
+
+    responses = dispatch_batch(
+        subrequests, identity=current_identity(), parallel=bool(payload.get("parallel"))
+    )
+    return jsonify({"responses": responses})
+
+
+@bp.get("/sync")
+@jwt_required()
+def sync():
+    """
+    Lessons, instances, presences, blocks, messages and roster links the
+    caller can see that changed since the `since` cursor, deletions as
+    ids. Without `since` only the current cursor is returned, for a
+    client that has just loaded everything. 410 means the cursor is too
+    old and the client must reload.
+    """
+    since = request.args.get("since")
+    if since is None:
+        return jsonify({"cursor": str(latest_cursor()), "changes": {}, "hasMore": False})
+    try:
+        since = int(since)
+    except ValueError:
+        abort(400, "since must be a cursor returned by /sync")
+
+    try:
+        changes, cursor, has_more = changes_since(
+            current_identity(),
+            since,
+            limit=current_app.config.get("SYNC_PAGE_SIZE", 500),
+            settle=timedelta(seconds=current_app.config.get("SYNC_SETTLE_SECONDS", 2)),
+        )
+    except SyncReset:
+        abort(410, "Cursor expired, reload and sync from the new cursor")
+    return jsonify({"cursor": str(cursor), "changes": changes, "hasMore": has_more})
+
+
 @bp.get("/lesson_instance/<int:instance_id>/presences")
 def lesson_instance_presences(instance_id):
     presences = Presence.query.filter_by(
         lesson_instance_id=instance_id
     ).all()
+    fields = requested_fields()
 
     return jsonify([
-        serialize_presence(p) for p in presences
+        serialize_presence(p, fields) for p in presences
     ])
 
 @bp.get("/calendar_event")
@@ -428,7 +735,7 @@ def calendar_event():
 
     current_event = event_types[model].query.get_or_404(id)
 
-    return jsonify(serialize_calendar_event(current_event))
+    return jsonify(serialize_calendar_event(current_event, fields=requested_fields()))
 
 @bp.post("/class_instance")
 @jwt_required()
@@ -443,9 +750,14 @@ def class_instance():
     if not model:
         abort(400, "model is required")
 
-    current_class = event_types[model].query.get_or_404(id)
+    fields = requested_fields()
+    current_class = (
+        event_types[model].query
+        .options(*class_instance_options(event_types[model], fields))
+        .get_or_404(id)
+    )
 
-    return jsonify(serialize_class_instance(current_class))
+    return jsonify(serialize_class_instance(current_class, fields))
 # -------------------------------------------------------------------
 # CREATE
 # -------------------------------------------------------------------
@@ -822,8 +1134,6 @@ def update_lesson_status(lesson_id):
 
 @bp.post("/edit_class")
 def edit_class():
-    from datetime import datetime, timedelta
-
     data = request.get_json() or {}
 
     event = data.get("event")
@@ -841,8 +1151,6 @@ def edit_class():
         - Edit the (possibly duplicated) series lesson with edit_lesson_helper
         Returns: (lesson_to_edit, from_date)
         """
-        from datetime import datetime, timedelta, time
-
         from_date = new_date or event_date  # boundary where "future" starts
         from_dt = datetime.combine(from_date, time.min)
 
@@ -978,8 +1286,6 @@ def edit_class():
 
 @bp.post("/remove_class")
 def remove_class():
-    from datetime import datetime, timedelta
-
     data = request.get_json() or {}
 
     models = {
@@ -1,7 +1,8 @@
 import json
 from padel_app.tools.tools import iso_date
+from padel_app.serializers.fields import pick
 
-def serialize_calendar_block(block):
+def serialize_calendar_block(block, fields=None):
     recurrence_rule = None
     if block.recurrence_rule:
         try:
@@ -9,7 +10,7 @@ def serialize_calendar_block(block):
         except (TypeError, ValueError):
             recurrence_rule = None
 
-    return {
+    return pick({
         "id": block.id,
         "userId": block.user_id,
         "type": block.type,
@@ -36,4 +37,4 @@ def serialize_calendar_block(block):
             if block.end_datetime
             else None
         ),
-    }
+    }, fields)
@@ -1,6 +1,7 @@
 from datetime import datetime, date
 from typing import Optional, Union
 from padel_app.tools.calendar_tools import _format_date, _format_time
+from padel_app.serializers.fields import pick, wants
 
 def _compute_status(
     start_dt: datetime,
@@ -26,7 +27,7 @@ def _compute_status(
 
     return "completed" if event_date < date.today() else "scheduled"
 
-def serialize_calendar_event(obj, *, override_id: str | None = None, override_date: str | None = None) -> dict:
+def serialize_calendar_event(obj, *, override_id: str | None = None, override_date: str | None = None, fields=None) -> dict:
     """
     Serialize LessonInstance, Lesson or CalendarBlock into a CalendarEvent-compatible dict.
     """
@@ -53,15 +54,16 @@ def serialize_calendar_event(obj, *, override_id: str | None = None, override_da
             {
                 "type": "class",
                 "classType": lesson.type,
-                "participantCount": len(obj.players_relations),
                 "maxPlayers": obj.max_players,
                 "color": lesson.color,
                 "levelId": obj.level_id or lesson.default_level_id,
                 "isRecurring": True if lesson.recurrence_rule else False
             }
         )
+        if wants(fields, "participantCount"):
+            event["participantCount"] = len(obj.players_relations)
 
-        return event
+        return pick(event, fields)
 
     # --- Lesson ---
     if obj.model_name == "Lesson":
@@ -70,14 +72,15 @@ def serialize_calendar_event(obj, *, override_id: str | None = None, override_da
                 "type": "class",
                 "classType": obj.type,
                 "maxPlayers": obj.max_players,
-                "participantCount": len(obj.players_relations),
                 "color": obj.color,
                 "levelId": obj.default_level_id,
                 "isRecurring": True if obj.recurrence_rule else False
             }
         )
+        if wants(fields, "participantCount"):
+            event["participantCount"] = len(obj.players_relations)
 
-        return event
+        return pick(event, fields)
 
     # --- CalendarBlock ---
     if obj.model_name == "CalendarBlock":
@@ -89,7 +92,7 @@ def serialize_calendar_event(obj, *, override_id: str | None = None, override_da
             }
         )
 
-        return event
+        return pick(event, fields)
 
     # --- Safety net ---
     raise ValueError(f"Unsupported calendar model: {obj.model_name}")
@@ -1,9 +1,13 @@
+from padel_app.serializers.fields import nested, pick, wants
 from padel_app.serializers.user import serialize_user
 
 
-def serialize_coach(coach):
-    return {
+def serialize_coach(coach, fields=None):
+    data = {
         "id": coach.id,
         "userId": coach.user_id,
-        "user": serialize_user(coach.user),
-    }
\ No newline at end of file
+    }
+    if wants(fields, "user"):
+        data["user"] = serialize_user(coach.user, nested(fields, "user"))
+
+    return pick(data, fields)
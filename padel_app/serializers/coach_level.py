@@ -1,8 +1,11 @@
-def serialize_coach_level(l):
-    return {
+from padel_app.serializers.fields import pick
+
+
+def serialize_coach_level(l, fields=None):
+    return pick({
         "id": str(l.id),
         "coachId": l.coach_id,
         "code": l.code,
         "label": l.label,
         "displayOrder": l.display_order,
-    }
\ No newline at end of file
+    }, fields)
@@ -1,6 +1,7 @@
+from padel_app.serializers.fields import nested, pick, wants
 from padel_app.serializers.message import serialize_message
 
-def serialize_conversation(conversation, user_id):
+def serialize_conversation(conversation, user_id, fields=None):
     messages = sorted(conversation.messages, key=lambda m: m.sent_at)
     last_message = messages[-1] if messages else None
 
@@ -24,11 +25,10 @@ def serialize_conversation(conversation, user_id):
         and (not last_read_at or m.sent_at > last_read_at)
     )
 
-    return {
+    data = {
         "id": conversation.id,
         "participantId": participant.id,
         "participantName": participant.name,
-        "participantAvatar": getattr(participant, "avatar_url", None),
 
         "lastMessage": last_message.text if last_message else None,
         "lastMessageAt": (
@@ -39,14 +39,18 @@ def serialize_conversation(conversation, user_id):
 
         "unreadCount": unread_count,
     }
+    if wants(fields, "participantAvatar"):
+        data["participantAvatar"] = participant.avatar_url("thumb")
 
-def serialize_conversation_detail(conversation, user_id):
-    last_read_at = conversation.last_read_by(user_id)
+    return pick(data, fields)
 
-    return {
-        **serialize_conversation(conversation, user_id),
-        "messages": [
-            serialize_message(m, last_read_at)
+def serialize_conversation_detail(conversation, user_id, fields=None):
+    data = serialize_conversation(conversation, user_id, fields)
+    if wants(fields, "messages"):
+        last_read_at = conversation.last_read_by(user_id)
+        data["messages"] = [
+            serialize_message(m, last_read_at, nested(fields, "messages"))
             for m in sorted(conversation.messages, key=lambda m: m.sent_at)
-        ],
-    }
+        ]
+
+    return data
@@ -0,0 +1,77 @@
+"""
+Sparse fieldsets for the serializers.
+
+`?fields=id,name,participants.user.name` lists the keys a response
+should carry; dotted paths select inside nested objects, and naming an
+object without a path keeps all of it. Serializers take the parsed
+FieldSet as `fields` (None means everything) and skip computing what
+wasn't asked for; their `*_options` helpers turn the same selection into
+loader options, so relationships nobody asked for are never loaded.
+"""
+from flask import abort, request
+from sqlalchemy.orm import selectinload
+
+
+class FieldSet:
+    def __init__(self, tree):
+        # name -> FieldSet tree of its wanted subfields, or None for all of it
+        self.tree = tree
+
+    @classmethod
+    def parse(cls, spec):
+        tree = {}
+        for path in spec.split(","):
+            parts = path.strip().split(".")
+            if not all(parts):
+                raise ValueError(f"Invalid field: {path!r}")
+            node = tree
+            for part in parts[:-1]:
+                child = node.setdefault(part, {})
+                if child is None:
+                    break
+                node = child
+            else:
+                node[parts[-1]] = None
+        return cls(tree)
+
+    def __contains__(self, name):
+        return name in self.tree
+
+    def nested(self, name):
+        subtree = self.tree.get(name)
+        return FieldSet(subtree) if subtree is not None else None
+
+    def pick(self, data):
+        return {key: value for key, value in data.items() if key in self.tree}
+
+
+def requested_fields():
+    """The request's `fields` selection, or None when it asks for everything."""
+    spec = request.args.get("fields")
+    if not spec:
+        return None
+    try:
+        return FieldSet.parse(spec)
+    except ValueError as exc:
+        abort(400, str(exc))
+
+
+def wants(fields, *names):
+    """Whether any of `names` is part of the selection."""
+    return fields is None or any(name in fields for name in names)
+
+
+def nested(fields, name):
+    return None if fields is None else fields.nested(name)
+
+
+def pick(data, fields):
+    return data if fields is None else fields.pick(data)
+
+
+def load(via, *path):
+    """selectinload along `path`, chained onto the `via` option if given."""
+    option = via
+    for attribute in path:
+        option = selectinload(attribute) if option is None else option.selectinload(attribute)
+    return option
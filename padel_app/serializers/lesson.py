@@ -1,9 +1,17 @@
 import json
+from padel_app.models import (
+    Association_CoachLesson,
+    Association_PlayerLesson,
+    Association_PlayerLessonInstance,
+    Lesson,
+    LessonInstance,
+)
 from padel_app.tools.tools import iso_date
-from padel_app.serializers.player import serialize_player
+from padel_app.serializers.fields import load, nested, pick, wants
+from padel_app.serializers.player import player_options, serialize_player
 from padel_app.serializers.presence import serialize_presence
 
-def serialize_lesson(lesson):
+def serialize_lesson(lesson, fields=None):
     recurrence_rule = None
     if lesson.recurrence_rule:
         try:
@@ -11,9 +19,8 @@ def serialize_lesson(lesson):
         except (TypeError, ValueError):
             recurrence_rule = None
 
-    return {
+    data = {
         "id": lesson.id,
-        "coachIds": [coach.id for coach in lesson.coaches],
         "type": lesson.type,
         "status": lesson.status,
         "color": lesson.color,
@@ -31,11 +38,19 @@ def serialize_lesson(lesson):
         "defaultStartTime": lesson.start_datetime.strftime("%H:%M"),
         "defaultEndTime": lesson.end_datetime.strftime("%H:%M"),
     }
-    
-def serialize_lesson_instance(instance):
-    lesson = instance.lesson
+    if wants(fields, "coachIds"):
+        data["coachIds"] = [coach.id for coach in lesson.coaches]
+
+    return pick(data, fields)
 
-    return {
+
+def lesson_options(fields=None, via=None):
+    if not wants(fields, "coachIds"):
+        return []
+    return [load(via, Lesson.coaches_relations, Association_CoachLesson.coach)]
+    
+def serialize_lesson_instance(instance, fields=None):
+    data = {
         "id": instance.id,
         "lessonId": instance.lesson_id,
 
@@ -47,13 +62,23 @@ def serialize_lesson_instance(instance):
         "notes": instance.notes,
         "overriddenFields": instance.overridden_fields,
 
-        "name": lesson.title if lesson else None,
-        "color": lesson.color if lesson else None,
         "maxPlayers": instance.max_players,
     }
+    if wants(fields, "name", "color"):
+        lesson = instance.lesson
+        data["name"] = lesson.title if lesson else None
+        data["color"] = lesson.color if lesson else None
+
+    return pick(data, fields)
+
+
+def lesson_instance_options(fields=None, via=None):
+    if not wants(fields, "name", "color"):
+        return []
+    return [load(via, LessonInstance.lesson)]
 
     
-def serialize_class_instance(obj) -> dict:
+def serialize_class_instance(obj, fields=None) -> dict:
     """
     Serialize Lesson or LessonInstance into ClassInstance-specific fields.
     Fields already provided by CalendarEvent are intentionally omitted.
@@ -62,27 +87,30 @@ def serialize_class_instance(obj) -> dict:
     is_instance = obj.model_name == "LessonInstance"
     lesson = obj.lesson if is_instance else obj
 
-    coach_id = (
-        lesson.coaches_relations[0].coach.id
-        if lesson.coaches_relations
-        else None
-    )
-
     data = {
-        "coachId": str(coach_id) if coach_id else None,
         "name": lesson.title,
         "levelId": (
             str(lesson.default_level_id)
             if lesson.default_level_id
             else None
         ),
-        "participants": [
-            serialize_player(rel.player)
-            for rel in obj.players_relations
-        ],
         "recurrenceEnd": lesson.recurrence_end.isoformat() if lesson.recurrence_end else None
     }
 
+    if wants(fields, "coachId"):
+        coach_id = (
+            lesson.coaches_relations[0].coach.id
+            if lesson.coaches_relations
+            else None
+        )
+        data["coachId"] = str(coach_id) if coach_id else None
+
+    if wants(fields, "participants"):
+        data["participants"] = [
+            serialize_player(rel.player, nested(fields, "participants"))
+            for rel in obj.players_relations
+        ]
+
     if is_instance:
         data.update(
             {
@@ -93,12 +121,33 @@ def serialize_class_instance(obj) -> dict:
                     if obj.overridden_fields
                     else []
                 ),
-                "presences": [
-                    serialize_presence(p)
-                    for p in getattr(obj, "presences", [])
-                ],
             }
         )
+        if wants(fields, "presences"):
+            data["presences"] = [
+                serialize_presence(p, nested(fields, "presences"))
+                for p in getattr(obj, "presences", [])
+            ]
         data["levelId"] = str(obj.level_id) if obj.level_id else data["levelId"]
 
-    return data
+    return pick(data, fields)
+
+
+def class_instance_options(model, fields=None):
+    """Loader options for serialize_class_instance on a Lesson or LessonInstance query."""
+    is_instance = model is LessonInstance
+    lesson = load(None, LessonInstance.lesson) if is_instance else None
+    options = [lesson] if is_instance else []
+
+    if wants(fields, "coachId"):
+        options.append(load(lesson, Lesson.coaches_relations, Association_CoachLesson.coach))
+
+    if wants(fields, "participants"):
+        association = Association_PlayerLessonInstance if is_instance else Association_PlayerLesson
+        players = load(None, model.players_relations, association.player)
+        options += [players, *player_options(nested(fields, "participants"), players)]
+
+    if is_instance and wants(fields, "presences"):
+        options.append(load(None, LessonInstance.presences))
+
+    return options
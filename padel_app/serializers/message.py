@@ -1,5 +1,8 @@
-def serialize_message(message, last_read_at):
-    return {
+from padel_app.serializers.fields import pick
+
+
+def serialize_message(message, last_read_at, fields=None):
+    return pick({
         "id": message.id,
         "senderId": message.sender_id,
         "content": message.text,
@@ -9,4 +12,4 @@ def serialize_message(message, last_read_at):
             last_read_at
             and message.sent_at <= last_read_at
         ),
-    }
\ No newline at end of file
+    }, fields)
@@ -1,9 +1,21 @@
-from padel_app.serializers.user import serialize_user
+from padel_app.models import Player
+from padel_app.serializers.fields import load, nested, pick, wants
+from padel_app.serializers.user import serialize_user, user_options
 
 
-def serialize_player(player):
-    return {
+def serialize_player(player, fields=None):
+    data = {
         "id": player.id,
         "userId": player.user_id,
-        "user": serialize_user(player.user),
     }
+    if wants(fields, "user"):
+        data["user"] = serialize_user(player.user, nested(fields, "user"))
+
+    return pick(data, fields)
+
+
+def player_options(fields=None, via=None):
+    if not wants(fields, "user"):
+        return []
+    user = load(via, Player.user)
+    return [user, *user_options(nested(fields, "user"), user)]
@@ -1,5 +1,8 @@
-def serialize_presence(presence):
-    return {
+from padel_app.serializers.fields import pick
+
+
+def serialize_presence(presence, fields=None):
+    return pick({
         "id": presence.id,
         "lessonInstanceId": presence.lesson_instance_id,
         "playerId": presence.player_id,
@@ -8,4 +11,4 @@ def serialize_presence(presence):
         "invited": presence.invited,
         "confirmed": presence.confirmed,
         "validated": presence.validated,
-    }
\ No newline at end of file
+    }, fields)
@@ -1,16 +1,31 @@
-def serialize_user(user):
+from padel_app.models import User
+from padel_app.serializers.fields import load, pick, wants
+
+
+def serialize_user(user, fields=None):
     if not user:
         return None
 
-    return {
+    data = {
         "id": user.id,
         "name": user.name,
         "username": user.username,
         "email": user.email,
         "phone": user.phone,
         "isActive": user.status == 'active',
-        "avatarUrl": user.user_image_url,
-        "abbreviation": "".join(
-            [part[0] for part in user.name.split()[:2]]
-        ).upper(),
     }
+    if wants(fields, "avatarUrl"):
+        data["avatarUrl"] = user.avatar_url("medium")
+    if wants(fields, "abbreviation"):
+        data["abbreviation"] = "".join(
+            [part[0] for part in user.name.split()[:2]]
+        ).upper()
+
+    return pick(data, fields)
+
+
+def user_options(fields=None, via=None):
+    """Loader options for serialize_user, below the `via` option if given."""
+    if not wants(fields, "avatarUrl"):
+        return []
+    return [load(via, User.user_image)]
@@ -1,10 +1,207 @@
-from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
+import threading
+import time
+from functools import wraps
 
-db = SQLAlchemy()
-migrate = Migrate()
+import click
+from flask import current_app, g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+
+from padel_app.instrumentation import InstrumentedQueuePool, pool_metrics
+
+REPLICA_BIND = "replica"
+
+_recent_writers = {}
+_recent_writers_lock = threading.Lock()
+
+
+class RoutingSession(SignallingSession):
+    """
+    Session that sends reads to the replica bind when the current request
+    was marked read-only (see `replica_read`).
+
+    Flushes, anything after a flush in the same session, and requests from
+    users who wrote within DB_REPLICA_STICKY_SECONDS stay on the primary so
+    they always read their own writes. An unhealthy or lagging replica falls
+    back to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._use_replica():
+            return db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+    def _use_replica(self):
+        if not has_request_context() or not g.get("db_read_only"):
+            return False
+        if self._flushing or self.info.get("db_wrote"):
+            return False
+        if REPLICA_BIND not in (self.app.config.get("SQLALCHEMY_BINDS") or {}):
+            return False
+        if _is_recent_writer(self.app):
+            return False
+        return replica_available(self.app)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+db = RoutingSQLAlchemy()
+
+
+def replica_read(view):
+    """Mark a view as read-only so its queries may be served by the replica."""
+
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+
+    return decorated_function
+
+
+def _writer_key():
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        identity = None
+    return identity
+
+
+def _is_recent_writer(app):
+    key = _writer_key()
+    if key is None:
+        return False
+    with _recent_writers_lock:
+        wrote_at = _recent_writers.get(key)
+    sticky = app.config.get("DB_REPLICA_STICKY_SECONDS", 5)
+    return wrote_at is not None and time.monotonic() - wrote_at < sticky
+
+
+def _mark_written(session, flush_context):
+    session.info["db_wrote"] = True
+    if not has_request_context():
+        return
+    key = _writer_key()
+    if key is None:
+        return
+    now = time.monotonic()
+    sticky = current_app.config.get("DB_REPLICA_STICKY_SECONDS", 5)
+    with _recent_writers_lock:
+        _recent_writers[key] = now
+        if len(_recent_writers) > 1000:
+            for stale in [k for k, t in _recent_writers.items() if now - t >= sticky]:
+                del _recent_writers[stale]
+
+
+def replica_available(app):
+    """
+    Cached health check for the replica bind.
+
+    On Postgres the replica counts as lagging when it has WAL left to replay
+    and its last replayed transaction is older than DB_REPLICA_MAX_LAG_SECONDS.
+    """
+    state = app.extensions.setdefault(
+        "db_replica", {"checked_at": None, "healthy": False}
+    )
+    interval = app.config.get("DB_REPLICA_CHECK_INTERVAL", 5)
+    now = time.monotonic()
+    if state["checked_at"] is not None and now - state["checked_at"] < interval:
+        return state["healthy"]
+
+    try:
+        engine = db.get_engine(app, bind=REPLICA_BIND)
+        with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                lag = conn.exec_driver_sql(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+                    "THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM now() - "
+                    "pg_last_xact_replay_timestamp()), 0) END"
+                ).scalar()
+                healthy = float(lag or 0) <= app.config.get(
+                    "DB_REPLICA_MAX_LAG_SECONDS", 10
+                )
+            else:
+                conn.exec_driver_sql("SELECT 1")
+                healthy = True
+    except SQLAlchemyError:
+        healthy = False
+
+    state.update(checked_at=now, healthy=healthy)
+    return healthy
+
+
+def build_engine_options(config):
+    """
+    Engine options derived from the DB_* config keys.
+
+    Pool tuning only applies to Postgres; SQLite keeps Flask-SQLAlchemy's
+    defaults. In PgBouncer mode the statement timeout cannot travel as a
+    startup option (PgBouncer rejects it), so it is applied per transaction
+    with SET LOCAL instead. psycopg2 never uses server-side prepared
+    statements, so no extra driver flags are needed for transaction pooling.
+    """
+    uri = config.get("SQLALCHEMY_DATABASE_URI")
+    if not uri or make_url(uri).get_backend_name() != "postgresql":
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 5),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 10),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+    }
+
+    timeout = config.get("DB_STATEMENT_TIMEOUT_MS")
+    if timeout and not config.get("DB_PGBOUNCER"):
+        options["connect_args"] = {"options": f"-c statement_timeout={int(timeout)}"}
+    return options
+
+
+def _set_transaction_timeout(session, transaction, connection):
+    config = current_app.config
+    timeout = config.get("DB_STATEMENT_TIMEOUT_MS")
+    if (
+        config.get("DB_PGBOUNCER")
+        and timeout
+        and connection.dialect.name == "postgresql"
+    ):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
 
 
 def init_db(app):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **build_engine_options(app.config),
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Flask-Migrate pulls in alembic, which only the `flask db` commands
+    # use; the slim profiles skip it unless the app is loaded by the CLI.
+    if app.config.get("APP_PROFILE", "full") == "full" or click.get_current_context(
+        silent=True
+    ):
+        init_migrate(app)
+
+    if not event.contains(db.session, "after_begin", _set_transaction_timeout):
+        event.listen(db.session, "after_begin", _set_transaction_timeout)
+    if not event.contains(db.session, "after_flush", _mark_written):
+        event.listen(db.session, "after_flush", _mark_written)
+
+
+def init_migrate(app):
+    from flask_migrate import Migrate
+
+    Migrate(app, db)
+
+
+def pool_status(app=None):
+    """Pool checkout metrics plus the live state of the app's engine pool."""
+    engine = db.get_engine(app)
+    return pool_metrics.snapshot(engine.pool)
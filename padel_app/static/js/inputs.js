@@ -130,15 +130,26 @@ function getAllOptions(ele){
     let model_name = ele.dataset.related_model;
     let many_to_many_values_inputed = document.getElementsByClassName('many_to_many_values_inputed');
     let values = Array.from(many_to_many_values_inputed).map(el => +el.dataset.value);
-    $.getJSON(`/api/query/${model_name}` , function(data) {
-        for (let option of data) {
-            let option_text = option.name;
-            let option_value = option.id;
-            let show = !values.includes(option_value);
-            let option_div = createManyToManyOption(ele.dataset.name,option_text,option_value,show);
-            ele.insertBefore(option_div, ele.lastElementChild);
+    // /api/query returns {items, nextCursor}; follow the cursor until every row is in.
+    function loadPage(cursor) {
+        let params = {limit: 1000};
+        if (cursor) {
+            params.cursor = cursor;
         }
-    });
+        $.getJSON(`/api/query/${model_name}`, params, function(data) {
+            for (let option of data.items) {
+                let option_text = option.name;
+                let option_value = option.id;
+                let show = !values.includes(option_value);
+                let option_div = createManyToManyOption(ele.dataset.name,option_text,option_value,show);
+                ele.insertBefore(option_div, ele.lastElementChild);
+            }
+            if (data.nextCursor) {
+                loadPage(data.nextCursor);
+            }
+        });
+    }
+    loadPage(null);
 }
 
 function fillAllManyToManyOptions(){
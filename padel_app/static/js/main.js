@@ -339,10 +339,8 @@ async function callAPI(element,redirect){
     return response;
 }
 
-async function downloadCSV(element){
-    let response = await callAPI(element,false);
-    let filepath = await response.text();
-    downloadFile(filepath);
+function downloadCSV(element){
+    downloadFile(element.dataset.href);
 }
 
 function downloadFile(filepath) {
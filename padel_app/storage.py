@@ -0,0 +1,243 @@
+import io
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from flask import send_from_directory
+
+GCS_BUCKET = os.environ.get("GCS_UPLOADS_BUCKET")
+
+SIGNED_URL_LIFETIME = timedelta(minutes=5)
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Cached URLs are dropped this long (or 20% of the lifetime, if larger)
+# before their signature runs out, so clients never get a dead link.
+SIGNED_URL_MARGIN = timedelta(seconds=30)
+
+
+class GCSStorage:
+    """Google Cloud Storage bucket behind one client per process."""
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+        self._bucket = None
+        self._lock = threading.Lock()
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    from google.cloud import storage
+
+                    self._bucket = storage.Client().bucket(self.bucket_name)
+        return self._bucket
+
+    def upload(self, object_key, stream, content_type=None):
+        # Resumable upload: the stream is read and sent in chunks.
+        self.bucket.blob(object_key).upload_from_file(stream, content_type=content_type)
+
+    def open(self, object_key):
+        return self.bucket.blob(object_key).open("rb")
+
+    def public_url(self, object_key):
+        return f"https://storage.googleapis.com/{self.bucket_name}/{object_key}"
+
+    def sign(self, object_key, expiration, method="GET"):
+        return self.bucket.blob(object_key).generate_signed_url(
+            version="v4", expiration=expiration, method=method
+        )
+
+
+class FakeStorage:
+    """In-memory backend for tests; counts signatures so caching can be checked."""
+
+    def __init__(self, bucket_name="fake-bucket"):
+        self.bucket_name = bucket_name
+        self.objects = {}
+        self.sign_calls = 0
+        self._lock = threading.Lock()
+
+    def upload(self, object_key, stream, content_type=None):
+        self.objects[object_key] = (stream.read(), content_type)
+
+    def open(self, object_key):
+        return io.BytesIO(self.objects[object_key][0])
+
+    def public_url(self, object_key):
+        return f"https://storage.test/{self.bucket_name}/{object_key}"
+
+    def sign(self, object_key, expiration, method="GET"):
+        with self._lock:
+            self.sign_calls += 1
+            n = self.sign_calls
+        seconds = int(expiration.total_seconds())
+        return (
+            f"https://storage.test/{self.bucket_name}/{object_key}"
+            f"?method={method}&expires={seconds}&sig={n}"
+        )
+
+
+class LocalStorage:
+    """Files under a local directory, served from `base_url` (dev and tests)."""
+
+    def __init__(self, root, base_url="/uploads"):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def path(self, object_key):
+        path = os.path.abspath(os.path.join(self.root, object_key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Object key escapes storage root: {object_key}")
+        return path
+
+    def upload(self, object_key, stream, content_type=None):
+        path = self.path(object_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(stream, f, UPLOAD_CHUNK_SIZE)
+
+    def open(self, object_key):
+        return open(self.path(object_key), "rb")
+
+    def public_url(self, object_key):
+        return f"{self.base_url}/{object_key}"
+
+    def sign(self, object_key, expiration, method="GET"):
+        return self.public_url(object_key)
+
+
+class SignedUrlCache:
+    """Thread-safe TTL cache of signed URLs keyed on (object_key, method, lifetime)."""
+
+    def __init__(self, max_entries=10000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def ttl(lifetime):
+        margin = max(SIGNED_URL_MARGIN, lifetime / 5)
+        return max((lifetime - margin).total_seconds(), 0)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            url, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            return url
+
+    def put(self, key, url, lifetime):
+        ttl = self.ttl(lifetime)
+        if not ttl:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = (url, self.clock() + ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        now = self.clock()
+        expired = [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for k in expired:
+            del self._entries[k]
+        if len(self._entries) >= self.max_entries:
+            # Still full: drop the oldest half (dicts keep insertion order).
+            for k in list(self._entries)[: len(self._entries) // 2]:
+                del self._entries[k]
+
+
+_storage = None
+_storage_lock = threading.Lock()
+_signer_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="url-signer")
+url_cache = SignedUrlCache()
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = GCSStorage(GCS_BUCKET)
+    return _storage
+
+
+def set_storage(backend):
+    """Swap the process-wide backend (tests, local dev) and drop cached URLs."""
+    global _storage
+    with _storage_lock:
+        _storage = backend
+    url_cache.clear()
+
+
+def init_storage(app):
+    backend = app.config.get("STORAGE_BACKEND", "gcs")
+    if backend == "fake":
+        set_storage(FakeStorage())
+    elif backend == "local":
+        root = app.config.get("STORAGE_LOCAL_ROOT") or os.path.join(
+            app.instance_path, "uploads"
+        )
+        local = LocalStorage(root)
+        set_storage(local)
+        app.add_url_rule(
+            f"{local.base_url}/<path:object_key>",
+            "uploaded_file",
+            lambda object_key: send_from_directory(local.root, object_key),
+        )
+    elif backend == "gcs":
+        set_storage(GCSStorage(app.config.get("GCS_UPLOADS_BUCKET", GCS_BUCKET)))
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def public_url(object_key):
+    return get_storage().public_url(object_key)
+
+
+def signed_url(object_key, lifetime=SIGNED_URL_LIFETIME, method="GET"):
+    key = (object_key, method, lifetime)
+    url = url_cache.get(key)
+    if url is None:
+        url = get_storage().sign(object_key, lifetime, method)
+        url_cache.put(key, url, lifetime)
+    return url
+
+
+def signed_urls(object_keys, lifetime=SIGNED_URL_LIFETIME, method="GET"):
+    """
+    Signed GET URLs for many objects at once, as {object_key: url}.
+
+    Duplicates are signed once, cache hits are not re-signed, and the
+    misses are signed concurrently (signing can be a remote IAM call).
+    """
+    urls, missing = {}, []
+    for object_key in dict.fromkeys(object_keys):
+        url = url_cache.get((object_key, method, lifetime))
+        if url is None:
+            missing.append(object_key)
+        else:
+            urls[object_key] = url
+
+    if len(missing) == 1:
+        urls[missing[0]] = signed_url(missing[0], lifetime, method)
+    elif missing:
+        signer = get_storage()
+        signed = _signer_pool.map(lambda k: signer.sign(k, lifetime, method), missing)
+        for object_key, url in zip(missing, signed):
+            url_cache.put((object_key, method, lifetime), url, lifetime)
+            urls[object_key] = url
+    return urls
@@ -2,6 +2,7 @@ import os
 import tempfile
 
 import pytest
+from sqlalchemy import event
 
 from padel_app import create_app
 from padel_app.sql_db import db, init_db
@@ -17,6 +18,8 @@ def app():
             "TESTING": True,
             "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
             "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            "STORAGE_BACKEND": "fake",
+            "JOBS_BACKEND": "immediate",
         }
     )
 
@@ -30,6 +33,40 @@ def app():
     os.unlink(db_path)
 
 
+class StatementLog:
+    """The SQL statements an engine runs inside `with log:` blocks."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    def __len__(self):
+        return len(self.statements)
+
+    def of(self, verb):
+        """The recorded statements starting with `verb`, e.g. "SELECT"."""
+        return [s for s in self.statements if s.lstrip().upper().startswith(verb)]
+
+    def clear(self):
+        self.statements.clear()
+
+
+@pytest.fixture
+def statements(app):
+    with app.app_context():
+        return StatementLog(db.engine)
+
+
 @pytest.fixture
 def client(app):
     return app.test_client()
@@ -0,0 +1,174 @@
+import json
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from padel_app.models import (
+    Association_CoachLesson,
+    Association_CoachPlayer,
+    CalendarBlock,
+    Club,
+    Coach,
+    Lesson,
+    Player,
+    User,
+)
+from padel_app.sql_db import db
+from padel_app.tools.availability_tools import (
+    IntervalSet,
+    daily_windows,
+    from_minutes,
+    to_minutes,
+)
+
+
+def test_interval_set_merges_and_finds_free_slots():
+    busy = IntervalSet([(10, 20, "a"), (15, 30, "b"), (50, 60, "c")])
+
+    assert busy.free_slots(0, 100, 10) == [(0, 10), (30, 50), (60, 100)]
+    assert busy.free_slots(0, 100, 25) == [(60, 100)]
+    assert busy.free_slots(12, 55, 5) == [(30, 50)]
+
+
+def test_interval_set_conflicts_and_is_free():
+    busy = IntervalSet([(10, 20, "a"), (15, 30, "b"), (50, 60, "c")])
+
+    assert [label for _, _, label in busy.conflicts(25, 55)] == ["b", "c"]
+    assert busy.conflicts(30, 50) == []
+    assert busy.is_free(30, 50)
+    assert not busy.is_free(29, 31)
+    assert not busy.is_free(0, 11)
+
+
+def test_minutes_round_trip_and_daily_windows():
+    dt = datetime(2026, 3, 2, 9, 30, tzinfo=timezone.utc)
+    assert from_minutes(to_minutes(dt)) == dt
+    assert to_minutes(dt.replace(tzinfo=None)) == to_minutes(dt)
+
+    windows = daily_windows(dt, dt + timedelta(days=1), time(8), time(10))
+    assert [(from_minutes(a).isoformat(), from_minutes(b).isoformat()) for a, b in windows] == [
+        ("2026-03-02T09:30:00+00:00", "2026-03-02T10:00:00+00:00"),
+        ("2026-03-03T08:00:00+00:00", "2026-03-03T09:30:00+00:00"),
+    ]
+
+
+@pytest.fixture
+def coach_schedule(app):
+    """Coach with a weekly Monday 10:00-11:00 lesson and a Tuesday 09:00-12:00 block."""
+    app.config["JWT_SECRET_KEY"] = "availability-secret"
+    monday = datetime(2030, 1, 7, 10, 0)
+    with app.app_context():
+        club = Club(name="Club")
+        user = User(name="Coach", username="coach", password="x")
+        coach = Coach(user=user)
+        own = Player(user=User(name="Own", username="own", password="x"))
+        other = Player(user=User(name="Other", username="other", password="x"))
+        lesson = Lesson(
+            title="Weekly",
+            start_datetime=monday,
+            end_datetime=monday + timedelta(hours=1),
+            type="academy",
+            max_players=4,
+            club=club,
+            status="active",
+            is_recurring=True,
+            recurrence_rule=json.dumps({"frequency": "weekly", "daysOfWeek": [1]}),
+        )
+        db.session.add_all([club, user, coach, own, other, lesson])
+        db.session.flush()
+        db.session.add_all([
+            Association_CoachLesson(coach_id=coach.id, lesson_id=lesson.id),
+            Association_CoachPlayer(coach_id=coach.id, player_id=own.id),
+            CalendarBlock(
+                user_id=user.id,
+                type="personal",
+                start_datetime=monday + timedelta(days=1, hours=-1),
+                end_datetime=monday + timedelta(days=1, hours=2),
+            ),
+        ])
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        return {
+            "headers": {"Authorization": f"Bearer {token}"},
+            "lesson_id": lesson.id,
+            "own_player_id": own.id,
+            "other_player_id": other.id,
+        }
+
+
+def test_availability_endpoint(client, coach_schedule):
+    response = client.get(
+        "/api/app/availability?from=2030-01-07T00:00:00Z&to=2030-01-09T00:00:00Z"
+        "&length=60&dayStart=08:00&dayEnd=13:00",
+        headers=coach_schedule["headers"],
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["freeSlots"] == [
+        {"start": "2030-01-07T08:00:00+00:00", "end": "2030-01-07T10:00:00+00:00"},
+        {"start": "2030-01-07T11:00:00+00:00", "end": "2030-01-07T13:00:00+00:00"},
+        {"start": "2030-01-08T08:00:00+00:00", "end": "2030-01-08T09:00:00+00:00"},
+        {"start": "2030-01-08T12:00:00+00:00", "end": "2030-01-08T13:00:00+00:00"},
+    ]
+
+
+def test_conflicts_for_proposed_recurring_class(client, coach_schedule):
+    response = client.post(
+        "/api/app/availability/conflicts",
+        json={
+            "date": "2030-01-07",
+            "startTime": "10:30",
+            "endTime": "11:30",
+            "isRecurring": True,
+            "recurrenceRule": {"frequency": "weekly", "daysOfWeek": [1, 2]},
+            "endDate": "2030-01-15",
+        },
+        headers=coach_schedule["headers"],
+    )
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["occurrences"] == 4
+    assert [c["date"] for c in body["conflicts"]] == ["2030-01-07", "2030-01-08", "2030-01-14"]
+    first = body["conflicts"][0]["conflicts"]
+    assert first == [{
+        "owner": "coach",
+        "eventId": f"lesson-{coach_schedule['lesson_id']}-2030-01-07",
+        "start": "2030-01-07T10:00:00+00:00",
+        "end": "2030-01-07T11:00:00+00:00",
+    }]
+
+
+def test_conflicts_requires_times(client, coach_schedule):
+    response = client.post(
+        "/api/app/availability/conflicts", json={"date": "2030-01-07"},
+        headers=coach_schedule["headers"],
+    )
+    assert response.status_code == 400
+
+
+def test_availability_only_for_the_coachs_players(client, coach_schedule):
+    url = "/api/app/availability?from=2030-01-07T00:00:00Z&to=2030-01-08T00:00:00Z"
+    own, other = coach_schedule["own_player_id"], coach_schedule["other_player_id"]
+
+    response = client.get(f"{url}&playerIds={own}", headers=coach_schedule["headers"])
+    assert response.status_code == 200
+    response = client.get(
+        f"{url}&playerIds={own}&playerIds={other}", headers=coach_schedule["headers"]
+    )
+    assert response.status_code == 403
+
+    proposal = {"date": "2030-01-07", "startTime": "10:30", "endTime": "11:30"}
+    response = client.post(
+        "/api/app/availability/conflicts",
+        json={**proposal, "playerIds": [own]},
+        headers=coach_schedule["headers"],
+    )
+    assert response.status_code == 200
+    response = client.post(
+        "/api/app/availability/conflicts",
+        json={**proposal, "playerIds": [other]},
+        headers=coach_schedule["headers"],
+    )
+    assert response.status_code == 403
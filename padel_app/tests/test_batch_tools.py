@@ -0,0 +1,108 @@
+from datetime import datetime
+
+import pytest
+
+from padel_app.sql_db import db
+from padel_app.models import (
+    Association_PlayerLesson,
+    Club,
+    Lesson,
+    LessonInstance,
+    Player,
+    Presence,
+    User,
+)
+from padel_app.tools.batch_tools import delete_many, needs_orm_delete
+
+
+@pytest.fixture
+def roster(app):
+    with app.app_context():
+        club = Club(name="Club")
+        lesson = Lesson(
+            title="Class",
+            type="academy",
+            max_players=4,
+            club=club,
+            start_datetime=datetime(2026, 1, 5, 9),
+            end_datetime=datetime(2026, 1, 5, 10),
+        )
+        players = [Player(user=User(name=f"P{i}", username=f"p{i}")) for i in range(3)]
+        links = [Association_PlayerLesson(player=p, lesson=lesson) for p in players]
+        instance = LessonInstance(
+            lesson=lesson,
+            start_datetime=lesson.start_datetime,
+            end_datetime=lesson.end_datetime,
+            max_players=4,
+        )
+        presences = [Presence(lesson_instance=instance, player=p) for p in players]
+        db.session.add_all([club, lesson, instance, *players, *links, *presences])
+        db.session.commit()
+        return {
+            "lesson": lesson.id,
+            "players": [p.id for p in players],
+            "links": [link.id for link in links],
+            "presences": [p.id for p in presences],
+        }
+
+
+def test_needs_orm_delete():
+    assert not needs_orm_delete(Association_PlayerLesson)
+    assert not needs_orm_delete(Presence)
+    assert needs_orm_delete(Lesson)
+
+
+def test_delete_many_set_based(app, roster, statements):
+    with app.app_context():
+        with statements:
+            deleted = delete_many(Presence, roster["presences"][:2] + [9999])
+        db.session.commit()
+
+        assert deleted == 2
+        assert len(statements.of("DELETE")) == 1
+        assert Presence.query.count() == 1
+
+
+def test_delete_many_runs_orm_cascades(app, roster):
+    with app.app_context():
+        assert delete_many(Lesson, [roster["lesson"]]) == 1
+        db.session.commit()
+
+        assert Lesson.query.count() == 0
+        assert LessonInstance.query.count() == 0
+        assert Association_PlayerLesson.query.count() == 0
+
+
+def test_batch_delete_endpoint(client, app, roster):
+    response = client.post(
+        "/api/batch_delete/presence", json={"ids": roster["presences"]}
+    )
+    assert response.get_json()["deleted"] == 3
+    assert client.post("/api/batch_delete/presence", json={"ids": ["x"]}).status_code == 400
+    assert client.post("/api/batch_delete/nope", json={"ids": [1]}).status_code == 404
+
+
+def test_remove_relationships_endpoint(client, app, roster):
+    pairs = [[roster["lesson"], link] for link in roster["links"][:2]]
+    pairs.append([roster["lesson"] + 1, roster["links"][2]])  # wrong owner
+
+    response = client.post(
+        "/api/remove_relationships",
+        json={
+            "model_name1": "Lesson",
+            "field_name": "players_relations",
+            "pairs": pairs,
+        },
+    )
+    assert response.get_json() == {"success": True, "removed": 2}
+
+    with app.app_context():
+        assert [link.id for link in Association_PlayerLesson.query] == [
+            roster["links"][2]
+        ]
+
+    response = client.post(
+        "/api/remove_relationships",
+        json={"model_name1": "Lesson", "field_name": "club", "pairs": pairs},
+    )
+    assert response.status_code == 400
@@ -0,0 +1,150 @@
+import pytest
+from sqlalchemy.engine import make_url
+
+from padel_app.models import (
+    ChangeLog,
+    ClassOccupancy,
+    Club,
+    Lesson,
+    LessonInstance,
+    Message,
+    Presence,
+    User,
+)
+from padel_app.sql_db import db
+from padel_app.tools.bench_tools import (
+    BenchScale,
+    _percentile,
+    drop_dataset,
+    generate_dataset,
+    is_scratch_database,
+    run_benchmark,
+)
+
+SMALL = BenchScale(
+    clubs=1,
+    coaches=2,
+    players=6,
+    lessons_per_coach=2,
+    players_per_lesson=2,
+    weeks=4,
+    messages_per_conversation=3,
+)
+
+
+@pytest.fixture
+def jwt_app(app):
+    app.config["JWT_SECRET_KEY"] = "bench-secret"
+    return app
+
+
+def test_generate_dataset_counts(app):
+    with app.app_context():
+        dataset = generate_dataset(SMALL)
+
+        assert len(dataset["coaches"]) == 2
+        assert Lesson.query.count() == dataset["lessons"] == 4
+        assert LessonInstance.query.count() == dataset["instances"] == 16
+        assert Presence.query.count() == dataset["presences"] == 32
+        assert Message.query.count() == dataset["messages"] == 18
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 21)]
+    assert _percentile(values, 50) == 10
+    assert _percentile(values, 95) == 19
+    assert _percentile([3.0], 95) == 3
+
+
+def test_run_benchmark_scenarios(jwt_app):
+    app = jwt_app
+    with app.app_context():
+        target = generate_dataset(SMALL)["coaches"][0]
+
+    results = run_benchmark(
+        app, coach_id=target["coachId"], user_id=target["userId"], iterations=2
+    )
+
+    assert set(results) == {
+        "calendar_month",
+        "dashboard",
+        "conversations",
+        "edit_class_future",
+    }
+    for name, r in results.items():
+        assert all(status < 400 for status in r["statuses"]), name
+        assert r["p50Ms"] <= r["p95Ms"]
+        assert r["queries"] > 0
+
+
+def test_edit_scenario_splits_a_fresh_series_each_call(jwt_app):
+    app = jwt_app
+    with app.app_context():
+        target = generate_dataset(SMALL)["coaches"][0]
+
+    # Warm-up, two timed calls and the tracemalloc call: two splits per lesson.
+    run_benchmark(app, coach_id=target["coachId"], user_id=target["userId"], iterations=2)
+
+    with app.app_context():
+        lessons = Lesson.query.filter(Lesson.title.like(f"Class {target['coachId']}-%")).all()
+        assert len(lessons) == SMALL.lessons_per_coach + 4
+        # Re-splitting an already split series would leave a lesson without instances.
+        assert all(lesson.instances for lesson in lessons)
+
+
+def test_drop_dataset_removes_benchmark_rows(jwt_app):
+    app = jwt_app
+    with app.app_context():
+        keep = User(name="Real", username="real")
+        db.session.add(keep)
+        db.session.commit()
+        dataset = generate_dataset(SMALL)
+        target = dataset["coaches"][0]
+
+    run_benchmark(app, coach_id=target["coachId"], user_id=target["userId"], iterations=1)
+
+    with app.app_context():
+        drop_dataset(dataset)
+        assert [u.username for u in User.query.all()] == ["real"]
+        for model in (Club, Lesson, LessonInstance, Presence, Message, ClassOccupancy, ChangeLog):
+            assert model.query.count() == 0, model.__name__
+
+
+@pytest.mark.parametrize(
+    "url, scratch",
+    [
+        ("sqlite:///bench.db", True),
+        ("postgresql://u:p@db/levelup_test", True),
+        ("postgresql://u:p@db/bench", True),
+        ("postgresql://u:p@db/levelup", False),
+    ],
+)
+def test_is_scratch_database(url, scratch):
+    assert is_scratch_database(make_url(url)) is scratch
+
+
+def test_bench_command_requires_yes(jwt_app):
+    result = jwt_app.test_cli_runner().invoke(args=["bench", "--players", "2"])
+    assert "Use --yes" in result.output
+    with jwt_app.app_context():
+        assert User.query.count() == 0
+
+
+def test_bench_command(jwt_app):
+    runner = jwt_app.test_cli_runner()
+    result = runner.invoke(
+        args=[
+            "bench",
+            "--yes",
+            "--coaches", "1",
+            "--players", "2",
+            "--lessons-per-coach", "1",
+            "--weeks", "2",
+            "--messages", "1",
+            "--iterations", "1",
+        ]
+    )
+    assert result.exit_code == 0, result.output
+    assert '"scenarios"' in result.output
+    with jwt_app.app_context():
+        assert User.query.count() == 0
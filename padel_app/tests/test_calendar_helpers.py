@@ -0,0 +1,327 @@
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy.dialects import postgresql
+
+from padel_app import create_app
+from padel_app.helpers.calendar_helpers import (
+    build_occurrence_events,
+    build_player_calendar_events,
+    lesson_occurrences_query,
+    load_lesson_occurrences,
+    load_player_calendar_instances,
+)
+from padel_app.helpers.dashboard.events import build_dashboard_event_lists
+from padel_app.identity import identity_cache
+from padel_app.models import (
+    Association_CoachLesson,
+    Association_PlayerLessonInstance,
+    Club,
+    Coach,
+    Lesson,
+    LessonInstance,
+    Player,
+    Presence,
+    User,
+)
+from padel_app.sql_db import db, init_db
+
+
+@pytest.fixture
+def player_calendar(app):
+    """A player with one instance per week: invited, confirmed, assigned only."""
+    with app.app_context():
+        club = Club(name="Club")
+        user = User(name="Pat Player", username="pat", password="x")
+        player = Player(user=user)
+        start = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+        lesson = Lesson(
+            title="Group",
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            type="academy",
+            max_players=4,
+            club=club,
+        )
+        db.session.add_all([club, user, player, lesson])
+        db.session.flush()
+
+        instances = []
+        for week in range(3):
+            day = start + timedelta(weeks=week)
+            instance = LessonInstance(
+                lesson_id=lesson.id,
+                original_lesson_occurence_date=day.date(),
+                start_datetime=day,
+                end_datetime=day + timedelta(hours=1),
+                max_players=4,
+            )
+            db.session.add(instance)
+            instances.append(instance)
+        db.session.flush()
+
+        invited, confirmed, assigned = instances
+        db.session.add_all([
+            Presence(lesson_instance_id=invited.id, player_id=player.id,
+                     invited=True, confirmed=False),
+            Presence(lesson_instance_id=confirmed.id, player_id=player.id,
+                     invited=True, confirmed=True),
+            Association_PlayerLessonInstance(
+                lesson_instance_id=assigned.id, player_id=player.id
+            ),
+            Association_PlayerLessonInstance(
+                lesson_instance_id=confirmed.id, player_id=player.id
+            ),
+        ])
+        db.session.commit()
+        return {
+            "player_id": player.id,
+            "user_id": user.id,
+            "instance_ids": [i.id for i in instances],
+            "start": start - timedelta(hours=1),
+        }
+
+
+def test_loader_returns_instances_with_presence_flags(app, player_calendar):
+    invited, confirmed, assigned = player_calendar["instance_ids"]
+    start = player_calendar["start"]
+
+    with app.app_context():
+        indexed, presence = load_player_calendar_instances(
+            player_calendar["player_id"], start, start + timedelta(weeks=4)
+        )
+
+    assert sorted(i.id for i in indexed.values()) == [invited, confirmed, assigned]
+    assert presence[invited] == {"invited": True, "confirmed": False, "presenceStatus": None}
+    assert presence[confirmed]["confirmed"] is True
+    assert presence[assigned] == {"invited": False, "confirmed": False, "presenceStatus": None}
+
+
+def test_player_calendar_statement_count_does_not_grow_with_range(
+    app, player_calendar, statements
+):
+    start = player_calendar["start"]
+    counts = []
+    for weeks in (1, 4):
+        statements.clear()
+        with app.app_context(), statements:
+            events = build_player_calendar_events(
+                player_calendar["player_id"],
+                player_calendar["user_id"],
+                start,
+                start + timedelta(weeks=weeks),
+            )
+            # Serializing touches lesson and participants; no lazy loads.
+            assert all("participantCount" in e for e in events if e["type"] == "class")
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+
+
+def test_dashboard_lists_invites_to_confirm(app, player_calendar):
+    start = player_calendar["start"]
+    invited = player_calendar["instance_ids"][0]
+
+    with app.app_context():
+        scheduled, upcoming, invites = build_dashboard_event_lists(
+            player_id=player_calendar["player_id"],
+            range_start=start,
+            range_end=start + timedelta(weeks=4),
+        )
+
+    assert scheduled == 3
+    assert [item["id"] for item in invites] == [f"lessoninstance-{invited}"]
+
+
+def _weekly(*days):
+    return json.dumps({"frequency": "weekly", "daysOfWeek": list(days)})
+
+
+RANGE_START = datetime(2030, 1, 1)  # a Tuesday
+RANGE_END = datetime(2030, 3, 1)
+
+OCCURRENCE_LESSONS = [
+    # start, recurrence_rule, recurrence_end
+    (datetime(2029, 12, 2, 18), _weekly(1, 3), None),
+    (datetime(2030, 1, 9, 9, 30), _weekly(), date(2030, 2, 6)),
+    (datetime(2030, 1, 4, 7), _weekly(2), None),
+    (datetime(2030, 1, 31, 23, 59), _weekly(4, 6, 9), date(2030, 2, 8)),
+    (datetime(2030, 2, 1), _weekly(5), None),
+    (datetime(2030, 1, 15, 12), None, None),
+    (datetime(2030, 3, 2, 12), None, None),
+    (datetime(2030, 1, 6, 10), json.dumps({"frequency": "daily"}), None),
+    (datetime(2030, 1, 6, 10), "", None),
+    (datetime(2030, 1, 6, 10), "not json", None),
+    (datetime(2030, 1, 6, 10), "{weekly}", None),
+]
+
+
+def _add_occurrence_lessons():
+    club = Club(name="Club")
+    lessons = [
+        Lesson(
+            title=f"Lesson {i}",
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            type="academy",
+            max_players=4,
+            club=club,
+            recurrence_rule=rule,
+            recurrence_end=end,
+        )
+        for i, (start, rule, end) in enumerate(OCCURRENCE_LESSONS)
+    ]
+    db.session.add_all(lessons)
+    db.session.flush()
+    instance = LessonInstance(
+        lesson_id=lessons[0].id,
+        original_lesson_occurence_date=date(2030, 1, 7),
+        start_datetime=datetime(2030, 1, 7, 19),
+        end_datetime=datetime(2030, 1, 7, 20),
+        max_players=4,
+    )
+    db.session.add(instance)
+    db.session.commit()
+    return lessons, instance
+
+
+def _at(hour, minute, *days):
+    return [datetime(2030, month, day, hour, minute, tzinfo=timezone.utc) for month, day in days]
+
+
+# Occurrences in [RANGE_START, RANGE_END], by index in OCCURRENCE_LESSONS;
+# the other lessons have none (out of range, not weekly, or malformed).
+EXPECTED_OCCURRENCES = {
+    0: _at(18, 0, (1, 2), (1, 7), (1, 9), (1, 14), (1, 16), (1, 21), (1, 23), (1, 28),
+           (1, 30), (2, 4), (2, 6), (2, 11), (2, 13), (2, 18), (2, 20), (2, 25), (2, 27)),
+    1: _at(9, 30, (1, 9), (1, 16), (1, 23), (1, 30), (2, 6)),
+    2: _at(7, 0, (1, 8), (1, 15), (1, 22), (1, 29), (2, 5), (2, 12), (2, 19), (2, 26)),
+    3: _at(23, 59, (1, 31), (2, 2), (2, 7)),
+    4: _at(0, 0, (2, 1), (2, 8), (2, 15), (2, 22), (3, 1)),
+    5: _at(12, 0, (1, 15)),
+    8: _at(10, 0, (1, 6)),
+}
+
+
+def _assert_expected_occurrences(rows, lessons, instance):
+    expected = sorted(
+        (occurrence, lessons[index].id)
+        for index, occurrences in EXPECTED_OCCURRENCES.items()
+        for occurrence in occurrences
+    )
+    assert [(occurrence, lesson.id) for lesson, _, occurrence in rows] == expected
+    assert [
+        (row_instance.id, occurrence.date())
+        for _, row_instance, occurrence in rows
+        if row_instance is not None
+    ] == [(instance.id, date(2030, 1, 7))]
+
+
+def test_lesson_occurrences_fall_back_to_python_off_postgres(app):
+    with app.app_context():
+        lessons, instance = _add_occurrence_lessons()
+        rows = load_lesson_occurrences(Lesson.query, RANGE_START, RANGE_END)
+        _assert_expected_occurrences(rows, lessons, instance)
+
+        events = build_occurrence_events(rows)
+        assert events[0]["id"] == f"lesson-{lessons[0].id}-2030-01-02"
+        assert f"lessoninstance-{instance.id}" in [e["id"] for e in events]
+
+
+def test_lesson_occurrences_query_is_one_postgres_statement(app):
+    with app.app_context():
+        query = lesson_occurrences_query(Lesson.query, RANGE_START, RANGE_END)
+        sql = str(query.statement.compile(dialect=postgresql.dialect()))
+    assert "JOIN LATERAL generate_series(" in sql
+    assert "LEFT OUTER JOIN lesson_instances" in sql
+
+
+def test_lesson_occurrences_query_can_leave_out_instances(app):
+    with app.app_context():
+        query = lesson_occurrences_query(
+            Lesson.query, RANGE_START, RANGE_END, with_instances=False
+        )
+        sql = str(query.statement.compile(dialect=postgresql.dialect()))
+    assert "JOIN LATERAL generate_series(" in sql
+    assert "lesson_instances" not in sql
+
+
+def _assert_sql_expansion_gives_the_same_events(app):
+    client = app.test_client()
+    app.config["JWT_SECRET_KEY"] = "calendar-secret"
+    identity_cache.clear()
+    with app.app_context():
+        user = User(name="Coach Carter", username="carter", password="x")
+        coach = Coach(user=user)
+        lessons, instance = _add_occurrence_lessons()
+        db.session.add_all([user, coach])
+        db.session.flush()
+        db.session.add_all(
+            Association_CoachLesson(coach_id=coach.id, lesson_id=lesson.id)
+            for lesson in lessons
+        )
+        # Moved to a day that isn't an occurrence of its lesson.
+        loose = LessonInstance(
+            lesson_id=lessons[2].id,
+            original_lesson_occurence_date=date(2030, 1, 10),
+            start_datetime=datetime(2030, 1, 10, 7),
+            end_datetime=datetime(2030, 1, 10, 8),
+            max_players=4,
+        )
+        db.session.add(loose)
+        db.session.commit()
+        ids = {f"lessoninstance-{instance.id}", f"lessoninstance-{loose.id}"}
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+    window = {"from": "2030-01-01T00:00:00Z", "to": "2030-03-01T00:00:00Z"}
+    bodies = []
+    for expand_in_sql in (False, True):
+        app.config["CALENDAR_SQL_EXPANSION"] = expand_in_sql
+        response = client.get("/api/app/calendar", headers=headers, query_string=window)
+        assert response.status_code == 200
+        bodies.append(response.get_json())
+
+    python_events, sql_events = (sorted(body, key=lambda e: e["id"]) for body in bodies)
+    assert ids <= {event["id"] for event in python_events}
+    assert sql_events == python_events
+
+
+def test_calendar_sql_expansion_gives_the_same_events(app):
+    _assert_sql_expansion_gives_the_same_events(app)
+
+
+@pytest.fixture
+def postgres_app():
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": url,
+            "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            "STORAGE_BACKEND": "fake",
+            "JOBS_BACKEND": "immediate",
+        }
+    )
+    with app.app_context():
+        init_db(app)
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_generate_series_expands_occurrences(postgres_app):
+    with postgres_app.app_context():
+        lessons, instance = _add_occurrence_lessons()
+        rows = load_lesson_occurrences(Lesson.query, RANGE_START, RANGE_END)
+        _assert_expected_occurrences(rows, lessons, instance)
+
+
+def test_calendar_sql_expansion_on_postgres(postgres_app):
+    _assert_sql_expansion_gives_the_same_events(postgres_app)
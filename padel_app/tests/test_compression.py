@@ -0,0 +1,114 @@
+import gzip
+import zlib
+
+import pytest
+from flask import Response, jsonify
+
+from padel_app import compression
+from padel_app.tools.http_cache_tools import cache_policy
+
+
+@pytest.fixture
+def routes(app):
+    compression.body_cache.clear()
+    payload = [{"id": i, "title": "Group lesson", "status": "scheduled"} for i in range(200)]
+
+    @app.get("/test/large")
+    def large():
+        return jsonify(payload)
+
+    @app.get("/test/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.get("/test/versioned")
+    @cache_policy(lambda: 1)
+    def versioned():
+        return jsonify(payload)
+
+    calls = []
+
+    @app.get("/test/fixed_version")
+    @cache_policy(lambda: 1)
+    def fixed_version():
+        calls.append(1)
+        return jsonify({"n": len(calls), "payload": payload})
+
+    @app.get("/test/stream")
+    def stream():
+        return Response(
+            (f"data: {i}\n\n" for i in range(3)), mimetype="text/event-stream"
+        )
+
+    return payload
+
+
+def test_large_json_is_gzipped(client, routes):
+    response = client.get("/test/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert gzip.decompress(response.data) == client.get("/test/large").data
+
+
+def test_small_or_unaccepted_bodies_are_left_alone(client, routes):
+    assert "Content-Encoding" not in client.get(
+        "/test/small", headers={"Accept-Encoding": "gzip"}
+    ).headers
+    assert "Content-Encoding" not in client.get("/test/large").headers
+    assert "Content-Encoding" not in client.get(
+        "/test/large", headers={"Accept-Encoding": "gzip;q=0"}
+    ).headers
+
+
+def test_streams_are_compressed_chunk_by_chunk(client, routes):
+    response = client.get("/test/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunks = list(response.response)
+    # Each event can be decoded as soon as it arrives.
+    assert decoder.decompress(chunks[0]) == b"data: 0\n\n"
+    assert decoder.decompress(b"".join(chunks[1:])) == b"data: 1\n\ndata: 2\n\n"
+
+
+def test_etagged_bodies_are_compressed_once(client, routes, monkeypatch):
+    calls = []
+    original = compression.compress
+
+    def counting(*args):
+        calls.append(args[1])
+        return original(*args)
+
+    monkeypatch.setattr(compression, "compress", counting)
+    first = client.get("/test/versioned", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/test/versioned", headers={"Accept-Encoding": "gzip"})
+
+    assert first.data == second.data
+    assert calls == ["gzip"]
+    assert first.headers["ETag"].endswith('-gzip"')
+
+
+def test_compressed_etag_still_revalidates(client, routes):
+    etag = client.get("/test/versioned", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    response = client.get(
+        "/test/versioned", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_brotli_is_preferred_when_installed(client, routes):
+    brotli = pytest.importorskip("brotli")
+    response = client.get("/test/large", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data) == client.get("/test/large").data
+
+
+def test_cached_bodies_follow_the_rendered_output(client, routes):
+    # The version doesn't change, but the view's output does.
+    first = client.get("/test/fixed_version", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/test/fixed_version", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(first.data).startswith(b'{"n":1')
+    assert gzip.decompress(second.data).startswith(b'{"n":2')
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from padel_app.sql_db import db
+from padel_app.models import (
+    Association_CoachLesson,
+    Club,
+    Coach,
+    Lesson,
+    LessonInstance,
+    User,
+)
+from padel_app.tools.explain_tools import (
+    _sequential_scans,
+    check_query_plans,
+    hot_queries,
+)
+
+
+@pytest.fixture
+def coach_ids(app):
+    with app.app_context():
+        user = User(name="Coach", username="coach")
+        coach = Coach(user=user)
+        club = Club(name="Club")
+        start = datetime.utcnow() + timedelta(days=1)
+        lesson = Lesson(
+            title="Class",
+            type="academy",
+            max_players=4,
+            club=club,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+        )
+        db.session.add_all(
+            [
+                user,
+                coach,
+                club,
+                lesson,
+                Association_CoachLesson(coach=coach, lesson=lesson),
+                LessonInstance(
+                    lesson=lesson,
+                    start_datetime=start,
+                    end_datetime=start + timedelta(hours=1),
+                    max_players=4,
+                ),
+            ]
+        )
+        db.session.commit()
+        return coach.id, user.id
+
+
+def test_hot_queries_execute(app, coach_ids):
+    coach_id, user_id = coach_ids
+    with app.app_context():
+        queries = hot_queries(coach_id=coach_id, user_id=user_id)
+        assert len(queries["calendar.lessons"].all()) == 1
+        assert len(queries["calendar.instances"].all()) == 1
+        assert queries["inbox.unread"].scalar() == 0
+
+
+def test_check_query_plans_indexed_calendar(app, coach_ids):
+    coach_id, user_id = coach_ids
+    with app.app_context():
+        plans, _ = check_query_plans(coach_id=coach_id, user_id=user_id)
+        assert set(plans) == set(hot_queries(coach_id=coach_id, user_id=user_id))
+        assert "lesson_instances" not in plans["calendar.instances"]
+        assert "calendar_blocks" not in plans["calendar.blocks"]
+
+
+def test_check_query_plans_flags_large_scans(app, coach_ids):
+    coach_id, user_id = coach_ids
+    with app.app_context():
+        plans, violations = check_query_plans(
+            coach_id=coach_id, user_id=user_id, min_rows=0
+        )
+        flagged = {(v["query"], v["table"]) for v in violations}
+        expected = {(name, table) for name, tables in plans.items() for table in tables}
+        assert flagged == expected
+
+
+@pytest.mark.parametrize(
+    "detail",
+    ["SCAN lesson_instances", "SCAN TABLE lesson_instances", "SCAN TABLE lesson_instances AS li"],
+)
+def test_sequential_scans_sqlite_forms(detail):
+    plan = [(2, 0, 0, detail), (3, 0, 0, "SEARCH lessons USING INTEGER PRIMARY KEY (rowid=?)")]
+    assert _sequential_scans("sqlite", plan) == ["lesson_instances"]
+
+
+def test_sequential_scans_skip_index_scans():
+    plan = [(2, 0, 0, "SCAN TABLE lessons USING COVERING INDEX ix_lessons_start")]
+    assert _sequential_scans("sqlite", plan) == []
+
+
+def test_db_explain_command(runner, coach_ids):
+    result = runner.invoke(args=["db-explain"])
+    assert result.exit_code == 0
+    assert "calendar.instances" in result.output
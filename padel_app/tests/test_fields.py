@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from padel_app.identity import identity_cache
+from padel_app.models import (
+    Association_PlayerLessonInstance,
+    Club,
+    Coach,
+    Lesson,
+    LessonInstance,
+    Player,
+    Presence,
+    User,
+)
+from padel_app.serializers.fields import FieldSet
+from padel_app.serializers.user import serialize_user
+from padel_app.sql_db import db
+
+
+@pytest.fixture
+def lesson_instance(app):
+    app.config["JWT_SECRET_KEY"] = "fields-secret"
+    identity_cache.clear()
+    with app.app_context():
+        coach_user = User(name="Coach Carter", username="carter", password="x")
+        coach = Coach(user=coach_user)
+        player = Player(user=User(name="Ana Silva", username="ana", password="x"))
+        start = datetime(2030, 1, 7, 18, 0)
+        lesson = Lesson(
+            title="Group",
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            type="academy",
+            max_players=4,
+            club=Club(name="Club"),
+        )
+        instance = LessonInstance(
+            lesson=lesson,
+            original_lesson_occurence_date=start.date(),
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            max_players=4,
+        )
+        db.session.add_all([coach, player, lesson, instance])
+        db.session.flush()
+        db.session.add_all([
+            Association_PlayerLessonInstance(lesson_instance_id=instance.id, player_id=player.id),
+            Presence(lesson_instance_id=instance.id, player_id=player.id),
+        ])
+        db.session.commit()
+        token = create_access_token(identity=str(coach_user.id))
+        return {
+            "id": instance.id,
+            "headers": {"Authorization": f"Bearer {token}"},
+        }
+
+
+def test_parse_nests_dotted_paths():
+    fields = FieldSet.parse("id, participants.user.name")
+    assert "id" in fields and "name" not in fields
+    assert "name" in fields.nested("participants").nested("user")
+    assert fields.nested("id") is None
+
+
+@pytest.mark.parametrize("spec", ["participants,participants.id", "participants.id,participants"])
+def test_parse_whole_object_wins(spec):
+    assert FieldSet.parse(spec).nested("participants") is None
+
+
+def test_serialize_user_skips_unrequested_computed_fields(app, monkeypatch):
+    def fail(self, size):
+        raise AssertionError("avatarUrl was not requested")
+
+    monkeypatch.setattr(User, "avatar_url", fail)
+    with app.app_context():
+        user = User(name="Ana Silva", username="ana")
+        assert serialize_user(user, FieldSet.parse("id,name,abbreviation")) == {
+            "id": None,
+            "name": "Ana Silva",
+            "abbreviation": "AS",
+        }
+
+
+def test_class_instance_loads_only_requested_relationships(
+    client, lesson_instance, statements
+):
+    query = {"model": "lessoninstance", "id": lesson_instance["id"]}
+    with statements:
+        response = client.post(
+            "/api/app/class_instance",
+            headers=lesson_instance["headers"],
+            query_string={**query, "fields": "name,participants.user.name"},
+        )
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "name": "Group",
+        "participants": [{"user": {"name": "Ana Silva"}}],
+    }
+    sql = " ".join(statements.of("SELECT")).lower()
+    assert "presences" not in sql
+    assert "images" not in sql
+
+    full = client.post(
+        "/api/app/class_instance", headers=lesson_instance["headers"], query_string=query
+    ).get_json()
+    assert {"coachId", "participants", "presences", "notes"} <= set(full)
+    assert "avatarUrl" in full["participants"][0]["user"]
+
+
+def test_invalid_fields_are_rejected(client):
+    assert client.get("/api/app/lessons", query_string={"fields": "id,,name"}).status_code == 400
+
+
+def test_lessons_fields_drop_coach_ids(client, lesson_instance):
+    body = client.get("/api/app/lessons", query_string={"fields": "id,name"}).get_json()
+    assert body == [{"id": body[0]["id"], "name": "Group"}]
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from padel_app.identity import identity_cache
+from padel_app.model import Image
+from padel_app.models import (
+    Association_CoachLesson,
+    Club,
+    Coach,
+    CoachLevel,
+    Lesson,
+    LessonInstance,
+    User,
+)
+from padel_app.modules import frontend_api
+from padel_app.sql_db import db
+from padel_app.tools.http_cache_tools import make_etag
+
+
+@pytest.fixture
+def coach(app):
+    app.config["JWT_SECRET_KEY"] = "etag-secret"
+    identity_cache.clear()
+    with app.app_context():
+        user = User(name="Coach Carter", username="carter", password="x")
+        coach = Coach(user=user)
+        club = Club(name="Club")
+        start = datetime(2030, 1, 7, 18, 0)
+        lesson = Lesson(
+            title="Group",
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            type="academy",
+            max_players=4,
+            club=club,
+        )
+        db.session.add_all([user, coach, club, lesson])
+        db.session.flush()
+        db.session.add_all([
+            CoachLevel(coach_id=coach.id, label="Beginner", code="B"),
+            Association_CoachLesson(coach_id=coach.id, lesson_id=lesson.id),
+        ])
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        return {
+            "coach_id": coach.id,
+            "lesson_id": lesson.id,
+            "start": start,
+            "headers": {"Authorization": f"Bearer {token}"},
+        }
+
+
+def _get(client, path, headers, etag=None, **query):
+    if etag:
+        headers = {**headers, "If-None-Match": etag}
+    return client.get(path, headers=headers, query_string=query)
+
+
+def test_make_etag_is_stable_and_order_insensitive():
+    assert make_etag({"a": 1, "b": 2}) == make_etag({"b": 2, "a": 1})
+    assert make_etag(1) != make_etag(2)
+
+
+def test_coach_levels_revalidate_without_serializing(client, coach, monkeypatch):
+    first = _get(client, "/api/app/coach_levels", coach["headers"])
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, max-age=0, must-revalidate"
+    assert "Authorization" in first.headers["Vary"]
+    etag = first.headers["ETag"]
+
+    calls = []
+    monkeypatch.setattr(
+        frontend_api, "serialize_coach_level", lambda level: calls.append(level)
+    )
+    second = _get(client, "/api/app/coach_levels", coach["headers"], etag)
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert calls == []
+
+
+def test_coach_levels_etag_changes_with_data(app, client, coach):
+    etag = _get(client, "/api/app/coach_levels", coach["headers"]).headers["ETag"]
+    with app.app_context():
+        db.session.add(CoachLevel(coach_id=coach["coach_id"], label="Pro", code="P"))
+        db.session.commit()
+
+    response = _get(client, "/api/app/coach_levels", coach["headers"], etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [level["label"] for level in response.get_json()] == ["Beginner", "Pro"]
+
+
+def test_calendar_etag_follows_change_log_and_range(app, client, coach):
+    window = {"from": "2030-01-06T00:00:00Z", "to": "2030-01-13T00:00:00Z"}
+    etag = _get(client, "/api/app/calendar", coach["headers"], **window).headers["ETag"]
+    assert _get(client, "/api/app/calendar", coach["headers"], etag, **window).status_code == 304
+
+    other_window = {**window, "to": "2030-01-20T00:00:00Z"}
+    assert _get(client, "/api/app/calendar", coach["headers"], etag, **other_window).status_code == 200
+
+    with app.app_context():
+        db.session.add(LessonInstance(
+            lesson_id=coach["lesson_id"],
+            original_lesson_occurence_date=coach["start"].date(),
+            start_datetime=coach["start"],
+            end_datetime=coach["start"] + timedelta(hours=1),
+            max_players=3,
+        ))
+        db.session.commit()
+    assert _get(client, "/api/app/calendar", coach["headers"], etag, **window).status_code == 200
+
+
+def test_endpoints_without_a_policy_stay_no_store(client, coach):
+    response = _get(client, "/api/app/messages/unread_count", coach["headers"])
+    assert response.headers["Cache-Control"] == "no-cache, no-store, must-revalidate"
+    assert "ETag" not in response.headers
+
+
+def test_image_redirect_keeps_its_own_max_age(app, client):
+    with app.app_context():
+        public = Image(object_key="a.png", content_type="image/png", is_public=True)
+        private = Image(object_key="b.png", content_type="image/png", is_public=False)
+        db.session.add_all([public, private])
+        db.session.commit()
+        ids = public.id, private.id
+
+    assert client.get(f"/api/image/{ids[0]}").headers["Cache-Control"] == "public, max-age=86400"
+    assert client.get(f"/api/image/{ids[1]}").headers["Cache-Control"].startswith("private, max-age=")
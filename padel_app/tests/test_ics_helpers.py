@@ -0,0 +1,245 @@
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from dateutil.rrule import rrulestr
+from flask_jwt_extended import create_access_token
+
+from padel_app.helpers import ics_helpers
+from padel_app.identity import identity_cache
+from padel_app.models import (
+    Association_CoachLesson,
+    CalendarBlock,
+    Club,
+    Coach,
+    Lesson,
+    LessonInstance,
+    User,
+)
+from padel_app.sql_db import db
+from padel_app.tools.calendar_tools import expand_occurrences
+from padel_app.tools.ics_tools import fold
+
+
+@pytest.fixture
+def coach(app):
+    app.config["JWT_SECRET_KEY"] = "ics-secret"
+    app.config["SECRET_KEY"] = "ics-feed-secret"
+    identity_cache.clear()
+    ics_helpers.feed_cache.clear()
+    today = date.today()
+    monday = datetime.combine(today - timedelta(days=today.weekday()), datetime.min.time())
+    start = monday + timedelta(hours=18)
+    with app.app_context():
+        user = User(name="Coach Carter", username="carter", password="x", status="active")
+        coach = Coach(user=user)
+        lesson = Lesson(
+            title="Group, advanced",
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            type="academy",
+            max_players=4,
+            club=Club(name="Club"),
+            is_recurring=True,
+            recurrence_rule=json.dumps({"frequency": "weekly", "daysOfWeek": [1, 3]}),
+            recurrence_end=(start + timedelta(weeks=4)).date(),
+        )
+        db.session.add_all([user, coach, lesson])
+        db.session.flush()
+        db.session.add_all([
+            Association_CoachLesson(coach_id=coach.id, lesson_id=lesson.id),
+            LessonInstance(
+                lesson_id=lesson.id,
+                original_lesson_occurence_date=(start + timedelta(weeks=1)).date(),
+                start_datetime=start + timedelta(weeks=1),
+                end_datetime=start + timedelta(weeks=1, hours=1),
+                max_players=4,
+                status="canceled",
+            ),
+            LessonInstance(
+                lesson_id=lesson.id,
+                original_lesson_occurence_date=(start + timedelta(days=2)).date(),
+                start_datetime=start + timedelta(days=2, hours=1),
+                end_datetime=start + timedelta(days=2, hours=2),
+                max_players=4,
+                status="rescheduled",
+                notes="Court 3",
+            ),
+            CalendarBlock(
+                user_id=user.id,
+                type="personal",
+                title="Dentist",
+                start_datetime=start + timedelta(days=1),
+                end_datetime=start + timedelta(days=1, hours=1),
+            ),
+        ])
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        return {
+            "user_id": user.id,
+            "coach_id": coach.id,
+            "lesson_id": lesson.id,
+            "start": start,
+            "headers": {"Authorization": f"Bearer {token}"},
+        }
+
+
+def _feed_path(client, coach):
+    url = client.get("/api/app/calendar/feed", headers=coach["headers"]).get_json()["url"]
+    return url.split("localhost", 1)[1]
+
+
+def _events(body):
+    unfolded = body.decode().replace("\r\n ", "")
+    events = []
+    for block in unfolded.split("BEGIN:VEVENT\r\n")[1:]:
+        event = {}
+        for line in block.split("END:VEVENT")[0].splitlines():
+            name, _, value = line.partition(":")
+            event.setdefault(name, []).append(value)
+        events.append(event)
+    return events
+
+
+def test_fold_keeps_lines_short_and_characters_whole():
+    line = "SUMMARY:" + "Aula de padel – nível avançado " * 5
+    folded = fold(line)
+    physical = folded.split(b"\r\n")[:-1]
+    assert all(len(part) <= 75 for part in physical)
+    assert folded.replace(b"\r\n ", b"").decode() == line + "\r\n"
+
+
+def test_feed_is_a_series_with_exdates_and_overrides(client, coach):
+    response = client.get(_feed_path(client, coach))
+    assert response.status_code == 200
+    assert response.mimetype == "text/calendar"
+
+    events = _events(response.data)
+    uid = f"lesson-{coach['lesson_id']}@levelup"
+    master = next(e for e in events if e["UID"] == [uid] and "RRULE" in e)
+    override = next(e for e in events if e["UID"] == [uid] and "RECURRENCE-ID" in e)
+    block = next(e for e in events if e["UID"][0].startswith("block-"))
+
+    start = coach["start"]
+    assert master["SUMMARY"] == ["Group\\, advanced"]
+    assert master["EXDATE"] == [(start + timedelta(weeks=1)).strftime("%Y%m%dT%H%M%SZ")]
+    assert override["RECURRENCE-ID"] == [(start + timedelta(days=2)).strftime("%Y%m%dT%H%M%SZ")]
+    assert override["DTSTART"] == [(start + timedelta(days=2, hours=1)).strftime("%Y%m%dT%H%M%SZ")]
+    assert override["DESCRIPTION"] == ["Court 3"]
+    assert block["SUMMARY"] == ["Dentist"] and "RRULE" not in block
+
+    # The series lists the same dates as the JSON calendar expands.
+    rule = rrulestr(
+        "DTSTART:{}\nRRULE:{}\nEXDATE:{}".format(
+            master["DTSTART"][0], master["RRULE"][0], master["EXDATE"][0]
+        ),
+        forceset=True,
+    )
+    lesson_rule = json.dumps({"frequency": "weekly", "daysOfWeek": [1, 3]})
+    expected = [
+        occurrence
+        for occurrence in expand_occurrences(
+            start, lesson_rule, (start + timedelta(weeks=4)).date(),
+            start - timedelta(days=1), start + timedelta(weeks=5),
+        )
+        if occurrence.replace(tzinfo=None) != start + timedelta(weeks=1)
+    ]
+    assert list(rule) == expected
+
+
+def test_feed_revalidates_and_is_served_from_cache(app, client, coach, monkeypatch):
+    path = _feed_path(client, coach)
+    first = client.get(path)
+    body = first.data  # the feed is cached once it has been streamed in full
+    etag = first.headers["ETag"]
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+    def fail(*args):
+        raise AssertionError("feed was rendered again")
+
+    monkeypatch.setattr(ics_helpers, "load_feed", fail)
+    assert client.get(path).data == body
+    monkeypatch.undo()
+
+    with app.app_context():
+        start = coach["start"] + timedelta(weeks=2)
+        db.session.add(LessonInstance(
+            lesson_id=coach["lesson_id"],
+            original_lesson_occurence_date=start.date(),
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            max_players=4,
+            status="canceled",
+        ))
+        db.session.commit()
+
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.data.count(b"EXDATE:") == 2
+
+
+def test_feed_rejects_bad_tokens(client, coach):
+    assert client.get("/api/app/calendar/feed/not-a-token.ics").status_code == 404
+
+
+def test_reset_revokes_the_feed_url(client, coach):
+    old = _feed_path(client, coach)
+    assert _feed_path(client, coach) == old
+
+    new = client.post("/api/app/calendar/feed/reset", headers=coach["headers"]).get_json()["url"]
+    assert client.get(old).status_code == 404
+    assert client.get(new.split("localhost", 1)[1]).status_code == 200
+
+
+def test_feeds_of_inactive_users_are_refused(app, client, coach):
+    path = _feed_path(client, coach)
+    with app.app_context():
+        db.session.get(User, coach["user_id"]).status = "disabled"
+        db.session.commit()
+    assert client.get(path).status_code == 404
+
+
+def test_series_are_cut_down_to_the_feed_window(app, client, coach):
+    app.config["ICS_PAST_DAYS"] = 14
+    app.config["ICS_FUTURE_DAYS"] = 28
+    start = coach["start"] - timedelta(weeks=30)
+    weekly = json.dumps({"frequency": "weekly", "daysOfWeek": [1]})
+    with app.app_context():
+        lesson = Lesson(
+            title="Old series",
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            type="academy",
+            max_players=4,
+            club=Club(name="Other club"),
+            is_recurring=True,
+            recurrence_rule=weekly,
+        )
+        db.session.add(lesson)
+        db.session.flush()
+        db.session.add_all([
+            Association_CoachLesson(coach_id=coach["coach_id"], lesson_id=lesson.id),
+            # Outside the window, so never loaded for the feed.
+            LessonInstance(
+                lesson_id=lesson.id,
+                original_lesson_occurence_date=(start + timedelta(weeks=10)).date(),
+                start_datetime=start + timedelta(weeks=10),
+                end_datetime=start + timedelta(weeks=10, hours=1),
+                max_players=4,
+                status="canceled",
+            ),
+        ])
+        db.session.commit()
+        window_start, window_end = ics_helpers.feed_window()
+        lesson_id = lesson.id
+
+    events = _events(client.get(_feed_path(client, coach)).data)
+    [master] = [e for e in events if e["UID"] == [f"lesson-{lesson_id}@levelup"]]
+    rule = rrulestr(
+        "DTSTART:{}\nRRULE:{}".format(master["DTSTART"][0], master["RRULE"][0])
+    )
+    occurrences = list(rule)
+    assert occurrences
+    assert all(window_start <= o <= window_end for o in occurrences)
+    assert occurrences == expand_occurrences(start, weekly, None, window_start, window_end)
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from padel_app.identity import identity_cache, load_user
+from padel_app.models import Association_CoachClub, Club, Coach, User
+from padel_app.sql_db import db
+
+
+@pytest.fixture
+def coach_user(app):
+    app.config["JWT_SECRET_KEY"] = "identity-secret"
+    identity_cache.clear()
+    with app.app_context():
+        user = User(name="Coach Carter", username="carter", password="x")
+        coach = Coach(user=user)
+        first, second = Club(name="First"), Club(name="Second")
+        db.session.add_all([user, coach, first, second])
+        db.session.flush()
+        now = datetime.utcnow()
+        db.session.add_all([
+            Association_CoachClub(coach=coach, club=second, created_at=now),
+            Association_CoachClub(
+                coach=coach, club=first, created_at=now - timedelta(days=1)
+            ),
+        ])
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        return {"user_id": user.id, "coach_id": coach.id, "token": token}
+
+
+def test_load_user_matches_model_properties(app, coach_user):
+    with app.app_context():
+        user, club = load_user(coach_user["user_id"])
+        assert user.coach.id == coach_user["coach_id"]
+        assert user.player is None
+        assert club.name == "First"
+        assert club is user.coach.current_club
+
+
+def test_me_is_served_from_cache_on_repeat(app, client, coach_user, statements):
+    headers = {"Authorization": f"Bearer {coach_user['token']}"}
+    with statements:
+        first = client.get("/api/auth/me", headers=headers)
+        after_first = len(statements)
+        second = client.get("/api/auth/me", headers=headers)
+
+    assert first.status_code == 200
+    assert first.get_json() == {
+        "id": coach_user["user_id"],
+        "username": "carter",
+        "name": "Coach Carter",
+        "roles": ["coach"],
+        "coachId": coach_user["coach_id"],
+    }
+    assert after_first == 1
+    assert second.get_json() == first.get_json()
+    assert len(statements) == after_first
+
+
+def test_cache_is_invalidated_when_user_changes(app, client, coach_user):
+    headers = {"Authorization": f"Bearer {coach_user['token']}"}
+    client.get("/api/auth/me", headers=headers)
+
+    with app.app_context():
+        user = db.session.get(User, coach_user["user_id"])
+        user.name = "Renamed"
+        db.session.commit()
+
+    assert client.get("/api/auth/me", headers=headers).get_json()["name"] == "Renamed"
@@ -0,0 +1,75 @@
+import io
+import json
+
+import pytest
+from PIL import Image as PILImage
+from werkzeug.datastructures import FileStorage
+
+from padel_app import storage
+from padel_app.model import Image
+from padel_app.sql_db import db
+from padel_app.tools import image_tools
+
+
+@pytest.fixture
+def local_storage(app, tmp_path):
+    backend = storage.LocalStorage(tmp_path)
+    storage.set_storage(backend)
+    yield backend
+    storage.set_storage(storage.FakeStorage())
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (width, height), (200, 30, 30)).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def test_save_file_streams_and_returns_size(local_storage):
+    data = _png(40, 20).getvalue()
+    upload = FileStorage(io.BytesIO(data), filename="a.png", content_type="image/png")
+
+    assert image_tools.save_file(upload, "images/User/a.png") == len(data)
+    with local_storage.open("images/User/a.png") as f:
+        assert f.read() == data
+
+
+def test_local_storage_rejects_keys_outside_root(local_storage):
+    with pytest.raises(ValueError):
+        local_storage.upload("../escape.png", io.BytesIO(b"x"))
+
+
+def test_generate_derivatives_records_sizes(app, local_storage):
+    local_storage.upload("images/User/big.png", _png(1200, 600))
+
+    with app.app_context():
+        img = Image(object_key="images/User/big.png", content_type="image/png")
+        img.create()
+        keys = image_tools.schedule_derivatives(img)
+
+        assert keys == {
+            "thumb": "images/User/big_thumb.webp",
+            "medium": "images/User/big_medium.webp",
+        }
+        for name, edge in image_tools.DERIVATIVE_SIZES.items():
+            with local_storage.open(keys[name]) as f:
+                assert PILImage.open(f).size == (edge, edge // 2)
+
+        db.session.expire_all()
+        img = db.session.get(Image, img.id)
+        assert json.loads(img.derivatives) == keys
+        assert img.url("thumb") == "/uploads/images/User/big_thumb.webp"
+        assert img.url() == "/uploads/images/User/big.png"
+
+
+def test_url_falls_back_to_original_until_derivatives_exist(app):
+    with app.app_context():
+        img = Image(object_key="images/User/x.png", is_public=True)
+        assert img.url("medium") == img.url()
+
+
+def test_non_images_are_not_scheduled(app):
+    with app.app_context():
+        img = Image(object_key="docs/a.pdf", content_type="application/pdf")
+        assert image_tools.schedule_derivatives(img) is None
@@ -0,0 +1,101 @@
+import io
+
+
+from padel_app.sql_db import db
+from padel_app.models import Club, Lesson, User
+from padel_app.tools.import_tools import import_csv
+
+
+def test_import_csv_inserts_and_updates(app):
+    with app.app_context():
+        club = Club(name="Old name")
+        db.session.add(club)
+        db.session.commit()
+
+        body = f"id,name,location,unknown\n{club.id},New name,Porto,x\n,Fresh,Lisboa,y\n"
+        result = import_csv(Club, io.StringIO(body))
+
+        assert result.errors == []
+        assert (result.inserted, result.updated) == (1, 1)
+        assert result.ignored_columns == ["unknown"]
+        assert db.session.get(Club, club.id).name == "New name"
+        assert Club.query.filter_by(name="Fresh").one().location == "Lisboa"
+
+
+def test_import_csv_keeps_values_of_empty_cells(app):
+    with app.app_context():
+        renamed = Club(name="Old name", location="Porto")
+        moved = Club(name="Moved", location="Porto")
+        db.session.add_all([renamed, moved])
+        db.session.commit()
+
+        body = f"id,name,location\n{renamed.id},New name,\n{moved.id},,Braga\n"
+        result = import_csv(Club, io.StringIO(body))
+
+        assert result.errors == []
+        assert result.updated == 2
+        assert (renamed.name, renamed.location) == ("New name", "Porto")
+        assert (moved.name, moved.location) == ("Moved", "Braga")
+
+
+def test_import_csv_reports_row_errors(app):
+    with app.app_context():
+        club = Club(name="Club")
+        db.session.add(club)
+        db.session.commit()
+
+        body = (
+            "title,type,max_players,club_id,start_datetime,end_datetime\n"
+            f"Good,academy,4,{club.id},2026-01-05T09:00:00,2026-01-05 10:00\n"
+            f"Bad type,camp,4,{club.id},2026-01-05T09:00:00,2026-01-05T10:00:00\n"
+            f"Bad int,private,four,{club.id},2026-01-05T09:00:00,2026-01-05T10:00:00\n"
+            f",private,2,{club.id},2026-01-05T09:00:00,2026-01-05T10:00:00\n"
+        )
+        result = import_csv(Lesson, io.StringIO(body), key="title")
+
+        assert result.inserted == 1
+        assert [e["row"] for e in result.errors] == [3, 4, 5]
+        assert "type" in result.errors[0]["error"]
+        assert "max_players" in result.errors[1]["error"]
+        assert "missing title" in result.errors[2]["error"]
+        assert Lesson.query.one().end_datetime.hour == 10
+
+
+def test_import_csv_isolates_database_errors(app):
+    with app.app_context():
+        db.session.add(User(name="Taken", username="taken"))
+        db.session.commit()
+
+        body = "name,username\nA,alpha\nB,taken\nC,gamma\n"
+        result = import_csv(User, io.StringIO(body), key="name")
+
+        assert result.inserted == 2
+        assert len(result.errors) == 1
+        assert result.errors[0]["row"] == 3
+        assert User.query.count() == 3
+
+
+def test_import_csv_batches_statements(app, statements):
+    with app.app_context():
+        rows = "".join(f"Club {i},Lisboa\n" for i in range(250))
+        with statements:
+            result = import_csv(Club, io.StringIO("name,location\n" + rows), chunk_size=100)
+
+        assert result.inserted == 250
+        assert Club.query.count() == 250
+        assert len(statements.of("SELECT")) == 3
+        assert len(statements.of("INSERT")) == 3
+
+
+def test_upload_csv_to_db_endpoint(client, app):
+    data = {"file": (io.BytesIO(b"name,location\nUploaded,Faro\n"), "club.csv")}
+    response = client.post("/api/upload_csv_to_db/club", data=data)
+    assert response.status_code == 200
+
+    bad = {"file": (io.BytesIO(b"name,max_players\n,x\n"), "club.csv")}
+    response = client.post("/api/upload_csv_to_db/club", data=bad)
+    assert response.status_code == 422
+    assert response.get_json()["errors"]
+
+    with app.app_context():
+        assert Club.query.filter_by(name="Uploaded").count() == 1
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from padel_app import jobs
+from padel_app.mail import mail
+from padel_app.models import Job
+from padel_app.sql_db import db
+from padel_app.tools import email_tools
+
+calls = []
+
+
+@jobs.task("test_flaky", max_attempts=2)
+def flaky(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError("boom")
+    return value * 2
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+@pytest.fixture
+def db_queue(app):
+    app.config["JOBS_BACKEND"] = "database"
+    app.config["JOBS_BACKOFF_SECONDS"] = 10
+    return app
+
+
+def test_immediate_backend_runs_inline(app):
+    with app.app_context():
+        assert jobs.enqueue("test_flaky", value=3) == 6
+    assert calls == [3]
+
+
+def test_thread_backend_retries_without_holding_workers(app):
+    app.config["JOBS_BACKEND"] = "thread"
+    app.config["JOBS_BACKOFF_SECONDS"] = 0.5
+    with app.app_context():
+        failing = [jobs.enqueue("test_flaky", value=i, fail=True) for i in range(4)]
+        # Every pool worker has a job waiting for its retry.
+        assert jobs.enqueue("test_flaky", value=9).result(timeout=0.4) == 18
+
+        for future in failing:
+            assert isinstance(future.exception(timeout=5), RuntimeError)
+    assert sorted(calls) == [0, 0, 1, 1, 2, 2, 3, 3, 9]
+
+
+def test_thread_backend_honours_delay(app):
+    app.config["JOBS_BACKEND"] = "thread"
+    with app.app_context():
+        future = jobs.enqueue("test_flaky", value=1, delay=timedelta(seconds=0.3))
+        assert not future.done()
+        assert future.result(timeout=2) == 2
+
+
+def test_immediate_backend_rejects_delay(app):
+    with app.app_context(), pytest.raises(ValueError):
+        jobs.enqueue("test_flaky", value=1, delay=timedelta(minutes=1))
+    assert calls == []
+
+
+def test_queue_email_goes_to_fake_smtp_sink(app, monkeypatch):
+    monkeypatch.setattr(email_tools, "MAIL_USERNAME", "noreply@example.com")
+    # TESTING suppresses delivery; record_messages is the SMTP sink.
+    with app.app_context(), mail.record_messages() as outbox:
+        email_tools.queue_email("Hello", ["a@example.com"], body="Hi")
+
+        assert len(outbox) == 1
+        assert outbox[0].subject == "Hello"
+        assert outbox[0].recipients == ["a@example.com"]
+
+
+def test_worker_runs_due_jobs_once(db_queue):
+    with db_queue.app_context():
+        job = jobs.enqueue("test_flaky", value=5)
+        later = jobs.enqueue("test_flaky", value=7, delay=timedelta(hours=1))
+        assert calls == []
+
+        assert jobs.work(once=True) == 1
+        assert calls == [5]
+        assert db.session.get(Job, job.id).status == "done"
+        assert db.session.get(Job, later.id).status == "queued"
+
+
+def test_failed_job_is_retried_with_backoff_then_given_up(db_queue):
+    with db_queue.app_context():
+        job = jobs.enqueue("test_flaky", value=1, fail=True)
+
+        before = datetime.utcnow()
+        assert jobs.work(once=True) == 1
+        job = db.session.get(Job, job.id)
+        assert job.status == "queued"
+        assert job.attempts == 1
+        assert "boom" in job.last_error
+        assert job.run_at >= before + timedelta(seconds=10)
+
+        # Not due yet: nothing to run.
+        assert jobs.work(once=True) == 0
+
+        job.run_at = datetime.utcnow()
+        db.session.commit()
+        assert jobs.work(once=True) == 1
+        job = db.session.get(Job, job.id)
+        assert job.status == "failed"
+        assert job.attempts == 2
+        assert calls == [1, 1]
+
+
+def test_stale_running_jobs_are_reclaimed(db_queue):
+    with db_queue.app_context():
+        job = jobs.enqueue("test_flaky", value=2)
+        job.status = "running"
+        job.locked_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        claimed = jobs.claim_jobs(worker="w2")
+        assert [j.id for j in claimed] == [job.id]
+        assert claimed[0].locked_by == "w2"
+
+
+def test_worker_cli(db_queue, runner):
+    with db_queue.app_context():
+        jobs.enqueue("test_flaky", value=4)
+
+    result = runner.invoke(args=["worker", "--once"])
+    assert "Ran 1 job(s)" in result.output
+    assert calls == [4]
+
+
+def test_unknown_job_name(app):
+    with app.app_context(), pytest.raises(LookupError):
+        jobs.enqueue("no_such_job")
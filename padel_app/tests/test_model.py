@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from padel_app.sql_db import db
+from padel_app.models import Club, Coach, CoachLevel, Lesson, User
+
+
+@pytest.fixture
+def lesson_refs(app):
+    with app.app_context():
+        user = User(name="Coach One", username="coach1")
+        coach = Coach(user=user)
+        club = Club(name="Club A")
+        other_club = Club(name="Club B")
+        level = CoachLevel(coach=coach, label="Beginner", code="B")
+        db.session.add_all([user, coach, club, other_club, level])
+        db.session.commit()
+        return {"club": club.id, "other_club": other_club.id, "level": level.id}
+
+
+def test_update_with_dict_batches_many_to_one(app, lesson_refs, statements):
+    with app.app_context():
+        db.session.expunge_all()
+        lesson = Lesson(
+            title="Morning",
+            type="academy",
+            max_players=4,
+            start_datetime=datetime(2026, 1, 5, 9),
+            end_datetime=datetime(2026, 1, 5, 10),
+        )
+
+        with statements:
+            lesson.update_with_dict(
+                {"club": [lesson_refs["club"]], "level": str(lesson_refs["level"])}
+            )
+
+        assert len(statements.of("SELECT")) == 2
+        assert lesson.club_id == lesson_refs["club"]
+        assert lesson.level.id == lesson_refs["level"]
+
+
+def test_update_with_dict_uses_identity_map(app, lesson_refs, statements):
+    with app.app_context():
+        club = Club.query.get(lesson_refs["other_club"])
+        lesson = Lesson(title="Evening", type="private", max_players=2)
+
+        with statements:
+            lesson.update_with_dict({"club": club.id, "title": "Late"})
+
+        assert statements.of("SELECT") == []
+        assert lesson.club is club
+        assert lesson.title == "Late"
+
+
+def test_update_with_dict_ignores_unknown_ids(app, lesson_refs):
+    with app.app_context():
+        lesson = Lesson(title="Ghost", type="private", max_players=2)
+        lesson.update_with_dict({"club": 9999})
+        assert lesson.club is None
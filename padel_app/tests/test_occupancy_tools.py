@@ -0,0 +1,260 @@
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from padel_app.identity import identity_cache
+from padel_app.models import (
+    Association_PlayerClub,
+    ChangeLog,
+    Association_PlayerLesson,
+    Association_PlayerLessonInstance,
+    ClassOccupancy,
+    Club,
+    Lesson,
+    LessonInstance,
+    Player,
+    User,
+)
+from padel_app.sql_db import db
+from padel_app.tools import occupancy_tools
+from padel_app.tools.import_tools import import_csv
+from padel_app.tools.occupancy_tools import rebuild, search_open_classes
+
+MONDAY = datetime(2030, 1, 7, 18, 0)
+
+
+@pytest.fixture
+def club_classes(app):
+    """A weekly lesson with one free seat, its materialized second week, and a full lesson."""
+    app.config["JWT_SECRET_KEY"] = "occupancy-secret"
+    identity_cache.clear()
+    with app.app_context():
+        club = Club(name="Club")
+        users = [User(name=f"Player {i}", username=f"p{i}", password="x") for i in range(3)]
+        players = [Player(user=u) for u in users]
+        weekly = Lesson(
+            title="Weekly",
+            start_datetime=MONDAY,
+            end_datetime=MONDAY + timedelta(hours=1),
+            is_recurring=True,
+            recurrence_rule=json.dumps({"frequency": "weekly", "daysOfWeek": [1]}),
+            type="academy",
+            max_players=2,
+            club=club,
+        )
+        full = Lesson(
+            title="Full",
+            start_datetime=MONDAY + timedelta(days=1),
+            end_datetime=MONDAY + timedelta(days=1, hours=1),
+            type="private",
+            max_players=1,
+            club=club,
+        )
+        db.session.add_all([club, *users, *players, weekly, full])
+        db.session.flush()
+
+        second_week = MONDAY + timedelta(weeks=1)
+        instance = LessonInstance(
+            lesson_id=weekly.id,
+            original_lesson_occurence_date=second_week.date(),
+            start_datetime=second_week,
+            end_datetime=second_week + timedelta(hours=1),
+            max_players=2,
+        )
+        db.session.add(instance)
+        db.session.flush()
+        db.session.add_all([
+            Association_PlayerLesson(lesson_id=weekly.id, player_id=players[0].id),
+            Association_PlayerLesson(lesson_id=full.id, player_id=players[1].id),
+            Association_PlayerLessonInstance(
+                lesson_instance_id=instance.id, player_id=players[0].id
+            ),
+            Association_PlayerLessonInstance(
+                lesson_instance_id=instance.id, player_id=players[1].id
+            ),
+            Association_PlayerClub(player_id=players[2].id, club_id=club.id),
+        ])
+        db.session.commit()
+        return {
+            "club_id": club.id,
+            "weekly_id": weekly.id,
+            "full_id": full.id,
+            "instance_id": instance.id,
+            "player_ids": [p.id for p in players],
+            "token": create_access_token(identity=str(users[2].id)),
+        }
+
+
+def _search(club_id, weeks=4, **kwargs):
+    start = MONDAY.replace(tzinfo=timezone.utc) - timedelta(hours=1)
+    return search_open_classes(club_id, start, start + timedelta(weeks=weeks), **kwargs)
+
+
+def test_index_is_written_on_flush(app, club_classes):
+    with app.app_context():
+        rows = {
+            (r.lesson_id, r.lesson_instance_id): r.open_seats
+            for r in ClassOccupancy.query.all()
+        }
+    assert rows == {
+        (club_classes["weekly_id"], None): 1,
+        (club_classes["full_id"], None): 0,
+        (club_classes["weekly_id"], club_classes["instance_id"]): 0,
+    }
+
+
+def test_search_skips_full_classes_and_materialized_occurrences(app, club_classes):
+    with app.app_context():
+        items, next_cursor = _search(club_classes["club_id"])
+    # Week 2 is materialized and full; the full lesson never shows.
+    assert [i["date"] for i in items] == ["2030-01-07", "2030-01-21", "2030-01-28"]
+    assert {i["openSeats"] for i in items} == {1}
+    assert next_cursor is None
+
+
+def test_search_follows_association_changes(app, club_classes):
+    with app.app_context():
+        Association_PlayerLessonInstance.query.filter_by(
+            lesson_instance_id=club_classes["instance_id"],
+            player_id=club_classes["player_ids"][1],
+        ).first().delete()
+        items, _ = _search(club_classes["club_id"], weeks=2)
+    assert [i["id"] for i in items] == [
+        f"lesson-{club_classes['weekly_id']}-2030-01-07",
+        f"lessoninstance-{club_classes['instance_id']}",
+    ]
+
+
+def _open_seats():
+    return {
+        (r.lesson_id, r.lesson_instance_id): r.open_seats
+        for r in ClassOccupancy.query.all()
+    }
+
+
+def test_bulk_statements_refresh_only_their_rows(app, club_classes, monkeypatch):
+    def fail(*args):
+        raise AssertionError("index was rebuilt")
+
+    monkeypatch.setattr(occupancy_tools, "rebuild", fail)
+    weekly, full, instance = (
+        club_classes["weekly_id"], club_classes["full_id"], club_classes["instance_id"]
+    )
+    with app.app_context():
+        Association_PlayerLessonInstance.query.filter_by(
+            player_id=club_classes["player_ids"][1]
+        ).delete(synchronize_session=False)
+        assert _open_seats()[(weekly, instance)] == 1
+
+        # Moving the instance rewrites it under its new lesson.
+        LessonInstance.query.filter_by(id=instance).update(
+            {LessonInstance.lesson_id: full}, synchronize_session=False
+        )
+        assert _open_seats() == {
+            (weekly, None): 1,
+            (full, None): 0,
+            (full, instance): 1,
+        }
+
+
+def test_csv_import_updates_index_and_changelog(app, club_classes):
+    with app.app_context():
+        before = ChangeLog.query.count()
+        body = f"id,lesson_id,player_id\n,{club_classes['weekly_id']},{club_classes['player_ids'][2]}\n"
+        result = import_csv(Association_PlayerLesson, io.StringIO(body), key="id")
+
+        assert (result.inserted, result.errors) == (1, [])
+        assert _open_seats()[(club_classes["weekly_id"], None)] == 0
+        logged = ChangeLog.query.filter(ChangeLog.id > before).all()
+        assert [(c.entity, c.lesson_id) for c in logged] == [
+            ("lessonPlayers", club_classes["weekly_id"])
+        ]
+
+
+def test_search_pages_with_cursor(app, club_classes):
+    with app.app_context():
+        first, cursor = _search(club_classes["club_id"], limit=2)
+        second, last = _search(club_classes["club_id"], limit=2, cursor=cursor)
+    assert [i["date"] for i in first + second] == ["2030-01-07", "2030-01-21", "2030-01-28"]
+    assert last is None
+
+
+def test_search_pages_through_classes_starting_together(app, club_classes):
+    start = MONDAY + timedelta(days=2)
+    with app.app_context():
+        lessons = [
+            Lesson(
+                title=f"Lesson {i}",
+                start_datetime=start,
+                end_datetime=start + timedelta(hours=1),
+                type="academy",
+                max_players=4,
+                club_id=club_classes["club_id"],
+            )
+            for i in range(4)
+        ]
+        db.session.add_all(lessons)
+        db.session.flush()
+        db.session.add_all(
+            LessonInstance(
+                lesson_id=lessons[0].id,
+                start_datetime=start,
+                end_datetime=start + timedelta(hours=1),
+                max_players=4,
+            )
+            for _ in range(12)
+        )
+        db.session.commit()
+
+        ids, cursor = [], None
+        while True:
+            items, cursor = _search(club_classes["club_id"], limit=5, cursor=cursor)
+            ids += [item["id"] for item in items]
+            if cursor is None:
+                break
+
+        everything, _ = _search(club_classes["club_id"], limit=100)
+    assert len(everything) == 3 + 4 + 12
+    assert ids == [item["id"] for item in everything]
+
+
+def test_rebuild_matches_incremental_index(app, club_classes):
+    def snapshot():
+        return sorted(
+            (r.lesson_id, r.lesson_instance_id or 0, r.participant_count, r.open_seats)
+            for r in ClassOccupancy.query.all()
+        )
+
+    with app.app_context():
+        before = snapshot()
+        assert rebuild() == 3
+        assert snapshot() == before
+
+
+def test_open_classes_endpoint_uses_players_club(client, club_classes):
+    response = client.get(
+        "/api/app/open_classes",
+        query_string={
+            "from": "2030-01-07T00:00:00Z",
+            "to": "2030-01-14T00:00:00Z",
+        },
+        headers={"Authorization": f"Bearer {club_classes['token']}"},
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [i["title"] for i in body["items"]] == ["Weekly"]
+    assert body["nextCursor"] is None
+
+    response = client.get(
+        "/api/app/open_classes",
+        query_string={
+            "from": "2030-01-07T00:00:00Z",
+            "to": "2030-01-14T00:00:00Z",
+            "clubId": club_classes["club_id"] + 1,
+        },
+        headers={"Authorization": f"Bearer {club_classes['token']}"},
+    )
+    assert response.status_code == 403
@@ -0,0 +1,111 @@
+import pytest
+from flask import get_template_attribute
+
+from padel_app.sql_db import db
+from padel_app.models import MODELS, Association_CoachClub, Club, Coach, User
+from padel_app.tools.pagination_tools import (
+    estimated_count,
+    keyset_paginate,
+    search_clause,
+)
+
+
+@pytest.fixture
+def clubs(app):
+    with app.app_context():
+        db.session.add_all([Club(name=f"Club {i:02d}") for i in range(25)])
+        db.session.commit()
+
+
+def test_keyset_paginate_walks_forward_and_back(app, clubs):
+    with app.app_context():
+        first = keyset_paginate(Club.query, Club.id, per_page=10)
+        assert [c.id for c in first.items] == list(range(1, 11))
+        assert (first.has_prev, first.has_next) == (False, True)
+
+        last = keyset_paginate(Club.query, Club.id, per_page=10, after=20)
+        assert [c.id for c in last.items] == list(range(21, 26))
+        assert (last.has_prev, last.has_next) == (True, False)
+
+        back = keyset_paginate(Club.query, Club.id, per_page=10, before=21)
+        assert [c.id for c in back.items] == list(range(11, 21))
+        assert (back.has_prev, back.has_next) == (True, True)
+
+
+def test_keyset_paginate_descending(app, clubs):
+    with app.app_context():
+        page = keyset_paginate(Club.query, Club.id, per_page=10, descending=True)
+        assert page.first_id == 25 and page.last_id == 16
+
+        page = keyset_paginate(
+            Club.query, Club.id, per_page=10, after=6, descending=True
+        )
+        assert [c.id for c in page.items] == [5, 4, 3, 2, 1]
+        assert not page.has_next
+
+
+def test_estimated_count_falls_back_to_exact(app, clubs):
+    with app.app_context():
+        assert estimated_count(Club) == (25, False)
+
+
+def test_search_clause_follows_declared_fields(app):
+    with app.app_context():
+        user = User(name="Rita Costa", username="rita")
+        coach = Coach(user=user)
+        club = Club(name="Padel Lisboa")
+        db.session.add_all(
+            [user, coach, club, Association_CoachClub(coach=coach, club=club)]
+        )
+        db.session.commit()
+
+        assert Club.query.filter(search_clause(Club, "padel")).count() == 1
+        assert Club.query.filter(search_clause(Club, "lisboa")).count() == 0
+        assert (
+            Club.query.filter(search_clause(Club, "lisboa", "trigram")).count() == 1
+        )
+        assert Coach.query.filter(search_clause(Coach, "rit")).count() == 1
+        assert (
+            Association_CoachClub.query.filter(
+                search_clause(Association_CoachClub, "rita")
+            ).count()
+            == 1
+        )
+        assert Club.query.filter(search_clause(Club, "%")).count() == 0
+
+
+def test_display_all_pages_and_searches(app, clubs):
+    with app.test_request_context():
+        data = Club().get_display_all_data(per_page=10, search="Club 2")
+        assert [c.name for c in data["objects"]] == [f"Club {i}" for i in range(20, 25)]
+        assert data["server_search"]
+        assert data["pagination"].total is None
+
+        data = Club().get_display_all_data(per_page=10, after=10)
+        assert data["objects"][0].name == "Club 10"
+        assert data["pagination"].total == 25
+
+        html = get_template_attribute("macros/editor.html", "objects_header")(data)
+        assert "?after=20" in html and "?before=11" in html
+        assert 'name="q"' in html
+
+
+@pytest.fixture
+def admin_client(app, client):
+    with app.app_context():
+        admin = User(name="Admin", username="admin", password="x", is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+    app.login_manager.request_loader(lambda request: db.session.get(User, admin_id))
+    return client
+
+
+# Models without display_all_info have no editor list.
+EDITOR_MODELS = sorted(name for name, model in MODELS.items() if "display_all_info" in vars(model))
+
+
+@pytest.mark.parametrize("model", EDITOR_MODELS)
+def test_editor_lists_every_model(admin_client, model):
+    assert admin_client.get(f"/editor/display/{model}").status_code == 200
+    assert admin_client.get(f"/editor/display/{model}?q=a").status_code == 200
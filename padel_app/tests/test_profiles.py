@@ -0,0 +1,54 @@
+import pytest
+
+from padel_app import create_app
+from padel_app.tools.bench_tools import startup_benchmark
+
+
+def _app(profile):
+    return create_app(
+        {
+            "APP_PROFILE": profile,
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            "STORAGE_BACKEND": "fake",
+            "JOBS_BACKEND": "immediate",
+        }
+    )
+
+
+def test_api_profile_serves_only_the_app_api():
+    app = _app("api")
+
+    assert {"frontend_api", "auth_api"} <= set(app.blueprints)
+    assert not {"editor", "auth", "api", "main"} & set(app.blueprints)
+    assert not hasattr(app, "login_manager")
+    assert "migrate" not in app.extensions
+    assert app.test_client().get("/api/auth/me").status_code == 401
+
+
+def test_admin_profile_serves_only_the_editor():
+    app = _app("admin")
+
+    assert {"editor", "auth", "api", "main"} <= set(app.blueprints)
+    assert "frontend_api" not in app.blueprints
+    assert app.login_manager is not None
+
+
+def test_full_profile_registers_everything():
+    app = _app("full")
+
+    assert {"editor", "frontend_api", "auth_api"} <= set(app.blueprints)
+    assert "migrate" in app.extensions
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        _app("worker")
+
+
+def test_startup_benchmark_reports_timings():
+    report = startup_benchmark("api", runs=1)
+
+    assert report["probeStatus"] == 401
+    assert report["importMs"] > 0 and report["firstRequestMs"] > 0
+    assert report["totalMs"] >= report["importMs"]
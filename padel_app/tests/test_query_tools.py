@@ -0,0 +1,66 @@
+import pytest
+
+from padel_app.sql_db import db
+from padel_app.models import Club
+
+
+@pytest.fixture
+def clubs(app):
+    with app.app_context():
+        db.session.add_all(
+            [
+                Club(name=f"Club {i:02d}", location="Porto" if i % 2 else "Lisboa")
+                for i in range(12)
+            ]
+        )
+        db.session.commit()
+
+
+def test_query_projects_filters_and_pages(client, clubs):
+    response = client.get(
+        "/api/query/club?fields=id,name&where=location:eq:Lisboa&limit=4"
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["items"] == [
+        {"id": i + 1, "name": f"Club {i:02d}"} for i in (0, 2, 4, 6)
+    ]
+    assert body["nextCursor"]
+
+    body = client.get(
+        "/api/query/club?fields=id,name&where=location:eq:Lisboa&limit=4"
+        f"&cursor={body['nextCursor']}"
+    ).get_json()
+    assert [item["id"] for item in body["items"]] == [9, 11]
+    assert body["nextCursor"] is None
+
+
+def test_query_orders_by_other_column_with_cursor(client, clubs):
+    payload = {
+        "fields": ["name"],
+        "filters": [{"field": "id", "op": "in", "value": [3, 5, 7, 9]}],
+        "order": "-name",
+        "limit": 3,
+    }
+    body = client.post("/api/query/club", json=payload).get_json()
+    assert [item["name"] for item in body["items"]] == ["Club 08", "Club 06", "Club 04"]
+
+    payload["cursor"] = body["nextCursor"]
+    body = client.post("/api/query/club", json=payload).get_json()
+    assert body["items"] == [{"name": "Club 02"}]
+    assert body["nextCursor"] is None
+
+
+def test_query_caps_limit(app, client, clubs):
+    app.config["API_QUERY_MAX_ROWS"] = 5
+    body = client.get("/api/query/club?limit=500").get_json()
+    assert len(body["items"]) == 5
+    assert set(body["items"][0]) >= {"id", "name", "location"}
+
+
+def test_query_rejects_bad_input(client):
+    assert client.get("/api/query/nope").status_code == 404
+    assert client.get("/api/query/club?fields=secret").status_code == 400
+    assert client.get("/api/query/club?where=id:between:1").status_code == 400
+    assert client.get("/api/query/club?where=id:eq:abc").status_code == 400
+    assert client.get("/api/query/club?cursor=garbage").status_code == 400
@@ -0,0 +1,81 @@
+import os
+import tempfile
+
+import pytest
+from flask import jsonify
+
+from padel_app import create_app
+from padel_app.models import User
+from padel_app.sql_db import REPLICA_BIND, db, replica_read
+
+
+def _make_app(replica_uri):
+    primary_fd, primary_path = tempfile.mkstemp()
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary_path}",
+            "SQLALCHEMY_BINDS": {REPLICA_BIND: replica_uri},
+            "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        }
+    )
+
+    @app.get("/_test/read")
+    @replica_read
+    def read():
+        return jsonify(sorted(u.username for u in User.query.all()))
+
+    @app.get("/_test/read_after_write")
+    @replica_read
+    def read_after_write():
+        db.session.add(User(name="New", username="new"))
+        db.session.flush()
+        return jsonify(sorted(u.username for u in User.query.all()))
+
+    @app.get("/_test/primary")
+    def primary():
+        return jsonify(sorted(u.username for u in User.query.all()))
+
+    with app.app_context():
+        db.create_all(bind=None)
+        db.session.add(User(name="Primary", username="primary"))
+        db.session.commit()
+    return app, primary_fd, primary_path
+
+
+@pytest.fixture
+def routed_app():
+    replica_fd, replica_path = tempfile.mkstemp()
+    app, primary_fd, primary_path = _make_app(f"sqlite:///{replica_path}")
+
+    with app.app_context():
+        replica = db.get_engine(app, bind=REPLICA_BIND)
+        db.metadata.create_all(replica)
+        with replica.begin() as conn:
+            conn.execute(User.__table__.insert(), {"name": "R", "username": "replica"})
+
+    yield app
+
+    for fd, path in ((primary_fd, primary_path), (replica_fd, replica_path)):
+        os.close(fd)
+        os.unlink(path)
+
+
+def test_read_only_view_uses_replica(routed_app):
+    client = routed_app.test_client()
+    assert client.get("/_test/read").get_json() == ["replica"]
+    assert client.get("/_test/primary").get_json() == ["primary"]
+
+
+def test_read_after_write_stays_on_primary(routed_app):
+    client = routed_app.test_client()
+    assert client.get("/_test/read_after_write").get_json() == ["new", "primary"]
+
+
+def test_unavailable_replica_falls_back_to_primary():
+    app, fd, path = _make_app("sqlite:////nonexistent-dir/replica.db")
+    try:
+        assert app.test_client().get("/_test/read").get_json() == ["primary"]
+    finally:
+        os.close(fd)
+        os.unlink(path)
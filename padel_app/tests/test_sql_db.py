@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from padel_app.instrumentation import InstrumentedQueuePool, pool_metrics
+from padel_app.sql_db import build_engine_options
+
+PG_URI = "postgresql://user:pw@localhost:5432/padel_app"
+
+
+def test_engine_options_skip_sqlite():
+    assert build_engine_options({"SQLALCHEMY_DATABASE_URI": "sqlite:///x.db"}) == {}
+
+
+def test_engine_options_postgres_pool_and_timeout():
+    options = build_engine_options(
+        {
+            "SQLALCHEMY_DATABASE_URI": PG_URI,
+            "DB_POOL_SIZE": 8,
+            "DB_MAX_OVERFLOW": 2,
+            "DB_POOL_RECYCLE": 600,
+            "DB_POOL_PRE_PING": True,
+            "DB_STATEMENT_TIMEOUT_MS": 5000,
+        }
+    )
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 8
+    assert options["max_overflow"] == 2
+    assert options["pool_recycle"] == 600
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+
+def test_engine_options_pgbouncer_has_no_startup_options():
+    options = build_engine_options(
+        {
+            "SQLALCHEMY_DATABASE_URI": PG_URI,
+            "DB_STATEMENT_TIMEOUT_MS": 5000,
+            "DB_PGBOUNCER": True,
+        }
+    )
+    assert "connect_args" not in options
+
+
+def test_instrumented_pool_records_checkouts_and_saturation():
+    pool_metrics.reset()
+    engine = create_engine(
+        "sqlite://",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+
+    conn = engine.connect()
+    snapshot = pool_metrics.snapshot(engine.pool)
+    assert snapshot["checkouts"] == 1
+    assert snapshot["saturation"] == 1.0
+
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    assert pool_metrics.snapshot()["timeouts"] == 1
+
+    conn.close()
+    assert pool_metrics.snapshot(engine.pool)["checkedOut"] == 0
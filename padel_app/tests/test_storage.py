@@ -0,0 +1,106 @@
+import io
+from datetime import timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from padel_app import storage
+from padel_app.model import Image
+from padel_app.sql_db import db
+from padel_app.models import User
+
+
+@pytest.fixture
+def fake_storage(app):
+    backend = storage.get_storage()
+    assert isinstance(backend, storage.FakeStorage)
+    return backend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_signed_url_cache_expires_before_signature():
+    clock = FakeClock()
+    cache = storage.SignedUrlCache(clock=clock)
+    lifetime = timedelta(minutes=5)
+
+    cache.put("k", "url", lifetime)
+    clock.now = 239
+    assert cache.get("k") == "url"
+    clock.now = 240
+    assert cache.get("k") is None
+
+
+def test_signed_url_cache_evicts_when_full():
+    cache = storage.SignedUrlCache(max_entries=4)
+    for i in range(5):
+        cache.put(i, f"url{i}", timedelta(minutes=5))
+    assert cache.get(4) == "url4"
+    assert cache.get(0) is None
+
+
+def test_signed_url_reuses_signature(fake_storage):
+    first = storage.signed_url("a.png")
+    assert storage.signed_url("a.png") == first
+    assert storage.signed_url("a.png", method="PUT") != first
+    assert fake_storage.sign_calls == 2
+
+
+def test_signed_urls_batches_misses(fake_storage):
+    storage.signed_url("a.png")
+    urls = storage.signed_urls(["a.png", "b.png", "c.png", "b.png"])
+
+    assert set(urls) == {"a.png", "b.png", "c.png"}
+    assert fake_storage.sign_calls == 3
+    assert storage.signed_urls(["b.png", "c.png"]) == {
+        "b.png": urls["b.png"],
+        "c.png": urls["c.png"],
+    }
+    assert fake_storage.sign_calls == 3
+
+
+def test_image_url_and_upload(app, fake_storage):
+    from padel_app.tools import image_tools
+
+    class Upload:
+        stream = io.BytesIO(b"png-bytes")
+        mimetype = "image/png"
+
+    assert image_tools.save_file(Upload(), "users/1.png")
+    assert fake_storage.objects["users/1.png"] == (b"png-bytes", "image/png")
+
+    public = Image(object_key="users/1.png", is_public=True)
+    private = Image(object_key="users/2.png", is_public=False)
+    assert public.url() == "https://storage.test/fake-bucket/users/1.png"
+    assert "sig=" in private.url()
+
+
+def test_users_endpoint_signs_each_avatar_once(app, client, fake_storage):
+    app.config["JWT_SECRET_KEY"] = "storage-secret"
+    with app.app_context():
+        users = [
+            User(
+                name=f"User {i}",
+                username=f"user{i}",
+                status="active",
+                user_image=Image(object_key=f"avatars/{i}.png", is_public=False),
+            )
+            for i in range(3)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        token = create_access_token(identity=str(users[0].id))
+
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(2):
+        response = client.get("/api/app/users", headers=headers)
+        assert response.status_code == 200
+        assert all("sig=" in u["avatarUrl"] for u in response.get_json())
+
+    assert fake_storage.sign_calls == 3
@@ -0,0 +1,79 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from padel_app import identity
+from padel_app.identity import identity_cache
+from padel_app.models import Coach, CoachLevel, User
+from padel_app.sql_db import db
+
+
+@pytest.fixture
+def coach_headers(app):
+    app.config["JWT_SECRET_KEY"] = "batch-secret"
+    identity_cache.clear()
+    with app.app_context():
+        user = User(name="Coach Carter", username="carter", password="x")
+        coach = Coach(user=user)
+        db.session.add_all([user, coach])
+        db.session.flush()
+        db.session.add(CoachLevel(coach_id=coach.id, label="Beginner", code="B"))
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def load_user_calls(monkeypatch):
+    calls = []
+    original = identity.load_user
+
+    def counting(user_id):
+        calls.append(user_id)
+        return original(user_id)
+
+    monkeypatch.setattr(identity, "load_user", counting)
+    return calls
+
+
+STARTUP = [
+    {"id": "me", "path": "/api/auth/me"},
+    {"id": "unread", "path": "/api/app/messages/unread_count"},
+    {"id": "levels", "path": "/api/app/coach_levels"},
+    {"id": "missing", "path": "/api/app/nope"},
+]
+
+
+def test_batch_runs_startup_calls_with_one_identity_load(client, coach_headers, load_user_calls):
+    response = client.post("/api/app/batch", json={"requests": STARTUP}, headers=coach_headers)
+
+    assert response.status_code == 200
+    results = {r["id"]: r for r in response.get_json()["responses"]}
+    assert [r["id"] for r in response.get_json()["responses"]] == ["me", "unread", "levels", "missing"]
+    assert results["me"]["body"]["name"] == "Coach Carter"
+    assert results["unread"]["body"] == {"unreadCount": 0}
+    assert [level["label"] for level in results["levels"]["body"]] == ["Beginner"]
+    assert results["missing"]["status"] == 404
+    assert len(load_user_calls) == 1
+
+
+def test_parallel_batch_matches_sequential(client, coach_headers):
+    sequential = client.post(
+        "/api/app/batch", json={"requests": STARTUP}, headers=coach_headers
+    ).get_json()
+    parallel = client.post(
+        "/api/app/batch", json={"requests": STARTUP, "parallel": True}, headers=coach_headers
+    ).get_json()
+    assert parallel == sequential
+
+
+def test_batch_rejects_bad_requests(client, coach_headers):
+    for payload in (
+        {},
+        {"requests": [{"path": "/elsewhere"}]},
+        {"requests": [{"path": "/api/app/batch", "method": "POST"}]},
+        {"requests": [{"path": "/api/app/coach_levels", "method": "TRACE"}]},
+    ):
+        response = client.post("/api/app/batch", json=payload, headers=coach_headers)
+        assert response.status_code == 400, payload
+
+    assert client.post("/api/app/batch", json={"requests": STARTUP}).status_code == 401
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from padel_app.identity import identity_cache
+from padel_app.models import (
+    Association_CoachLesson,
+    Association_CoachPlayer,
+    ChangeLog,
+    Club,
+    Coach,
+    Lesson,
+    LessonInstance,
+    Player,
+    Presence,
+    User,
+)
+from padel_app.sql_db import db
+from padel_app.tools.batch_tools import delete_many
+from padel_app.tools.sync_tools import prune
+
+
+@pytest.fixture
+def coach_lesson(app):
+    app.config["JWT_SECRET_KEY"] = "sync-secret"
+    app.config["SYNC_SETTLE_SECONDS"] = 0
+    identity_cache.clear()
+    with app.app_context():
+        club = Club(name="Club")
+        coach_user = User(name="Coach", username="coach", password="x")
+        other_user = User(name="Other", username="other", password="x")
+        player_user = User(name="Player", username="player", password="x")
+        coach, other = Coach(user=coach_user), Coach(user=other_user)
+        player = Player(user=player_user)
+        start = datetime(2030, 1, 7, 18, 0)
+        lesson = Lesson(
+            title="Group",
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            type="academy",
+            max_players=4,
+            club=club,
+        )
+        db.session.add_all([club, coach_user, other_user, player_user, coach, other, player, lesson])
+        db.session.flush()
+        db.session.add(Association_CoachLesson(coach_id=coach.id, lesson_id=lesson.id))
+        db.session.commit()
+        return {
+            "lesson_id": lesson.id,
+            "coach_id": coach.id,
+            "other_id": other.id,
+            "player_id": player.id,
+            "start": start,
+            "coach": {"Authorization": f"Bearer {create_access_token(identity=str(coach_user.id))}"},
+            "other": {"Authorization": f"Bearer {create_access_token(identity=str(other_user.id))}"},
+            "player": {"Authorization": f"Bearer {create_access_token(identity=str(player_user.id))}"},
+        }
+
+
+def _sync(client, headers, since=None):
+    query = {} if since is None else {"since": since}
+    response = client.get("/api/app/sync", query_string=query, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_writes_are_logged_with_scope(app, coach_lesson):
+    with app.app_context():
+        rows = ChangeLog.query.order_by(ChangeLog.id).all()
+    assert [(r.entity, r.op) for r in rows] == [
+        ("lessons", "upsert"),
+        ("lessonCoaches", "upsert"),
+    ]
+    assert {r.lesson_id for r in rows} == {coach_lesson["lesson_id"]}
+
+
+def test_sync_returns_changes_and_tombstones(app, client, coach_lesson):
+    cursor = _sync(client, coach_lesson["coach"])["cursor"]
+
+    with app.app_context():
+        start = coach_lesson["start"]
+        instance = LessonInstance(
+            lesson_id=coach_lesson["lesson_id"],
+            original_lesson_occurence_date=start.date(),
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            max_players=4,
+        )
+        db.session.add(instance)
+        db.session.flush()
+        db.session.add(Presence(lesson_instance_id=instance.id, player_id=coach_lesson["player_id"]))
+        db.session.commit()
+        instance_id = instance.id
+
+    body = _sync(client, coach_lesson["coach"], cursor)
+    assert [i["id"] for i in body["changes"]["lessonInstances"]["upserted"]] == [instance_id]
+    assert body["changes"]["presences"]["upserted"][0]["playerId"] == coach_lesson["player_id"]
+    assert body["hasMore"] is False
+    cursor = body["cursor"]
+
+    with app.app_context():
+        LessonInstance.query.get(instance_id).delete()
+
+    body = _sync(client, coach_lesson["coach"], cursor)
+    assert body["changes"]["lessonInstances"] == {"upserted": [], "deleted": [instance_id]}
+    assert _sync(client, coach_lesson["coach"], body["cursor"])["changes"] == {}
+
+
+def test_sync_hides_other_coaches_changes(app, client, coach_lesson):
+    body = _sync(client, coach_lesson["other"], 0)
+    assert body["changes"] == {}
+    assert body["cursor"] == "0"
+
+
+def test_coach_notes_only_sync_to_the_coach(app, client, coach_lesson):
+    with app.app_context():
+        db.session.add(Association_CoachPlayer(
+            coach_id=coach_lesson["coach_id"],
+            player_id=coach_lesson["player_id"],
+            notes="weak backhand",
+        ))
+        db.session.commit()
+
+    [coach_link] = _sync(client, coach_lesson["coach"], 0)["changes"]["coachPlayers"]["upserted"]
+    [player_link] = _sync(client, coach_lesson["player"], 0)["changes"]["coachPlayers"]["upserted"]
+    assert coach_link["notes"] == "weak backhand"
+    assert "notes" not in player_link
+    assert player_link["coachId"] == coach_lesson["coach_id"]
+
+
+def test_bulk_deletes_leave_tombstones(app, client, coach_lesson):
+    with app.app_context():
+        instance = LessonInstance(
+            lesson_id=coach_lesson["lesson_id"],
+            start_datetime=coach_lesson["start"],
+            end_datetime=coach_lesson["start"] + timedelta(hours=1),
+            max_players=4,
+        )
+        db.session.add(instance)
+        db.session.flush()
+        presence = Presence(lesson_instance_id=instance.id, player_id=coach_lesson["player_id"])
+        db.session.add(presence)
+        db.session.commit()
+        presence_id = presence.id
+        cursor = ChangeLog.query.order_by(ChangeLog.id.desc()).first().id
+
+        delete_many(Presence, [presence_id])
+        db.session.commit()
+
+    body = _sync(client, coach_lesson["coach"], cursor)
+    assert body["changes"]["presences"] == {"upserted": [], "deleted": [presence_id]}
+
+
+def test_bulk_updates_reach_the_new_owner(app, client, coach_lesson):
+    with app.app_context():
+        link = Association_CoachPlayer(
+            coach_id=coach_lesson["coach_id"], player_id=coach_lesson["player_id"]
+        )
+        db.session.add(link)
+        db.session.commit()
+        link_id = link.id
+        cursor = ChangeLog.query.order_by(ChangeLog.id.desc()).first().id
+
+        Association_CoachPlayer.query.filter_by(id=link_id).update(
+            {"coach_id": coach_lesson["other_id"]}, synchronize_session=False
+        )
+        db.session.commit()
+
+    for headers in (coach_lesson["coach"], coach_lesson["other"]):
+        [moved] = _sync(client, headers, cursor)["changes"]["coachPlayers"]["upserted"]
+        assert moved["coachId"] == coach_lesson["other_id"]
+
+
+def test_pruned_cursor_asks_for_reload(app, client, coach_lesson):
+    with app.app_context():
+        assert prune(datetime.utcnow() + timedelta(seconds=1)) == 2
+        lesson = Lesson.query.get(coach_lesson["lesson_id"])
+        lesson.title = "Renamed"
+        db.session.commit()
+        assert ChangeLog.query.one().id == 3
+
+    response = client.get(
+        "/api/app/sync", query_string={"since": 1}, headers=coach_lesson["coach"]
+    )
+    assert response.status_code == 410
+    body = _sync(client, coach_lesson["coach"], 2)
+    assert body["changes"]["lessons"]["upserted"][0]["name"] == "Renamed"
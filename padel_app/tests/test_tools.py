@@ -0,0 +1,63 @@
+import csv
+import gzip
+import io
+
+import pytest
+
+from padel_app.sql_db import db
+from padel_app.models import Club
+from padel_app.tools.tools import stream_csv_for_model
+
+
+@pytest.fixture
+def clubs(app):
+    with app.app_context():
+        db.session.add_all(
+            [Club(name=f"Club {i}", location="Lisboa") for i in range(5)]
+        )
+        db.session.commit()
+
+
+def _rows(body):
+    return list(csv.reader(io.StringIO(body.decode("utf-8"))))
+
+
+def test_stream_csv_for_model_chunks(app, clubs):
+    with app.app_context():
+        chunks = list(stream_csv_for_model(Club, columns=["id", "name"], chunk_size=2))
+
+    assert len(chunks) == 3
+    rows = _rows(b"".join(chunks))
+    assert rows[0] == ["id", "name"]
+    assert rows[1:] == [[str(i + 1), f"Club {i}"] for i in range(5)]
+
+
+def test_stream_csv_for_model_unknown_column(app):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            list(stream_csv_for_model(Club, columns=["nope"]))
+
+
+def test_download_csv_streams(client, clubs):
+    response = client.get("/api/download_csv/club?columns=name,location")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert 'filename="club.csv"' in response.headers["Content-Disposition"]
+    rows = _rows(response.data)
+    assert rows[0] == ["name", "location"]
+    assert len(rows) == 6
+
+
+def test_download_csv_gzip(client, clubs):
+    response = client.get("/api/download_csv/club?gzip=1")
+
+    assert response.mimetype == "application/gzip"
+    rows = _rows(gzip.decompress(response.data))
+    assert {"id", "name"} <= set(rows[0])
+    assert len(rows) == 6
+
+
+def test_download_csv_errors(client):
+    assert client.get("/api/download_csv/nope").status_code == 404
+    assert client.get("/api/download_csv/club?columns=nope").status_code == 400
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from padel_app.tools.calendar_tools import ensure_utc
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_minutes(dt: datetime) -> int:
+    """Minutes since the epoch, with naive datetimes taken as UTC."""
+    return int((ensure_utc(dt) - EPOCH).total_seconds() // 60)
+
+
+def from_minutes(minutes: int) -> datetime:
+    return EPOCH + timedelta(minutes=minutes)
+
+
+class IntervalSet:
+    """
+    Busy intervals, as integer minutes since the epoch, built once and
+    then queried with bisect.
+
+    Each interval carries a label (e.g. the calendar event id) so
+    conflicts can say what they clash with. Queries cost O(log n + k)
+    for k matching intervals.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, object]] = ()):
+        items = sorted((s, e, label) for s, e, label in intervals if e > s)
+        self._items = items
+        self._starts = [s for s, _, _ in items]
+        self._max_length = max((e - s for s, e, _ in items), default=0)
+
+        merged: List[List[int]] = []
+        for s, e, _ in items:
+            if merged and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        self._merged_starts = [s for s, _ in merged]
+        self._merged_ends = [e for _, e in merged]
+
+    def __len__(self):
+        return len(self._items)
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet(self._items + other._items)
+
+    def conflicts(self, start: int, end: int) -> List[Tuple[int, int, object]]:
+        """Intervals overlapping [start, end)."""
+        lo = bisect_left(self._starts, start - self._max_length)
+        hi = bisect_left(self._starts, end)
+        return [item for item in self._items[lo:hi] if item[1] > start]
+
+    def is_free(self, start: int, end: int) -> bool:
+        i = bisect_right(self._merged_starts, start) - 1
+        if i >= 0 and self._merged_ends[i] > start:
+            return False
+        j = i + 1
+        return j >= len(self._merged_starts) or self._merged_starts[j] >= end
+
+    def free_slots(self, start: int, end: int, length: int) -> List[Tuple[int, int]]:
+        """Gaps of at least `length` minutes inside [start, end)."""
+        slots = []
+        cursor = start
+        i = max(bisect_right(self._merged_starts, start) - 1, 0)
+        while i < len(self._merged_starts) and self._merged_starts[i] < end:
+            busy_start, busy_end = self._merged_starts[i], self._merged_ends[i]
+            if busy_end > cursor:
+                if busy_start - cursor >= length:
+                    slots.append((cursor, busy_start))
+                cursor = max(cursor, busy_end)
+            i += 1
+        if end - cursor >= length:
+            slots.append((cursor, end))
+        return slots
+
+
+def daily_windows(
+    range_start: datetime,
+    range_end: datetime,
+    day_start: Optional[time] = None,
+    day_end: Optional[time] = None,
+) -> List[Tuple[int, int]]:
+    """
+    [start, end) minute windows covering the range, cut to working hours
+    (UTC) on each day when `day_start`/`day_end` are given.
+    """
+    start, end = to_minutes(range_start), to_minutes(range_end)
+    if day_start is None and day_end is None:
+        return [(start, end)] if end > start else []
+
+    day_start = day_start or time.min
+    day_end = day_end or time.max
+    windows = []
+    day: date = ensure_utc(range_start).date()
+    while day <= ensure_utc(range_end).date():
+        lo = max(start, to_minutes(datetime.combine(day, day_start)))
+        hi = min(end, to_minutes(datetime.combine(day, day_end)))
+        if hi > lo:
+            windows.append((lo, hi))
+        day += timedelta(days=1)
+    return windows
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import RelationshipProperty
+
+from padel_app.sql_db import db
+
+
+def needs_orm_delete(model) -> bool:
+    """
+    Whether deleting rows of `model` needs the ORM.
+
+    A plain DELETE is only equivalent when no relationship would make the
+    ORM touch other rows (cascading deletes, nulling out children,
+    clearing many-to-many rows) and no mapper delete hooks are registered.
+    Relationships with passive_deletes leave that work to the database's
+    ON DELETE rules, so they don't count.
+    """
+    mapper = model.__mapper__
+    if mapper.dispatch.before_delete or mapper.dispatch.after_delete:
+        return True
+
+    for rel in mapper.relationships:
+        if rel.viewonly or rel.passive_deletes:
+            continue
+        if rel.direction.name in ("ONETOMANY", "MANYTOMANY"):
+            return True
+        if rel.cascade.delete:
+            return True
+    return False
+
+
+def _ids(values: Iterable) -> List[int]:
+    return sorted({int(v) for v in values})
+
+
+def delete_many(model, ids: Iterable) -> int:
+    """
+    Delete the given ids of `model` in the current transaction.
+
+    Uses a single DELETE ... WHERE id IN (...) when `needs_orm_delete` is
+    false; otherwise loads the rows with one query and deletes them through
+    the session so Python-side cascades still run. Does not commit.
+
+    Returns:
+        Number of rows deleted.
+    """
+    ids = _ids(ids)
+    if not ids:
+        return 0
+
+    if not needs_orm_delete(model):
+        return db.session.query(model).filter(model.id.in_(ids)).delete(
+            synchronize_session="fetch"
+        )
+
+    objects = model.query.filter(model.id.in_(ids)).all()
+    for obj in objects:
+        db.session.delete(obj)
+    db.session.flush()
+    return len(objects)
+
+
+def _relationship(model, field_name) -> RelationshipProperty:
+    rel = model.__mapper__.relationships.get(field_name)
+    if rel is None or rel.direction.name == "MANYTOONE":
+        raise ValueError(f"{model.__name__}.{field_name} is not a collection")
+    return rel
+
+
+def remove_relationships(model, field_name: str, pairs: Iterable[Tuple]) -> int:
+    """
+    Remove (owner id, related id) pairs from `model.<field_name>`.
+
+    Many-to-many rows are deleted from the secondary table in one
+    statement. For one-to-many collections the related rows are deleted
+    (delete-orphan) or detached (foreign key set to NULL) in one statement,
+    scoped to their owner. Falls back to the ORM when the related model
+    needs Python-side cascades. Does not commit.
+
+    Returns:
+        Number of links removed.
+
+    Raises:
+        ValueError: If `field_name` is not a collection relationship.
+    """
+    rel = _relationship(model, field_name)
+    pairs = sorted({(int(a), int(b)) for a, b in pairs})
+    if not pairs:
+        return 0
+
+    if rel.direction.name == "MANYTOMANY":
+        (_, owner_col), = rel.synchronize_pairs
+        (_, related_col), = rel.secondary_synchronize_pairs
+        result = db.session.execute(
+            rel.secondary.delete().where(
+                tuple_(owner_col, related_col).in_(pairs)
+            )
+        )
+        return result.rowcount
+
+    related = rel.mapper.class_
+    (_, fk_col), = rel.local_remote_pairs
+    scoped = tuple_(fk_col, related.id).in_(pairs)
+
+    if rel.cascade.delete_orphan and needs_orm_delete(related):
+        objects = related.query.filter(scoped).all()
+        for obj in objects:
+            db.session.delete(obj)
+        db.session.flush()
+        return len(objects)
+
+    query = db.session.query(related).filter(scoped)
+    if rel.cascade.delete_orphan:
+        return query.delete(synchronize_session="fetch")
+    return query.update({fk_col: None}, synchronize_session="fetch")
@@ -0,0 +1,570 @@
+from __future__ import annotations
+
+import itertools
+import json
+import math
+import random
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from padel_app.sql_db import db
+
+
+@dataclass(frozen=True)
+class BenchScale:
+    clubs: int = 2
+    coaches: int = 10
+    players: int = 200
+    lessons_per_coach: int = 8
+    players_per_lesson: int = 4
+    weeks: int = 12
+    messages_per_conversation: int = 20
+    seed: int = 42
+
+
+def generate_dataset(scale: BenchScale) -> Dict[str, Any]:
+    """
+    Insert a synthetic dataset straight into the DB.
+
+    Rows whose ids are needed later go through the ORM; leaf rows
+    (associations, presences, messages) are bulk-inserted with executemany.
+
+    Returns:
+        Dict with the run tag, the generated club and coach/user ids, and
+        row counts. Pass it to `drop_dataset` to remove the rows again.
+    """
+    from padel_app.models import (
+        Association_CoachClub,
+        Association_CoachLesson,
+        Association_CoachPlayer,
+        Association_PlayerClub,
+        Association_PlayerLesson,
+        Association_PlayerLessonInstance,
+        Club,
+        Coach,
+        CoachLevel,
+        Conversation,
+        ConversationParticipant,
+        Lesson,
+        LessonInstance,
+        Message,
+        Player,
+        Presence,
+        User,
+    )
+
+    rng = random.Random(scale.seed)
+    run = f"bench{int(time.time())}"
+
+    def insert_rows(model, rows):
+        if rows:
+            db.session.execute(model.__table__.insert(), rows)
+
+    clubs = [Club(name=f"{run} club {i}") for i in range(scale.clubs)]
+    coach_users = [
+        User(name=f"Coach {i}", username=f"{run}_coach_{i}", status="active")
+        for i in range(scale.coaches)
+    ]
+    player_users = [
+        User(name=f"Player {i}", username=f"{run}_player_{i}", status="active")
+        for i in range(scale.players)
+    ]
+    db.session.add_all(clubs + coach_users + player_users)
+    db.session.flush()
+
+    coaches = [Coach(user_id=u.id) for u in coach_users]
+    players = [Player(user_id=u.id) for u in player_users]
+    db.session.add_all(coaches + players)
+    db.session.flush()
+
+    levels = {
+        coach.id: [
+            CoachLevel(coach_id=coach.id, label=label, code=label[:1], display_order=n)
+            for n, label in enumerate(("Beginner", "Intermediate", "Advanced"))
+        ]
+        for coach in coaches
+    }
+    db.session.add_all([lvl for lvls in levels.values() for lvl in lvls])
+    db.session.flush()
+
+    coach_club = {coach.id: clubs[i % len(clubs)].id for i, coach in enumerate(coaches)}
+    roster = {coach.id: [] for coach in coaches}
+    for i, player in enumerate(players):
+        roster[coaches[i % len(coaches)].id].append(player)
+
+    insert_rows(
+        Association_CoachClub,
+        [{"coach_id": c, "club_id": club} for c, club in coach_club.items()],
+    )
+    insert_rows(
+        Association_CoachPlayer,
+        [
+            {
+                "coach_id": coach_id,
+                "player_id": p.id,
+                "level_id": rng.choice(levels[coach_id]).id,
+            }
+            for coach_id, members in roster.items()
+            for p in members
+        ],
+    )
+    insert_rows(
+        Association_PlayerClub,
+        [
+            {"player_id": p.id, "club_id": coach_club[coach_id]}
+            for coach_id, members in roster.items()
+            for p in members
+        ],
+    )
+
+    # Recurring weekly lessons that started `weeks // 2` weeks ago.
+    today = date.today()
+    first_week = today - timedelta(weeks=scale.weeks // 2)
+    lessons, lesson_players = [], {}
+    for coach in coaches:
+        for n in range(scale.lessons_per_coach):
+            weekday = rng.randrange(7)
+            day = first_week + timedelta(days=(weekday - first_week.weekday()) % 7)
+            start = datetime.combine(day, datetime.min.time()) + timedelta(
+                hours=8 + (n % 12)
+            )
+            lesson = Lesson(
+                title=f"Class {coach.id}-{n}",
+                type="academy",
+                status="active",
+                max_players=scale.players_per_lesson + 1,
+                default_level_id=rng.choice(levels[coach.id]).id,
+                club_id=coach_club[coach.id],
+                is_recurring=True,
+                recurrence_rule=json.dumps(
+                    {"frequency": "weekly", "daysOfWeek": [day.weekday() + 1]}
+                ),
+                recurrence_end=day + timedelta(weeks=scale.weeks),
+                start_datetime=start,
+                end_datetime=start + timedelta(hours=1),
+            )
+            lessons.append((coach.id, lesson))
+            members = roster[coach.id]
+            lesson_players[lesson] = rng.sample(
+                members, min(scale.players_per_lesson, len(members))
+            )
+    db.session.add_all([lesson for _, lesson in lessons])
+    db.session.flush()
+
+    insert_rows(
+        Association_CoachLesson,
+        [{"coach_id": c, "lesson_id": lesson.id} for c, lesson in lessons],
+    )
+    insert_rows(
+        Association_PlayerLesson,
+        [
+            {"player_id": p.id, "lesson_id": lesson.id}
+            for lesson, members in lesson_players.items()
+            for p in members
+        ],
+    )
+
+    instances = []
+    for _, lesson in lessons:
+        for week in range(scale.weeks):
+            start = lesson.start_datetime + timedelta(weeks=week)
+            instances.append(
+                LessonInstance(
+                    lesson_id=lesson.id,
+                    original_lesson_occurence_date=start.date(),
+                    start_datetime=start,
+                    end_datetime=start + timedelta(hours=1),
+                    max_players=lesson.max_players,
+                    status="scheduled",
+                )
+            )
+    db.session.add_all(instances)
+    db.session.flush()
+
+    by_lesson = {lesson.id: lesson for _, lesson in lessons}
+    past = datetime.utcnow()
+    presence_rows, participant_rows = [], []
+    for instance in instances:
+        for p in lesson_players[by_lesson[instance.lesson_id]]:
+            participant_rows.append(
+                {"player_id": p.id, "lesson_instance_id": instance.id}
+            )
+            done = instance.start_datetime < past
+            presence_rows.append(
+                {
+                    "player_id": p.id,
+                    "lesson_instance_id": instance.id,
+                    "invited": True,
+                    "confirmed": done or rng.random() < 0.5,
+                    "validated": done and rng.random() < 0.7,
+                    "status": rng.choice(("present", "absent")) if done else None,
+                }
+            )
+    insert_rows(Association_PlayerLessonInstance, participant_rows)
+    insert_rows(Presence, presence_rows)
+
+    conversations = []
+    for coach, user in zip(coaches, coach_users):
+        for p in roster[coach.id]:
+            conversation = Conversation(
+                is_group=False,
+                participant_key=f"{run}:{Conversation.build_participant_key([user.id, p.user_id])}",
+            )
+            conversations.append((conversation, user.id, p.user_id))
+    db.session.add_all([c for c, _, _ in conversations])
+    db.session.flush()
+
+    participant_rows, message_rows = [], []
+    for conversation, coach_user_id, player_user_id in conversations:
+        for user_id in (coach_user_id, player_user_id):
+            participant_rows.append(
+                {
+                    "conversation_id": conversation.id,
+                    "user_id": user_id,
+                    "joined_at": past,
+                    "last_read_at": past - timedelta(days=1),
+                }
+            )
+        for n in range(scale.messages_per_conversation):
+            message_rows.append(
+                {
+                    "conversation_id": conversation.id,
+                    "sender_id": rng.choice((coach_user_id, player_user_id)),
+                    "text": f"Message {n}",
+                    "sent_at": past - timedelta(hours=scale.messages_per_conversation - n),
+                }
+            )
+    insert_rows(ConversationParticipant, participant_rows)
+    insert_rows(Message, message_rows)
+
+    db.session.commit()
+
+    return {
+        "run": run,
+        "clubIds": [club.id for club in clubs],
+        "coaches": [
+            {"coachId": coach.id, "userId": user.id}
+            for coach, user in zip(coaches, coach_users)
+        ],
+        "lessons": len(lessons),
+        "instances": len(instances),
+        "presences": len(presence_rows),
+        "messages": len(message_rows),
+    }
+
+
+def drop_dataset(dataset: Dict[str, Any]) -> None:
+    """
+    Delete everything `generate_dataset` inserted, plus the lessons,
+    instances, index and changelog rows the benchmark wrote on top of it.
+
+    Rows are found through the run's clubs, usernames and conversation
+    keys, and deleted leaf first with plain DELETEs.
+    """
+    from padel_app.models import (
+        Association_CoachClub,
+        Association_CoachLesson,
+        Association_CoachLessonInstance,
+        Association_CoachPlayer,
+        Association_PlayerClub,
+        Association_PlayerLesson,
+        Association_PlayerLessonInstance,
+        CalendarBlock,
+        ChangeLog,
+        ClassOccupancy,
+        Club,
+        Coach,
+        CoachLevel,
+        Conversation,
+        ConversationParticipant,
+        Lesson,
+        LessonInstance,
+        Message,
+        Player,
+        PlayerLevelHistory,
+        Presence,
+        User,
+    )
+
+    run = dataset["run"]
+
+    def ids(column, *criteria):
+        return [row[0] for row in db.session.query(column).filter(*criteria)]
+
+    club_ids = dataset["clubIds"]
+    user_ids = ids(User.id, User.username.like(f"{run}\\_%", escape="\\"))
+    coach_ids = ids(Coach.id, Coach.user_id.in_(user_ids))
+    player_ids = ids(Player.id, Player.user_id.in_(user_ids))
+    lesson_ids = ids(Lesson.id, Lesson.club_id.in_(club_ids))
+    instance_ids = ids(LessonInstance.id, LessonInstance.lesson_id.in_(lesson_ids))
+    conversation_ids = ids(
+        Conversation.id, Conversation.participant_key.like(f"{run}:%")
+    )
+
+    def delete(model, *criteria):
+        db.session.execute(model.__table__.delete().where(*criteria))
+
+    delete(
+        ChangeLog,
+        ChangeLog.lesson_id.in_(lesson_ids)
+        | ChangeLog.coach_id.in_(coach_ids)
+        | ChangeLog.player_id.in_(player_ids)
+        | ChangeLog.user_id.in_(user_ids)
+        | ChangeLog.conversation_id.in_(conversation_ids),
+    )
+    delete(ClassOccupancy, ClassOccupancy.club_id.in_(club_ids))
+    delete(Message, Message.conversation_id.in_(conversation_ids))
+    delete(
+        ConversationParticipant,
+        ConversationParticipant.conversation_id.in_(conversation_ids),
+    )
+    delete(Conversation, Conversation.id.in_(conversation_ids))
+    delete(Presence, Presence.lesson_instance_id.in_(instance_ids))
+    delete(
+        Association_PlayerLessonInstance,
+        Association_PlayerLessonInstance.lesson_instance_id.in_(instance_ids),
+    )
+    delete(
+        Association_CoachLessonInstance,
+        Association_CoachLessonInstance.lesson_instance_id.in_(instance_ids),
+    )
+    delete(LessonInstance, LessonInstance.id.in_(instance_ids))
+    delete(Association_PlayerLesson, Association_PlayerLesson.lesson_id.in_(lesson_ids))
+    delete(Association_CoachLesson, Association_CoachLesson.lesson_id.in_(lesson_ids))
+    delete(Lesson, Lesson.id.in_(lesson_ids))
+    delete(Association_CoachPlayer, Association_CoachPlayer.coach_id.in_(coach_ids))
+    delete(Association_PlayerClub, Association_PlayerClub.club_id.in_(club_ids))
+    delete(Association_CoachClub, Association_CoachClub.club_id.in_(club_ids))
+    delete(PlayerLevelHistory, PlayerLevelHistory.coach_id.in_(coach_ids))
+    delete(CoachLevel, CoachLevel.coach_id.in_(coach_ids))
+    delete(CalendarBlock, CalendarBlock.user_id.in_(user_ids))
+    delete(Coach, Coach.id.in_(coach_ids))
+    delete(Player, Player.id.in_(player_ids))
+    delete(User, User.id.in_(user_ids))
+    delete(Club, Club.id.in_(club_ids))
+    db.session.commit()
+
+
+def is_scratch_database(url) -> bool:
+    """Whether `url` looks like a database the benchmark may write to."""
+    return url.get_backend_name() == "sqlite" or any(
+        word in (url.database or "").lower() for word in ("test", "bench")
+    )
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def _count_statements(engine):
+    counter = {"statements": 0}
+
+    def before_cursor_execute(*args):
+        counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return counter, lambda: event.remove(
+        engine, "before_cursor_execute", before_cursor_execute
+    )
+
+
+def _scenarios(coach_lessons) -> Dict[str, Callable]:
+    month_start = date.today().replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1)
+    calendar_url = (
+        f"/api/app/calendar?from={month_start.isoformat()}T00:00:00Z"
+        f"&to={month_end.isoformat()}T00:00:00Z"
+    )
+    # Each call splits the series at the next week of one of the coach's
+    # lessons and the following call on that lesson edits the new future
+    # half, so no call re-splits a series an earlier one already split.
+    series = [
+        {
+            "id": lesson.id,
+            "title": lesson.title,
+            "date": lesson.start_datetime.date() + timedelta(weeks=1),
+        }
+        for lesson in coach_lessons
+    ]
+    turns = itertools.cycle(series)
+
+    def edit_class_future(client, headers):
+        current = next(turns)
+        current["date"] += timedelta(weeks=1)
+        response = client.post(
+            "/api/app/edit_class",
+            headers=headers,
+            json={
+                "event": {
+                    "model": "Lesson",
+                    "originalId": current["id"],
+                    "date": current["date"].isoformat(),
+                },
+                "scope": "future",
+                "updates": {"name": f"{current['title']} (edited)"},
+            },
+        )
+        if response.status_code == 201:
+            current["id"] = response.get_json()["id"]
+        return response
+
+    return {
+        "calendar_month": lambda client, headers: client.get(
+            calendar_url, headers=headers
+        ),
+        "dashboard": lambda client, headers: client.get(
+            "/api/app/dashboard", headers=headers
+        ),
+        "conversations": lambda client, headers: client.get(
+            "/api/app/conversations", headers=headers
+        ),
+        # Mutates data, so it runs last and on a different series each time.
+        "edit_class_future": edit_class_future,
+    }
+
+
+def run_benchmark(app, *, coach_id: int, user_id: int, iterations: int = 20):
+    """
+    Time the hot endpoints through the Flask test client.
+
+    Each scenario gets one warm-up call, `iterations` timed calls for
+    latency and statement counts, and one extra call under tracemalloc for
+    peak memory (kept separate so tracing does not skew the timings).
+    """
+    from padel_app.models import Coach
+
+    client = app.test_client()
+    with app.app_context():
+        headers = {
+            "Authorization": f"Bearer {create_access_token(identity=str(user_id))}"
+        }
+        coach = db.session.get(Coach, coach_id)
+        coach_lessons = sorted(coach.lessons, key=lambda lesson: lesson.id)
+        engine = db.engine
+    db.session.remove()
+
+    results = {}
+    for name, call in _scenarios(coach_lessons).items():
+        call(client, headers)
+
+        timings, statements, statuses = [], [], set()
+        counter, stop = _count_statements(engine)
+        try:
+            for _ in range(iterations):
+                before = counter["statements"]
+                start = time.perf_counter()
+                response = call(client, headers)
+                timings.append((time.perf_counter() - start) * 1000)
+                statements.append(counter["statements"] - before)
+                statuses.add(response.status_code)
+        finally:
+            stop()
+
+        tracemalloc.start()
+        try:
+            call(client, headers)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        results[name] = {
+            "p50Ms": round(_percentile(timings, 50), 3),
+            "p95Ms": round(_percentile(timings, 95), 3),
+            "meanMs": round(sum(timings) / len(timings), 3),
+            "queries": max(statements),
+            "peakKib": round(peak / 1024, 1),
+            "statuses": sorted(statuses),
+        }
+
+    return results
+
+
+def benchmark_report(scale: BenchScale, dataset, results, *, iterations: int):
+    return {
+        "createdAt": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "scale": asdict(scale),
+        "dataset": {
+            k: v for k, v in dataset.items() if k not in ("run", "clubIds", "coaches")
+        },
+        "iterations": iterations,
+        "scenarios": results,
+    }
+
+
+# Run in a fresh interpreter so nothing is already imported. The app is
+# built against an in-memory database so only startup itself is measured.
+_STARTUP_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import padel_app
+t1 = time.perf_counter()
+app = padel_app.create_app({
+    "APP_PROFILE": sys.argv[1],
+    "SQLALCHEMY_DATABASE_URI": "sqlite://",
+    "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+    "STORAGE_BACKEND": "fake",
+    "JOBS_BACKEND": "immediate",
+})
+t2 = time.perf_counter()
+status = app.test_client().get(sys.argv[2]).status_code
+t3 = time.perf_counter()
+print(json.dumps({
+    "importMs": (t1 - t0) * 1000,
+    "createAppMs": (t2 - t1) * 1000,
+    "firstRequestMs": (t3 - t2) * 1000,
+    "status": status,
+    "modules": len(sys.modules),
+}))
+"""
+
+# A cheap route each profile serves, hit as the "first request".
+STARTUP_PROBES = {
+    "api": "/api/auth/me",
+    "admin": "/auth/login",
+    "full": "/api/auth/me",
+}
+
+
+def startup_benchmark(profile: str, runs: int = 5) -> Dict[str, Any]:
+    """
+    Cold-start cost of one app profile, over `runs` fresh processes.
+
+    Reports the median import time, create_app time and first-request
+    time in milliseconds, plus how many modules ended up loaded.
+    """
+    import subprocess
+    import sys
+
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, profile, STARTUP_PROBES[profile]],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    def median(key):
+        return round(_percentile([s[key] for s in samples], 50), 1)
+
+    return {
+        "profile": profile,
+        "runs": runs,
+        "importMs": median("importMs"),
+        "createAppMs": median("createAppMs"),
+        "firstRequestMs": median("firstRequestMs"),
+        "totalMs": round(
+            median("importMs") + median("createAppMs") + median("firstRequestMs"), 1
+        ),
+        "modules": samples[-1]["modules"],
+        "probeStatus": samples[-1]["status"],
+    }
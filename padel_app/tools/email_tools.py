@@ -1,11 +1,13 @@
 from flask_mail import Message
 import os
 
+from .. import jobs
 from ..mail import mail
 
 MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
 
 
+@jobs.task("send_email")
 def send_email(subject, recipients, body=None, html=None):
     msg = Message(subject, sender=MAIL_USERNAME, recipients=recipients)
     if body:
@@ -16,3 +18,12 @@ def send_email(subject, recipients, body=None, html=None):
         raise ValueError("Either body or html must be provided")
     mail.send(msg)
     return "Sent"
+
+
+def queue_email(subject, recipients, body=None, html=None):
+    """Send an email from the job queue instead of blocking the request on SMTP."""
+    if not (body or html):
+        raise ValueError("Either body or html must be provided")
+    return jobs.enqueue(
+        "send_email", subject=subject, recipients=list(recipients), body=body, html=html
+    )
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import func, inspect
+
+from padel_app.sql_db import db
+
+
+def hot_queries(*, coach_id: int, user_id: int) -> Dict[str, Any]:
+    """The calendar, dashboard and inbox queries, keyed by a readable name."""
+    from padel_app.helpers.calendar_helpers import (
+        calendar_blocks_for_user_query,
+        lesson_instances_for_coach_query,
+        lessons_for_coach_query,
+    )
+    from padel_app.helpers.dashboard.kpis import pending_validations_query
+    from padel_app.helpers.dashboard.messages import (
+        conversations_for_user_query,
+        unread_messages_query,
+    )
+    from padel_app.models import Message
+
+    range_start = datetime.now(timezone.utc)
+    range_end = range_start + timedelta(days=30)
+
+    return {
+        "calendar.lessons": lessons_for_coach_query(coach_id, range_start, range_end),
+        "calendar.instances": lesson_instances_for_coach_query(
+            coach_id, range_start, range_end
+        ),
+        "calendar.blocks": calendar_blocks_for_user_query(
+            user_id, range_start, range_end
+        ),
+        "dashboard.pending_validations": pending_validations_query(coach_id=coach_id),
+        "inbox.conversations": conversations_for_user_query(user_id=user_id),
+        "inbox.unread": unread_messages_query(func.count(Message.id), user_id=user_id),
+    }
+
+
+def _explain(conn, query) -> List[Any]:
+    compiled = query.statement.compile(
+        dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == "postgresql":
+        row = conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", params
+        ).scalar()
+        return row if isinstance(row, list) else json.loads(row)
+    return conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+
+
+def _sequential_scans(dialect_name: str, plan) -> List[str]:
+    tables = []
+    if dialect_name == "postgresql":
+        stack = [node["Plan"] for node in plan]
+        while stack:
+            node = stack.pop()
+            if node.get("Node Type") == "Seq Scan":
+                tables.append(node.get("Relation Name"))
+            stack.extend(node.get("Plans", []))
+        return tables
+
+    for row in plan:
+        # "SCAN lessons" on recent SQLite, "SCAN TABLE lessons" on older ones
+        words = row[-1].split()
+        if words[:1] != ["SCAN"] or "INDEX" in words:
+            continue
+        if words[1:2] == ["TABLE"]:
+            words = words[1:]
+        if len(words) > 1:
+            tables.append(words[1])
+    return tables
+
+
+def _table_rows(conn, table_names) -> Dict[str, int]:
+    if conn.dialect.name == "postgresql":
+        rows = conn.exec_driver_sql(
+            "SELECT relname, reltuples::bigint FROM pg_class WHERE relkind = 'r'"
+        ).fetchall()
+        return {name: int(count) for name, count in rows if name in table_names}
+    return {
+        name: conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{name}"').scalar()
+        for name in table_names
+    }
+
+
+def check_query_plans(*, coach_id: int, user_id: int, min_rows: int = 10000):
+    """
+    EXPLAIN every hot query and report sequential scans over tables holding
+    at least `min_rows` rows.
+
+    Returns:
+        (plans, violations): per-query scanned tables, and a list of
+        {"query", "table", "rows"} dicts for scans that should use an index.
+    """
+    engine = db.get_engine()
+    known_tables = set(inspect(engine).get_table_names())
+    plans, violations = {}, []
+
+    with engine.connect() as conn:
+        row_counts = _table_rows(conn, known_tables)
+        for name, query in hot_queries(coach_id=coach_id, user_id=user_id).items():
+            scanned = [
+                table
+                for table in _sequential_scans(conn.dialect.name, _explain(conn, query))
+                if table in known_tables  # skip scans of subqueries / CTEs
+            ]
+            plans[name] = scanned
+            for table in scanned:
+                rows = row_counts.get(table, 0)
+                if rows >= min_rows:
+                    violations.append({"query": name, "table": table, "rows": rows})
+
+    return plans, violations
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+from padel_app import storage
+from padel_app.compression import etag_variants
+
+NO_STORE = "no-cache, no-store, must-revalidate"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag value (unquoted) for JSON-able `parts`."""
+    raw = json.dumps(parts, default=str, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def url_epoch():
+    """
+    Bucket of time within which a response that embeds signed URLs may
+    be revalidated: the margin the URL cache keeps before a signature
+    expires, so a 304 never revives a dead link.
+    """
+    lifetime = storage.SIGNED_URL_LIFETIME
+    margin = lifetime.total_seconds() - storage.SignedUrlCache.ttl(lifetime)
+    return int(time.time() // max(margin, 1))
+
+
+def _caller():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def _args():
+    # A JWT passed in the query string changes with every token.
+    token = current_app.config.get("JWT_QUERY_STRING_NAME", "jwt")
+    return sorted((k, v) for k, v in request.args.items(multi=True) if k != token)
+
+
+def _apply(response, cache_control, etag, vary):
+    response.headers["Cache-Control"] = cache_control
+    if etag is not None:
+        response.set_etag(etag)
+    for header in vary:
+        response.vary.add(header)
+    return response
+
+
+def cache_policy(version=None, *, max_age=0, private=True, vary=("Authorization",)):
+    """
+    Per-endpoint Cache-Control and conditional GET.
+
+    `version` is a zero-argument callable returning cheap, JSON-able
+    parts that change whenever the response would (row versions,
+    `updated_at` maxima, change log positions). It runs before the view;
+    the ETag is a hash of it, the endpoint, its arguments and the JWT
+    caller, and a matching If-None-Match returns 304 without calling the
+    view at all. Without `version` only the headers are set.
+
+    Goes below @jwt_required so the caller is known.
+    """
+    scope = "private" if private else "public"
+    cache_control = f"{scope}, max-age={max_age}"
+    if version is not None and max_age == 0:
+        cache_control += ", must-revalidate"
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            etag = None
+            if version is not None and request.method in ("GET", "HEAD"):
+                etag = make_etag(
+                    request.endpoint,
+                    _args(),
+                    kwargs,
+                    _caller(),
+                    version(),
+                )
+                # Compressed responses carry the ETag with an encoding suffix.
+                matched = next(
+                    (tag for tag in etag_variants(etag) if request.if_none_match.contains(tag)),
+                    None,
+                )
+                if matched:
+                    response = current_app.response_class(status=304)
+                    return _apply(response, cache_control, matched, vary)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            return _apply(response, cache_control, etag, vary)
+
+        return wrapped
+
+    return decorator
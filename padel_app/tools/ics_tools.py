@@ -0,0 +1,103 @@
+"""
+iCalendar (RFC 5545) output.
+
+Components are built as lists of (name, value) properties and rendered to
+CRLF-terminated, 75-octet folded lines. Recurring rows are written as one
+RRULE series; `recurrence` maps the stored JSON rule to its RRULE and
+says which occurrences calendar_tools.build_rrule would really produce,
+so a feed and the JSON calendar list the same dates.
+"""
+import json
+
+from padel_app.tools.calendar_tools import build_rrule, ensure_utc
+
+# Same keys as calendar_tools.WEEKDAY_MAP and FREQ_MAP.
+ICS_DAYS = {0: "SU", 1: "MO", 2: "TU", 3: "WE", 4: "TH", 5: "FR", 6: "SA"}
+ICS_FREQS = {"weekly": "WEEKLY"}
+
+
+def escape_text(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def format_datetime(dt):
+    """UTC date-time; naive values are taken to be UTC, like the rest of the app."""
+    return ensure_utc(dt).strftime("%Y%m%dT%H%M%SZ")
+
+
+def fold(line):
+    """Split `line` into 75-octet pieces without cutting a UTF-8 character."""
+    data = line.encode()
+    pieces = []
+    while len(data) > 75:
+        cut = 75 if not pieces else 74
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(data[:cut])
+        data = data[cut:]
+    pieces.append(data)
+    return b"\r\n ".join(pieces) + b"\r\n"
+
+
+def render(component, properties):
+    """BEGIN/END block for `component`; properties with a None value are left out."""
+    lines = [f"BEGIN:{component}"]
+    for name, value in properties:
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                lines.append(f"{name}:{item}")
+        else:
+            lines.append(f"{name}:{value}")
+    lines.append(f"END:{component}")
+    return b"".join(fold(line) for line in lines)
+
+
+class Recurrence:
+    """A stored recurrence rule, both as an RRULE and as dateutil occurrences."""
+
+    def __init__(self, rule, freq, days, until):
+        self.rule = rule
+        self.freq = freq
+        self.days = days
+        self.until = until
+
+    @property
+    def rrule(self):
+        parts = [f"FREQ={self.freq}"]
+        if self.until is not None:
+            parts.append(f"UNTIL={format_datetime(self.until)}")
+        if self.days:
+            parts.append("BYDAY=" + ",".join(self.days))
+        return ";".join(parts)
+
+    def __contains__(self, dt):
+        dt = ensure_utc(dt)
+        return self.rule.after(dt, inc=True) == dt
+
+
+def recurrence(recurrence_rule, dtstart, until=None):
+    """
+    Recurrence for a stored rule, or None when the row does not repeat.
+
+    Raises:
+        ValueError: If the rule is set but unusable (build_rrule gives no
+            occurrences for it either).
+    """
+    if not recurrence_rule:
+        return None
+    rule = build_rrule(recurrence_rule, dtstart=dtstart, until=until)
+    if rule is None:
+        raise ValueError(f"Unsupported recurrence rule: {recurrence_rule!r}")
+
+    spec = json.loads(recurrence_rule)
+    days = [ICS_DAYS[d] for d in spec.get("daysOfWeek", []) if d in ICS_DAYS]
+    return Recurrence(rule, ICS_FREQS[spec["frequency"]], days, ensure_utc(until))
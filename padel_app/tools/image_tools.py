@@ -1,15 +1,23 @@
 # import cv2
+import io
+import json
 import os
 
 import unidecode
-from google.cloud import storage
+
+from padel_app import jobs
+from padel_app.sql_db import db
+from padel_app.storage import get_storage
+
+# Longest edge, in pixels, of each derivative served by Image.url(size=...).
+DERIVATIVE_SIZES = {"thumb": 128, "medium": 512}
+DERIVATIVE_FORMAT = "WEBP"
+DERIVATIVE_QUALITY = 82
 
 # import mediapipe as mp
 # import numpy as np
 
 
-GCS_BUCKET = os.environ.get("GCS_UPLOADS_BUCKET")
-
 # mp_drawing = mp.solutions.drawing_utils
 # mp_selfie_segmentation = mp.solutions.selfie_segmentation
 
@@ -29,14 +37,97 @@ GCS_BUCKET = os.environ.get("GCS_UPLOADS_BUCKET")
     return True """
 
 
-def save_file(file_storage, object_key) -> bool:
-    client = storage.Client()
-    bucket = client.bucket(GCS_BUCKET)
-    blob = bucket.blob(object_key)
-    blob.upload_from_file(
-        file_storage.stream, content_type=getattr(file_storage, "mimetype", None)
+class CountingReader:
+    """File-like wrapper that counts the bytes read through it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def save_file(file_storage, object_key) -> int:
+    """
+    Stream an upload into storage chunk by chunk.
+
+    Returns the number of bytes written, so callers can record the size
+    without reading the file twice.
+    """
+    reader = CountingReader(file_storage.stream)
+    get_storage().upload(
+        object_key,
+        reader,
+        content_type=getattr(file_storage, "mimetype", None),
     )
-    return True
+    return reader.bytes_read
+
+
+def derivative_key(object_key, size_name):
+    stem = os.path.splitext(object_key)[0]
+    return f"{stem}_{size_name}.{DERIVATIVE_FORMAT.lower()}"
+
+
+@jobs.task("image_derivatives", max_attempts=3)
+def generate_derivatives(image_id):
+    """
+    Render every size in DERIVATIVE_SIZES for an Image and record their keys.
+
+    The original is decoded once (JPEGs at reduced scale via draft()),
+    rotated per its EXIF orientation, and each size is written as WEBP.
+    Returns the {size name: object key} map, or None if the image is gone.
+    """
+    from PIL import Image as PILImage
+    from PIL import ImageOps
+
+    from padel_app.model import Image
+
+    image = db.session.get(Image, image_id)
+    if image is None:
+        return None
+
+    backend = get_storage()
+    largest = max(DERIVATIVE_SIZES.values())
+    with backend.open(image.object_key) as f:
+        original = PILImage.open(f)
+        original.draft("RGB", (largest, largest))
+        original.load()
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if "A" in original.getbands() else "RGB")
+
+    keys = {}
+    for name, edge in sorted(DERIVATIVE_SIZES.items(), key=lambda kv: -kv[1]):
+        resized = original.copy()
+        resized.thumbnail((edge, edge))
+        buffer = io.BytesIO()
+        resized.save(buffer, DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY)
+        buffer.seek(0)
+        keys[name] = derivative_key(image.object_key, name)
+        backend.upload(keys[name], buffer, content_type=f"image/{DERIVATIVE_FORMAT.lower()}")
+
+    image.derivatives = json.dumps(keys)
+    db.session.commit()
+    return keys
+
+
+def schedule_derivatives(image):
+    """
+    Queue derivative generation for a saved Image on the job queue.
+
+    Non-image uploads are skipped (returns None); otherwise returns
+    whatever jobs.enqueue returns for the configured backend.
+    """
+    content_type = getattr(image, "content_type", None) or ""
+    if not content_type.startswith("image/"):
+        return None
+    return jobs.enqueue("image_derivatives", image_id=image.id)
 
 
 def file_handler(file):
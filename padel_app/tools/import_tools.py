@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import Enum, String, bindparam, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from padel_app.sql_db import db
+from padel_app.tools.tools import str_to_bool, str_to_date, str_to_datetime
+
+UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    updated: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    ignored_columns: List[str] = field(default_factory=list)
+
+    def add_error(self, row: int, error: str):
+        self.errors.append({"row": row, "error": error})
+
+    def to_dict(self):
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "errors": self.errors,
+            "ignoredColumns": self.ignored_columns,
+        }
+
+
+def _to_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in ("1", "yes"):
+        return True
+    if lowered in ("0", "no"):
+        return False
+    return str_to_bool(value)
+
+
+def _to_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return str_to_date(value).date()
+
+
+def _to_datetime(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return str_to_datetime(value)
+
+
+def _to_decimal(value: str) -> Decimal:
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Cannot convert {value} to Decimal")
+
+
+def column_converter(column) -> Callable[[str], Any]:
+    """Pick the parser for a column once, from its SQL type."""
+    col_type = column.type
+
+    if isinstance(col_type, Enum):
+        choices = set(col_type.enums)
+
+        def to_choice(value):
+            if value not in choices:
+                raise ValueError(f"must be one of {', '.join(sorted(choices))}")
+            return value
+
+        return to_choice
+
+    try:
+        python_type = col_type.python_type
+    except NotImplementedError:
+        return lambda value: value
+
+    if python_type is bool:
+        return _to_bool
+    if python_type is datetime:
+        return _to_datetime
+    if python_type is date:
+        return _to_date
+    if python_type is Decimal:
+        return _to_decimal
+    if python_type in (int, float):
+        return python_type
+
+    if isinstance(col_type, String) and col_type.length:
+        length = col_type.length
+
+        def to_string(value):
+            if len(value) > length:
+                raise ValueError(f"longer than {length} characters")
+            return value
+
+        return to_string
+
+    return lambda value: value
+
+
+def _required(column) -> bool:
+    return not (
+        column.nullable
+        or column.primary_key
+        or column.default is not None
+        or column.server_default is not None
+    )
+
+
+def _chunks(rows: Iterable, size: int):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_csv(model, fileobj, *, key: Optional[str] = None, chunk_size: int = 1000):
+    """
+    Upsert a CSV file into a model's table.
+
+    Column types are read from the table once, existing rows for each chunk
+    are fetched with one query on the key column, and each chunk is written
+    with a single upsert (plus one insert for rows without a key). Rows that
+    fail to parse, or that the database rejects, are reported in
+    `ImportResult.errors` and the rest of the chunk still goes in.
+
+    Args:
+        model: Model class.
+        fileobj: Text file object with a header row.
+        key: Column used to match existing rows. Defaults to `id` when the
+            file has it, else `name` when that is a table column.
+        chunk_size: Rows per round trip.
+    """
+    table = model.__table__
+    pk = list(table.primary_key.columns)[0]
+    reader = csv.DictReader(fileobj)
+    header = reader.fieldnames or []
+
+    result = ImportResult()
+    columns = [table.columns[name] for name in header if name in table.columns]
+    result.ignored_columns = [name for name in header if name not in table.columns]
+
+    if key is None:
+        key = pk.name if pk.name in header else "name"
+    if key not in table.columns or key not in header:
+        result.add_error(0, f"Key column {key} missing from file")
+        return result
+
+    key_column = table.columns[key]
+    converters = {c.name: column_converter(c) for c in columns}
+    required = {c.name for c in table.columns if _required(c)}
+
+    bind = db.session().get_bind(mapper=model.__mapper__)
+    make_insert = UPSERT_INSERTS.get(bind.dialect.name)
+    hooks = _write_hooks(model)
+
+    def parse(line, raw):
+        values, problems = {}, []
+        for name, convert in converters.items():
+            text = (raw.get(name) or "").strip()
+            if text == "":
+                # Left out rather than None, so a partial file keeps the
+                # existing values (and inserts get column defaults).
+                continue
+            try:
+                values[name] = convert(text)
+            except (ValueError, TypeError) as e:
+                problems.append(f"{name}: {e}")
+        if problems:
+            result.add_error(line, "; ".join(problems))
+            return None
+        return values
+
+    # DictReader's line_num is the physical line, which is what users see.
+    numbered = ((reader.line_num, raw) for raw in reader)
+
+    for chunk in _chunks(numbered, chunk_size):
+        parsed = []
+        for line, raw in chunk:
+            values = parse(line, raw)
+            if values is not None:
+                parsed.append((line, values))
+
+        keys = {v[key] for _, v in parsed if key in v}
+        existing = {}
+        if keys:
+            existing = dict(
+                db.session.query(key_column, pk).filter(key_column.in_(keys)).all()
+            )
+
+        upserts, inserts = [], []
+        for line, values in parsed:
+            exists = values.get(key) in existing
+            if key != pk.name:
+                values.pop(pk.name, None)
+                if exists:
+                    values[pk.name] = existing[values[key]]
+
+            if not exists:
+                missing = sorted(n for n in required if values.get(n) is None)
+                if missing:
+                    result.add_error(line, f"missing {', '.join(missing)}")
+                    continue
+
+            target = upserts if values.get(pk.name) is not None else inserts
+            target.append((line, values, exists))
+
+        if not hooks:
+            _write_chunk(table, pk, make_insert, required, upserts, inserts, result)
+            continue
+
+        if inserts:
+            # Ids the database assigns to `inserts` are the ones above `high`.
+            high = db.session.query(func.max(pk)).scalar() or 0
+        written = _write_chunk(table, pk, make_insert, required, upserts, inserts, result)
+        if inserts:
+            written.update(row_id for (row_id,) in db.session.query(pk).filter(pk > high))
+        connection = db.session.connection()
+        for hook in hooks:
+            hook(connection, model, written)
+
+    db.session.commit()
+    result.errors.sort(key=lambda e: e["row"])
+    return result
+
+
+def _write_hooks(model):
+    """
+    The plain INSERT/UPDATE statements below skip the ORM flush hooks, so
+    models kept in the open-seat index or the sync changelog get them
+    called with the ids of each chunk's written rows instead.
+    """
+    from padel_app.tools import occupancy_tools, sync_tools
+
+    hooks = []
+    if occupancy_tools.tracks(model):
+        hooks.append(occupancy_tools.refresh_rows)
+    if sync_tools.tracks(model):
+        hooks.append(sync_tools.log_rows)
+    return hooks
+
+
+def _upsert_statement(table, pk, make_insert, required, names):
+    # Postgres checks NOT NULL on the proposed row before resolving the
+    # conflict, so partial files have to go through a plain UPDATE.
+    if make_insert is None or not required <= set(names):
+        return None
+    stmt = make_insert(table)
+    updates = {n: stmt.excluded[n] for n in names if n != pk.name}
+    if not updates:
+        return stmt.on_conflict_do_nothing(index_elements=[pk.name])
+    return stmt.on_conflict_do_update(index_elements=[pk.name], set_=updates)
+
+
+def _execute(table, pk, make_insert, required, rows, upsert):
+    """
+    One executemany per column set: an upsert, a plain insert, or (when an
+    upsert can't be used) an update for rows known to exist plus an insert
+    for the rest.
+    """
+    by_shape: Dict[tuple, List[tuple]] = {}
+    for row in rows:
+        by_shape.setdefault(tuple(sorted(row[1])), []).append(row)
+
+    for names, batch in by_shape.items():
+        if not upsert:
+            db.session.execute(table.insert(), [values for _, values, _ in batch])
+            continue
+
+        stmt = _upsert_statement(table, pk, make_insert, required, names)
+        if stmt is not None:
+            db.session.execute(stmt, [values for _, values, _ in batch])
+            continue
+
+        # Rows with nothing but their key have nothing to update.
+        known = [values for _, values, exists in batch if exists and len(values) > 1]
+        fresh = [values for _, values, exists in batch if not exists]
+        if known:
+            update = table.update().where(pk == bindparam("_pk"))
+            db.session.execute(
+                update,
+                [
+                    {**{n: v for n, v in values.items() if n != pk.name}, "_pk": values[pk.name]}
+                    for values in known
+                ],
+            )
+        if fresh:
+            db.session.execute(table.insert(), fresh)
+
+
+def _write_chunk(table, pk, make_insert, required, upserts, inserts, result):
+    """Write a chunk; returns the primary keys of the rows written that had one."""
+    written = set()
+
+    def run(rows, upsert):
+        if not rows:
+            return
+        try:
+            with db.session.begin_nested():
+                _execute(table, pk, make_insert, required, rows, upsert)
+        except SQLAlchemyError as e:
+            if len(rows) == 1:
+                reason = str(getattr(e, "orig", e)).splitlines()[0]
+                result.add_error(rows[0][0], f"rejected by the database: {reason}")
+                return
+            # Retry row by row to pin down which rows the database rejects.
+            for row in rows:
+                run([row], upsert)
+            return
+        for _, values, exists in rows:
+            if exists:
+                result.updated += 1
+            else:
+                result.inserted += 1
+            if values.get(pk.name) is not None:
+                written.add(values[pk.name])
+
+    run(upserts, True)
+    run(inserts, False)
+    return written
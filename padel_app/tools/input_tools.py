@@ -91,13 +91,16 @@ class Field:
         file, base = image_tools.file_handler(fs)
         object_key = self.mandatory_path or f"images/{self.model}/{now}_{base}"
 
-        if image_tools.save_file(file, object_key):
+        size = image_tools.save_file(file, object_key)
+        if size:
             img = Image(
                 object_key=object_key,
                 content_type=getattr(file, "mimetype", None),
+                size_bytes=size,
                 is_public=True,
             )
             img.create()
+            image_tools.schedule_derivatives(img)
             self.value = img.id
         return True
 
@@ -108,13 +111,16 @@ class Field:
         for _i, fs in enumerate(files):
             file, base = image_tools.file_handler(fs)
             object_key = self.mandatory_path or f"images/{self.model}/{now}_{base}"
-            if image_tools.save_file(file, object_key):
+            size = image_tools.save_file(file, object_key)
+            if size:
                 img = Image(
                     object_key=object_key,
                     content_type=getattr(file, "mimetype", None),
+                    size_bytes=size,
                     is_public=True,
                 )
                 img.create()
+                image_tools.schedule_derivatives(img)
                 ids.append(img.id)
         self.value = ids
         return True
@@ -0,0 +1,411 @@
+"""
+Open-seat index over lessons and lesson instances.
+
+`class_occupancy` holds one row per lesson (its recurring template) and
+one per materialized instance, with club, level, times and seat counts.
+The seat count follows the calendar's `participantCount`: players linked
+to the lesson, or to the instance once it has been materialized.
+
+Rows are rewritten with plain INSERT ... SELECT statements from an
+after_flush hook whenever a flush touches a lesson, an instance or
+their player links, so the index commits (or rolls back) with
+the change that caused it. Bulk query deletes/updates on those tables
+refresh the rows they hit from a do_orm_execute hook, and Core writes
+(e.g. the CSV import) call `refresh_rows` themselves. create_app
+registers the hooks with `register_listeners`.
+"""
+import heapq
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, event, func, insert, null, or_, select, true
+
+from padel_app.models import (
+    Association_PlayerLesson,
+    Association_PlayerLessonInstance,
+    ClassOccupancy,
+    Lesson,
+    LessonInstance,
+)
+from padel_app.sql_db import RoutingSession, db
+from padel_app.tools.calendar_tools import ensure_utc, expand_occurrences
+from padel_app.tools.query_tools import QueryError, decode_cursor, encode_cursor
+
+# Instance statuses that still take players.
+OPEN_STATUSES = ("scheduled", "rescheduled")
+
+_COLUMNS = (
+    "lesson_id",
+    "lesson_instance_id",
+    "club_id",
+    "level_id",
+    "start_datetime",
+    "end_datetime",
+    "recurrence_rule",
+    "recurrence_end",
+    "occurrence_date",
+    "status",
+    "max_players",
+    "participant_count",
+    "open_seats",
+)
+
+
+def _lesson_rows(lesson_filter):
+    count = (
+        select(func.count(Association_PlayerLesson.id))
+        .where(Association_PlayerLesson.lesson_id == Lesson.id)
+        .scalar_subquery()
+    )
+    return select(
+        Lesson.id,
+        null(),
+        Lesson.club_id,
+        Lesson.default_level_id,
+        Lesson.start_datetime,
+        Lesson.end_datetime,
+        Lesson.recurrence_rule,
+        Lesson.recurrence_end,
+        null(),
+        Lesson.status,
+        Lesson.max_players,
+        count,
+        Lesson.max_players - count,
+    ).where(lesson_filter)
+
+
+def _instance_rows(instance_filter):
+    count = (
+        select(func.count(Association_PlayerLessonInstance.id))
+        .where(Association_PlayerLessonInstance.lesson_instance_id == LessonInstance.id)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            LessonInstance.lesson_id,
+            LessonInstance.id,
+            Lesson.club_id,
+            func.coalesce(LessonInstance.level_id, Lesson.default_level_id),
+            LessonInstance.start_datetime,
+            LessonInstance.end_datetime,
+            null(),
+            null(),
+            LessonInstance.original_lesson_occurence_date,
+            LessonInstance.status,
+            LessonInstance.max_players,
+            count,
+            LessonInstance.max_players - count,
+        )
+        .join(Lesson, Lesson.id == LessonInstance.lesson_id)
+        .where(instance_filter)
+    )
+
+
+def _write(connection, lesson_filter, instance_filter, stale):
+    table = ClassOccupancy.__table__
+    columns = [table.c[name] for name in _COLUMNS]
+    connection.execute(delete(table).where(stale))
+    connection.execute(insert(table).from_select(columns, _lesson_rows(lesson_filter)))
+    connection.execute(insert(table).from_select(columns, _instance_rows(instance_filter)))
+
+
+def refresh(connection, lesson_ids=(), instance_ids=()):
+    """
+    Rewrite the index rows of the given lessons (and all their instances)
+    and of the given instances, on `connection`.
+    """
+    lesson_ids, instance_ids = sorted(set(lesson_ids)), sorted(set(instance_ids))
+    if not lesson_ids and not instance_ids:
+        return
+    table = ClassOccupancy.__table__
+    _write(
+        connection,
+        Lesson.id.in_(lesson_ids),
+        or_(
+            LessonInstance.lesson_id.in_(lesson_ids),
+            LessonInstance.id.in_(instance_ids),
+        ),
+        or_(
+            table.c.lesson_id.in_(lesson_ids),
+            table.c.lesson_instance_id.in_(instance_ids),
+        ),
+    )
+
+
+def rebuild(connection=None):
+    """Rebuild the whole index. Returns the number of rows written."""
+    connection = connection or db.session.connection()
+    _write(connection, true(), true(), true())
+    return connection.execute(select(func.count()).select_from(ClassOccupancy.__table__)).scalar()
+
+
+def _affected(objects):
+    lesson_ids, instance_ids = set(), set()
+    for obj in objects:
+        if isinstance(obj, Lesson):
+            lesson_ids.add(obj.id)
+        elif isinstance(obj, LessonInstance):
+            instance_ids.add(obj.id)
+            # A new or moved instance hides its lesson's occurrence.
+            if obj.lesson_id:
+                lesson_ids.add(obj.lesson_id)
+        elif isinstance(obj, Association_PlayerLesson):
+            lesson_ids.add(obj.lesson_id)
+        elif isinstance(obj, Association_PlayerLessonInstance):
+            instance_ids.add(obj.lesson_instance_id)
+    lesson_ids.discard(None)
+    instance_ids.discard(None)
+    return lesson_ids, instance_ids
+
+
+def _refresh_after_flush(session, flush_context):
+    objects = list(session.new) + list(session.dirty) + list(session.deleted)
+    lesson_ids, instance_ids = _affected(objects)
+    if lesson_ids or instance_ids:
+        refresh(session.connection(), lesson_ids, instance_ids)
+
+
+# Tracked models, with the columns holding the lesson and instance ids
+# whose index rows a change to them affects.
+_TRACKED = {
+    Lesson: (Lesson.id, None),
+    LessonInstance: (LessonInstance.lesson_id, LessonInstance.id),
+    Association_PlayerLesson: (Association_PlayerLesson.lesson_id, None),
+    Association_PlayerLessonInstance: (
+        None,
+        Association_PlayerLessonInstance.lesson_instance_id,
+    ),
+}
+
+
+def tracks(model):
+    return model in _TRACKED
+
+
+def _targets(connection, model, where):
+    """(row ids, lesson ids, instance ids) of the `model` rows matching `where`."""
+    lesson_column, instance_column = _TRACKED[model]
+    query = select(
+        model.id,
+        lesson_column if lesson_column is not None else null(),
+        instance_column if instance_column is not None else null(),
+    )
+    if where is not None:
+        query = query.where(where)
+    ids, lesson_ids, instance_ids = set(), set(), set()
+    for row_id, lesson_id, instance_id in connection.execute(query):
+        ids.add(row_id)
+        lesson_ids.add(lesson_id)
+        instance_ids.add(instance_id)
+    lesson_ids.discard(None)
+    instance_ids.discard(None)
+    return ids, lesson_ids, instance_ids
+
+
+def refresh_rows(connection, model, ids):
+    """Refresh the index after `model` rows `ids` were written outside the ORM."""
+    if model not in _TRACKED or not ids:
+        return
+    _, lesson_ids, instance_ids = _targets(connection, model, model.id.in_(ids))
+    refresh(connection, lesson_ids, instance_ids)
+
+
+def _targets_before_bulk(orm_execute_state):
+    # Query.delete()/update() skip the flush, so the rows they are about
+    # to hit are read here and refreshed once the statement has run.
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model not in _TRACKED:
+        return None
+    session = orm_execute_state.session
+    targets = _targets(
+        session.connection(), model, orm_execute_state.statement.whereclause
+    )
+    session.info.setdefault("occupancy_bulk", []).append(targets)
+    return None
+
+
+def _refresh_after_bulk(context, update):
+    model = context.mapper.class_
+    pending = context.session.info.get("occupancy_bulk")
+    if model not in _TRACKED or not pending:
+        return
+    ids, lesson_ids, instance_ids = pending.pop()
+    connection = context.session.connection()
+    if update and ids:
+        # Updated rows may now belong to another lesson or instance.
+        _, moved_lessons, moved_instances = _targets(connection, model, model.id.in_(ids))
+        lesson_ids |= moved_lessons
+        instance_ids |= moved_instances
+    refresh(connection, lesson_ids, instance_ids)
+
+
+def _refresh_after_bulk_delete(context):
+    _refresh_after_bulk(context, update=False)
+
+
+def _refresh_after_bulk_update(context):
+    _refresh_after_bulk(context, update=True)
+
+
+_LISTENERS = (
+    ("after_flush", _refresh_after_flush),
+    ("do_orm_execute", _targets_before_bulk),
+    ("after_bulk_delete", _refresh_after_bulk_delete),
+    ("after_bulk_update", _refresh_after_bulk_update),
+)
+
+
+def register_listeners():
+    """Keep ClassOccupancy current on session writes; called by create_app."""
+    for name, listener in _LISTENERS:
+        if not event.contains(RoutingSession, name, listener):
+            event.listen(RoutingSession, name, listener)
+
+
+def _naive_utc(dt):
+    return ensure_utc(dt).replace(tzinfo=None)
+
+
+def _item(row, title, start, end, occurrence_date, event_id):
+    return {
+        "id": event_id,
+        "lessonId": row.lesson_id,
+        "lessonInstanceId": row.lesson_instance_id,
+        "title": title,
+        "clubId": row.club_id,
+        "levelId": row.level_id,
+        "date": occurrence_date.isoformat(),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "maxPlayers": row.max_players,
+        "participantCount": row.participant_count,
+        "openSeats": row.open_seats,
+    }
+
+
+def search_open_classes(
+    club_id,
+    range_start,
+    range_end,
+    level_id=None,
+    min_seats=1,
+    limit=20,
+    cursor=None,
+):
+    """
+    Classes of `club_id` starting in [range_start, range_end) with at
+    least `min_seats` free seats, ordered by start time.
+
+    Recurring lessons are expanded in Python from their index row; an
+    occurrence with a materialized instance is replaced by the instance.
+    Returns (items, next cursor or None).
+
+    Raises:
+        QueryError: If `cursor` is malformed.
+    """
+    lo, hi = _naive_utc(range_start), _naive_utc(range_end)
+    after = None
+    if cursor:
+        start, (kind, key_id) = decode_cursor(cursor)
+        try:
+            lo = max(lo, _naive_utc(datetime.fromisoformat(start)))
+        except (TypeError, ValueError):
+            raise QueryError("Bad cursor")
+        if not isinstance(kind, str) or not isinstance(key_id, int):
+            raise QueryError("Bad cursor")
+        after = (start, kind, key_id)
+
+    base = [ClassOccupancy.club_id == club_id, ClassOccupancy.open_seats >= min_seats]
+    if level_id is not None:
+        base.append(ClassOccupancy.level_id == level_id)
+
+    instances = (
+        db.session.query(ClassOccupancy, func.coalesce(LessonInstance.overwrite_title, Lesson.title))
+        .join(LessonInstance, LessonInstance.id == ClassOccupancy.lesson_instance_id)
+        .join(Lesson, Lesson.id == ClassOccupancy.lesson_id)
+        .filter(
+            *base,
+            ClassOccupancy.status.in_(OPEN_STATUSES),
+            ClassOccupancy.start_datetime >= lo,
+            ClassOccupancy.start_datetime < hi,
+        )
+        .order_by(ClassOccupancy.start_datetime, ClassOccupancy.lesson_instance_id)
+    )
+    lessons = (
+        db.session.query(ClassOccupancy, Lesson.title)
+        .join(Lesson, Lesson.id == ClassOccupancy.lesson_id)
+        .filter(
+            *base,
+            ClassOccupancy.lesson_instance_id.is_(None),
+            ClassOccupancy.status == "active",
+            ClassOccupancy.start_datetime < hi,
+            or_(
+                ClassOccupancy.recurrence_end.is_(None),
+                ClassOccupancy.recurrence_end >= lo.date(),
+            ),
+        )
+        .all()
+    )
+
+    # Every instance of these lessons hides its occurrence, whether or not
+    # it matches the search itself (full, canceled, moved elsewhere).
+    materialized = set()
+    if lessons:
+        materialized = set(
+            db.session.query(ClassOccupancy.lesson_id, ClassOccupancy.occurrence_date)
+            .filter(
+                ClassOccupancy.lesson_id.in_([row.lesson_id for row, _ in lessons]),
+                ClassOccupancy.lesson_instance_id.isnot(None),
+                and_(
+                    ClassOccupancy.occurrence_date >= lo.date() - timedelta(days=1),
+                    ClassOccupancy.occurrence_date <= hi.date() + timedelta(days=1),
+                ),
+            )
+            .all()
+        )
+
+    # Streams yield (sort key, item); the key is (start, kind, numeric id),
+    # the order the instance query sorts in, so ties on start merge and
+    # page consistently.
+    def from_instances():
+        for row, title in instances.yield_per(200):
+            item = _item(
+                row, title,
+                ensure_utc(row.start_datetime), ensure_utc(row.end_datetime),
+                row.start_datetime.date(),
+                f"lessoninstance-{row.lesson_instance_id}",
+            )
+            yield (item["start"], "lessoninstance", row.lesson_instance_id), item
+
+    def from_lesson(row, title):
+        duration = row.end_datetime - row.start_datetime
+        for occ_start in expand_occurrences(
+            row.start_datetime, row.recurrence_rule, row.recurrence_end, lo, hi
+        ):
+            if occ_start >= ensure_utc(hi):
+                break
+            if (row.lesson_id, occ_start.date()) in materialized:
+                continue
+            item = _item(
+                row, title, occ_start, occ_start + duration, occ_start.date(),
+                f"lesson-{row.lesson_id}-{occ_start.date()}",
+            )
+            yield (item["start"], "lesson", row.lesson_id), item
+
+    streams = [from_instances()] + [from_lesson(row, title) for row, title in lessons]
+    keyed = []
+    for key, item in heapq.merge(*streams, key=lambda pair: pair[0]):
+        if after and key <= after:
+            continue
+        keyed.append((key, item))
+        if len(keyed) > limit:
+            break
+
+    next_cursor = None
+    if len(keyed) > limit:
+        keyed = keyed[:limit]
+        start, kind, key_id = keyed[-1][0]
+        next_cursor = encode_cursor(start, [kind, key_id])
+    return [item for _, item in keyed], next_cursor
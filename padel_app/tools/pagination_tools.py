@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from sqlalchemy import String, func, inspect, text
+
+from padel_app.sql_db import db
+
+SEARCH_MODES = ("prefix", "trigram")
+
+# pg_trgm can't use its index for terms shorter than a trigram.
+TRIGRAM_MIN_LENGTH = 3
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    has_prev: bool
+    has_next: bool
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+    @property
+    def first_id(self):
+        return self.items[0].id if self.items else None
+
+    @property
+    def last_id(self):
+        return self.items[-1].id if self.items else None
+
+
+def keyset_paginate(query, key, *, per_page, after=None, before=None, descending=False):
+    """
+    Page through `query` on `key` without OFFSET.
+
+    `after` returns the page following that key, `before` the page
+    preceding it; with neither, the first page. Cost is one index range
+    scan of `per_page + 1` rows regardless of how deep the page is.
+    """
+    forward = key.desc() if descending else key.asc()
+    backward = key.asc() if descending else key.desc()
+
+    if before is not None:
+        cond = key > before if descending else key < before
+        rows = query.filter(cond).order_by(backward).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        return KeysetPage(
+            items=list(reversed(rows[:per_page])), has_prev=has_prev, has_next=True
+        )
+
+    if after is not None:
+        query = query.filter(key < after if descending else key > after)
+    rows = query.order_by(forward).limit(per_page + 1).all()
+    return KeysetPage(
+        items=rows[:per_page],
+        has_prev=after is not None,
+        has_next=len(rows) > per_page,
+    )
+
+
+def estimated_count(model):
+    """
+    Row count for a model's table, and whether it is an estimate.
+
+    On Postgres this reads the planner's `pg_class.reltuples`, which is
+    free; a table that was never analysed (-1) falls back to COUNT(*), as
+    do other backends.
+    """
+    table = model.__table__
+    bind = db.session().get_bind(mapper=model.__mapper__)
+
+    if bind.dialect.name == "postgresql":
+        reltuples = db.session.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": table.fullname},
+        ).scalar()
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples), True
+
+    return db.session.query(func.count()).select_from(table).scalar(), False
+
+
+def _match(column, term, mode):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    if mode == "trigram" and len(term) >= TRIGRAM_MIN_LENGTH:
+        return column.ilike(f"%{escaped}%", escape="\\")
+    return column.ilike(f"{escaped}%", escape="\\")
+
+
+def _searchable_field(model):
+    path = getattr(model, "searchable_path", None)
+    if path is None:
+        # display_all_info is an instance method on some models.
+        path = model().display_all_info()[0]["field"]
+    return path
+
+
+def _search_target(model, path=None, depth=0):
+    """
+    (relationship attributes, column) that a model's search goes through,
+    or None when the field can't be searched in SQL.
+    """
+    if depth > 3:
+        return None
+    if path is None:
+        path = _searchable_field(model)
+
+    head, _, rest = path.partition(".")
+    mapper = inspect(model)
+
+    if head in mapper.columns:
+        column = mapper.columns[head]
+        if rest or not isinstance(column.type, String):
+            return None
+        return [], column
+
+    relationship = mapper.relationships.get(head)
+    if relationship is None or relationship.uselist:
+        return None
+
+    inner = _search_target(relationship.mapper.class_, rest or None, depth + 1)
+    if inner is None:
+        return None
+    attributes, column = inner
+    return [getattr(model, head), *attributes], column
+
+
+def is_searchable(model, path=None):
+    """Whether `search_clause` can search `model` in SQL."""
+    return _search_target(model, path) is not None
+
+
+def search_clause(model, term, mode="prefix", path=None):
+    """
+    WHERE clause matching `term` against a model's searchable column.
+
+    The column is `path` when given, else `model.searchable_path` (a
+    dotted path such as "user.name"), else the field declared in
+    `display_all_info`. Fields that are many-to-one relationships are
+    followed into the related model's own searchable column. Returns None
+    when the field can't be searched in SQL (e.g. a plain Python property).
+    """
+    target = _search_target(model, path)
+    if target is None:
+        return None
+    attributes, column = target
+    clause = _match(column, term, mode)
+    for attribute in reversed(attributes):
+        clause = attribute.has(clause)
+    return clause
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy import select, tuple_
+
+from padel_app.sql_db import db
+from padel_app.tools.import_tools import column_converter
+
+OPERATORS = {
+    "eq": lambda col, v: col == v,
+    "ne": lambda col, v: col != v,
+    "lt": lambda col, v: col < v,
+    "lte": lambda col, v: col <= v,
+    "gt": lambda col, v: col > v,
+    "gte": lambda col, v: col >= v,
+    "in": lambda col, v: col.in_(v),
+    "like": lambda col, v: col.ilike(v),
+    "isnull": lambda col, v: col.is_(None) if v else col.isnot(None),
+}
+
+
+class QueryError(ValueError):
+    pass
+
+
+@dataclass
+class QuerySpec:
+    fields: List[Any]
+    filters: List[Any]
+    order: Any
+    descending: bool
+    cursor: Optional[tuple]
+    limit: int
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v for v in value.split(",") if v]
+    return list(value)
+
+
+def _column(table, name):
+    if name not in table.columns:
+        raise QueryError(f"Unknown field: {name}")
+    return table.columns[name]
+
+
+def _coerce(column, value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return column_converter(column)(value)
+    except ValueError as e:
+        raise QueryError(f"{column.name}: {e}")
+
+
+def _parse_filter(table, raw):
+    if isinstance(raw, str):
+        # "field:op:value" from the query string
+        parts = raw.split(":", 2)
+        if len(parts) != 3:
+            raise QueryError(f"Bad filter: {raw}")
+        raw = dict(zip(("field", "op", "value"), parts))
+
+    column = _column(table, raw.get("field"))
+    op = raw.get("op", "eq")
+    if op not in OPERATORS:
+        raise QueryError(f"Unknown operator: {op}")
+
+    value = raw.get("value")
+    if op == "in":
+        value = [_coerce(column, v) for v in _as_list(value)]
+    elif op == "isnull":
+        value = value if isinstance(value, bool) else str(value).lower() == "true"
+    elif op != "like":
+        value = _coerce(column, value)
+    return OPERATORS[op](column, value)
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(order_value, pk_value) -> str:
+    raw = json.dumps([_jsonable(order_value), pk_value]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """The raw (order value, pk value) pair of an encode_cursor cursor."""
+    try:
+        order_value, pk_value = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise QueryError("Bad cursor")
+    return order_value, pk_value
+
+
+def _decode_cursor(order, pk, cursor):
+    order_value, pk_value = decode_cursor(cursor)
+    return _coerce(order, order_value), _coerce(pk, pk_value)
+
+
+def parse_query_spec(model, args, *, default_limit=100, max_limit=1000) -> QuerySpec:
+    """
+    Build a QuerySpec from request args or a JSON body.
+
+    Accepts `fields` (list or comma string), `filters` (list of
+    {field, op, value}) and/or `where` ("field:op:value", repeatable),
+    `order` ("col" or "-col"), `cursor` and `limit` (capped at max_limit).
+
+    Raises:
+        QueryError: On unknown fields/operators or unparseable values.
+    """
+    table = model.__table__
+    pk = list(table.primary_key.columns)[0]
+
+    names = _as_list(args.get("fields"))
+    fields = [_column(table, n) for n in names] or list(table.columns)
+
+    raw_filters = list(args.get("filters") or []) + _as_list(args.get("where"))
+    filters = [_parse_filter(table, f) for f in raw_filters]
+
+    order_name = args.get("order") or pk.name
+    descending = order_name.startswith("-")
+    order = _column(table, order_name.lstrip("-"))
+
+    cursor = args.get("cursor")
+    cursor = _decode_cursor(order, pk, cursor) if cursor else None
+
+    try:
+        limit = int(args.get("limit") or default_limit)
+    except (TypeError, ValueError):
+        raise QueryError("limit must be an integer")
+
+    return QuerySpec(
+        fields=fields,
+        filters=filters,
+        order=order,
+        descending=descending,
+        cursor=cursor,
+        limit=max(1, min(limit, max_limit)),
+    )
+
+
+def build_select(model, spec: QuerySpec):
+    """Core SELECT of only the requested columns (plus the keyset keys)."""
+    pk = list(model.__table__.primary_key.columns)[0]
+    keys = [pk] if spec.order is pk else [spec.order, pk]
+
+    selected = list(spec.fields)
+    selected += [k for k in keys if k not in selected]
+    stmt = select(*selected).where(*spec.filters)
+
+    if spec.cursor is not None:
+        if spec.order is pk:
+            after = spec.cursor[1]
+            stmt = stmt.where(pk < after if spec.descending else pk > after)
+        else:
+            current = tuple_(*keys)
+            after = tuple_(*spec.cursor)
+            stmt = stmt.where(current < after if spec.descending else current > after)
+
+    ordering = [k.desc() if spec.descending else k.asc() for k in keys]
+    return stmt.order_by(*ordering).limit(spec.limit + 1)
+
+
+def stream_query(model, spec: QuerySpec, dumps: Callable[[Any], str], chunk_size=500):
+    """
+    Yield a JSON document `{"items": [...], "nextCursor": ...}` in pieces.
+
+    Rows are fetched with yield_per so the response never holds more than
+    one chunk. One extra row is read to tell whether there is a next page.
+    Rows whose order column is NULL are not reachable through cursors.
+    """
+    pk = list(model.__table__.primary_key.columns)[0]
+    names = [c.name for c in spec.fields]
+
+    result = db.session.execute(
+        build_select(model, spec), execution_options={"stream_results": True}
+    ).yield_per(chunk_size)
+
+    yield '{"items":['
+    last = None
+    try:
+        for n, row in enumerate(result.mappings()):
+            if n == spec.limit:
+                break
+            yield ("," if n else "") + dumps({name: row[name] for name in names})
+            last = row
+        else:
+            last = None
+    finally:
+        result.close()
+
+    next_cursor = encode_cursor(last[spec.order.name], last[pk.name]) if last else None
+    yield '],"nextCursor":' + json.dumps(next_cursor) + "}"
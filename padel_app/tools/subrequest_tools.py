@@ -0,0 +1,163 @@
+"""
+Dispatch of /api/app/batch sub-requests.
+
+Each sub-request runs through the app's normal request handling (URL
+routing, JWT checks, error handlers, after_request hooks) in a nested
+request context. Flask reuses the outer app context for it, so `g`
+(the caller's identity, see padel_app.identity) and the database
+session are shared with the batch request instead of being set up
+again per call.
+
+Parallel GETs each run in a fresh app context on a small thread pool.
+They get a copy of the caller's Identity but their own session.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g, jsonify, request
+
+from padel_app.sql_db import db
+
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_subrequests(items, max_requests):
+    """
+    Validate the `requests` list of a batch payload.
+
+    Each item is {"id"?, "method"?, "path", "query"?, "body"?}; ids
+    default to the item's position.
+
+    Raises:
+        BatchError: If the list or one of its items is malformed.
+    """
+    if not isinstance(items, list) or not items:
+        raise BatchError("requests must be a non-empty list")
+    if len(items) > max_requests:
+        raise BatchError(f"At most {max_requests} requests per batch")
+
+    subrequests = []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise BatchError(f"Request {position} must be an object")
+        method = str(item.get("method", "GET")).upper()
+        path = item.get("path")
+        if method not in METHODS:
+            raise BatchError(f"Request {position}: unsupported method {method}")
+        if not isinstance(path, str) or not path.startswith("/api/"):
+            raise BatchError(f"Request {position}: path must start with /api/")
+        if path.split("?", 1)[0].rstrip("/") == request.path.rstrip("/"):
+            raise BatchError(f"Request {position}: batches can't be nested")
+        query = item.get("query") or {}
+        if not isinstance(query, dict):
+            raise BatchError(f"Request {position}: query must be an object")
+        subrequests.append({
+            "id": item.get("id", position),
+            "method": method,
+            "path": path,
+            "query": query,
+            "body": item.get("body"),
+        })
+    return subrequests
+
+
+def _forwarded_auth():
+    """Credentials of the batch request, for its sub-requests."""
+    headers, query = {}, {}
+    if request.headers.get("Authorization"):
+        headers["Authorization"] = request.headers["Authorization"]
+    name = current_app.config.get("JWT_QUERY_STRING_NAME", "jwt")
+    if name in request.args:
+        query[name] = request.args[name]
+    return headers, query
+
+
+def _result(sub, response):
+    if response.mimetype == "text/event-stream":
+        # Never ends; the app's event stream has its own endpoint.
+        response.close()
+        body = {"message": "Streaming endpoints can't be batched"}
+        return {"id": sub["id"], "status": 400, "body": body}
+    body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+    return {"id": sub["id"], "status": response.status_code, "body": body}
+
+
+def dispatch(app, sub, headers, auth_query, base_url):
+    """Run one sub-request and return {"id", "status", "body"}."""
+    with app.test_request_context(
+        sub["path"],
+        base_url=base_url,
+        method=sub["method"],
+        query_string={**sub["query"], **auth_query},
+        json=sub["body"],
+        headers=headers,
+    ):
+        # replica_read marks g, which the sub-requests share.
+        read_only = g.pop("db_read_only", None)
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Batched %s %s failed", sub["method"], sub["path"])
+            response = jsonify({"message": "Internal server error"})
+            response.status_code = 500
+        finally:
+            g.pop("db_read_only", None)
+            if read_only is not None:
+                g.db_read_only = read_only
+        return _result(sub, response)
+
+
+def _dispatch_isolated(app, sub, headers, auth_query, base_url, identity):
+    with app.app_context():
+        if identity is not None:
+            g.identity = identity
+        return dispatch(app, sub, headers, auth_query, base_url)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("BATCH_MAX_WORKERS", 4),
+                    thread_name_prefix="batch",
+                )
+    return _pool
+
+
+def dispatch_batch(subrequests, identity=None, parallel=False):
+    """
+    Run `subrequests` as the current caller; results come back in order.
+
+    Sub-requests run one after another, so later ones see earlier
+    writes. With `parallel`, the GETs are run concurrently instead,
+    ahead of the rest.
+    """
+    app = current_app._get_current_object()
+    headers, auth_query = _forwarded_auth()
+    base_url = request.host_url
+
+    results = [None] * len(subrequests)
+    futures = {}
+    if parallel:
+        for i, sub in enumerate(subrequests):
+            if sub["method"] == "GET":
+                futures[i] = _get_pool().submit(
+                    _dispatch_isolated, app, sub, headers, auth_query, base_url, identity
+                )
+
+    for i, sub in enumerate(subrequests):
+        if i not in futures:
+            results[i] = dispatch(app, sub, headers, auth_query, base_url)
+    for i, future in futures.items():
+        results[i] = future.result()
+    return results
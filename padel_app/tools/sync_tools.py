@@ -0,0 +1,450 @@
+"""
+Change tracking for /api/app/sync.
+
+Every flush that inserts, updates or deletes one of the SYNC_ENTITIES
+appends a row to `change_log` on the same connection, so the log commits
+(or rolls back) with the write. Query.delete()/update() skip the flush,
+so they are intercepted in do_orm_execute: the rows a delete matches
+are read and logged just before it runs; the rows an update matches are
+read then and logged, under their old and new scope, once it has run.
+Core writes (e.g. the CSV import) call `log_rows` themselves. create_app
+registers the hooks with `register_listeners`.
+
+Each log row carries the ids that decide who may see it (lesson, coach,
+player, user, conversation), taken from the row as it was written.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event, func, insert, or_, select, union
+from sqlalchemy.orm import joinedload, selectinload
+
+from padel_app.models import (
+    Association_CoachLesson,
+    Association_CoachPlayer,
+    Association_PlayerLesson,
+    Association_PlayerLessonInstance,
+    CalendarBlock,
+    ChangeLog,
+    ConversationParticipant,
+    Lesson,
+    LessonInstance,
+    Message,
+    Presence,
+)
+from padel_app.serializers.calendar import serialize_calendar_block
+from padel_app.serializers.lesson import serialize_lesson, serialize_lesson_instance
+from padel_app.serializers.presence import serialize_presence
+from padel_app.sql_db import RoutingSession, db
+
+SCOPE_COLUMNS = ("lesson_id", "coach_id", "player_id", "user_id", "conversation_id")
+
+NO_SETTLE = timedelta(0)
+
+
+@dataclass(frozen=True)
+class SyncEntity:
+    name: str
+    model: type
+    # Scope ids from a row (ORM object or table row). "lesson_instance_id"
+    # is resolved to lesson_id before the log row is written.
+    scope: Callable[[object], Dict[str, Optional[int]]]
+    serialize: Callable
+    options: Tuple = field(default=())
+
+
+def _link(**columns):
+    return lambda obj: {
+        key: getattr(obj, column) for key, column in columns.items()
+    }
+
+
+def _serialize_link(*columns):
+    def serialize(obj, context):
+        data = {"id": obj.id}
+        for column in columns:
+            head, *rest = column.split("_")
+            data[head + "".join(w.title() for w in rest)] = getattr(obj, column)
+        return data
+
+    return serialize
+
+
+SYNC_ENTITIES = (
+    SyncEntity(
+        "lessons",
+        Lesson,
+        _link(lesson_id="id"),
+        lambda obj, context: serialize_lesson(obj),
+        (selectinload(Lesson.coaches_relations).joinedload(Association_CoachLesson.coach),),
+    ),
+    SyncEntity(
+        "lessonInstances",
+        LessonInstance,
+        _link(lesson_id="lesson_id"),
+        lambda obj, context: serialize_lesson_instance(obj),
+        (joinedload(LessonInstance.lesson),),
+    ),
+    SyncEntity(
+        "presences",
+        Presence,
+        _link(lesson_instance_id="lesson_instance_id", player_id="player_id"),
+        lambda obj, context: serialize_presence(obj),
+    ),
+    SyncEntity(
+        "calendarBlocks",
+        CalendarBlock,
+        _link(user_id="user_id"),
+        lambda obj, context: serialize_calendar_block(obj),
+    ),
+    SyncEntity(
+        "messages",
+        Message,
+        _link(conversation_id="conversation_id"),
+        lambda obj, context: _serialize_message(obj, context),
+    ),
+    SyncEntity(
+        "lessonPlayers",
+        Association_PlayerLesson,
+        _link(lesson_id="lesson_id", player_id="player_id"),
+        _serialize_link("lesson_id", "player_id"),
+    ),
+    SyncEntity(
+        "lessonInstancePlayers",
+        Association_PlayerLessonInstance,
+        _link(lesson_instance_id="lesson_instance_id", player_id="player_id"),
+        _serialize_link("lesson_instance_id", "player_id"),
+    ),
+    SyncEntity(
+        "lessonCoaches",
+        Association_CoachLesson,
+        _link(lesson_id="lesson_id", coach_id="coach_id"),
+        _serialize_link("lesson_id", "coach_id"),
+    ),
+    SyncEntity(
+        "coachPlayers",
+        Association_CoachPlayer,
+        _link(coach_id="coach_id", player_id="player_id"),
+        lambda obj, context: _serialize_coach_player(obj, context),
+    ),
+)
+
+_BY_MODEL = {entity.model: entity for entity in SYNC_ENTITIES}
+_BY_NAME = {entity.name: entity for entity in SYNC_ENTITIES}
+
+
+def _serialize_coach_player(link, context):
+    data = _serialize_link("coach_id", "player_id", "level_id", "side")(link, context)
+    # The coach's notes about the player are private to the coach.
+    if context["identity"].coach_id == link.coach_id:
+        data["notes"] = link.notes
+    return data
+
+
+def _serialize_message(message, context):
+    last_read_at = context["last_read_at"].get(message.conversation_id)
+    return {
+        "id": message.id,
+        "senderId": message.sender_id,
+        "content": message.text,
+        "timestamp": message.sent_at.isoformat(),
+        "conversationId": message.conversation_id,
+        "isRead": bool(last_read_at and message.sent_at <= last_read_at),
+    }
+
+
+# -------------------------------------------------------------------
+# Writing the log
+# -------------------------------------------------------------------
+
+
+def _log_rows(connection, changes, lesson_by_instance=None):
+    """
+    Insert change_log rows for `changes`, a list of (entity, row, op).
+
+    Instance-scoped rows get the instance's lesson id, from
+    `lesson_by_instance` or, failing that, one query.
+    """
+    lesson_by_instance = dict(lesson_by_instance or {})
+    scoped = []
+    for entity, row, op in changes:
+        scope = entity.scope(row)
+        scoped.append((entity, row.id, op, scope))
+
+    missing = {
+        scope["lesson_instance_id"]
+        for _, _, _, scope in scoped
+        if scope.get("lesson_instance_id") and scope["lesson_instance_id"] not in lesson_by_instance
+    }
+    if missing:
+        lesson_by_instance.update(
+            connection.execute(
+                select(LessonInstance.id, LessonInstance.lesson_id).where(
+                    LessonInstance.id.in_(missing)
+                )
+            ).all()
+        )
+
+    rows = []
+    now = datetime.utcnow()
+    for entity, entity_id, op, scope in scoped:
+        instance_id = scope.pop("lesson_instance_id", None)
+        if instance_id is not None:
+            scope["lesson_id"] = lesson_by_instance.get(instance_id)
+        rows.append({
+            "entity": entity.name,
+            "entity_id": entity_id,
+            "op": op,
+            "created_at": now,
+            **{column: scope.get(column) for column in SCOPE_COLUMNS},
+        })
+    if rows:
+        connection.execute(insert(ChangeLog.__table__), rows)
+
+
+def tracks(model):
+    return model in _BY_MODEL
+
+
+def log_rows(connection, model, ids, op="upsert"):
+    """Log `model` rows `ids` written outside the ORM (e.g. by the CSV import)."""
+    entity = _BY_MODEL.get(model)
+    if entity is None or not ids:
+        return
+    table = model.__table__
+    rows = connection.execute(select(table).where(table.c.id.in_(sorted(ids)))).all()
+    _log_rows(connection, [(entity, row, op) for row in rows])
+
+
+def _log_flush(session, flush_context):
+    changes = []
+    lesson_by_instance = {}
+    for objects, op in (
+        (session.new, "upsert"),
+        (session.dirty, "upsert"),
+        (session.deleted, "delete"),
+    ):
+        for obj in objects:
+            entity = _BY_MODEL.get(type(obj))
+            if entity is None:
+                continue
+            if op == "upsert" and obj in session.dirty and not session.is_modified(obj):
+                continue
+            if isinstance(obj, LessonInstance):
+                # Lets children deleted with their instance keep its lesson.
+                lesson_by_instance[obj.id] = obj.lesson_id
+            changes.append((entity, obj, op))
+    if changes:
+        _log_rows(session.connection(), changes, lesson_by_instance)
+
+
+def _log_bulk(orm_execute_state):
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    entity = _BY_MODEL.get(mapper.class_) if mapper is not None else None
+    if entity is None:
+        return None
+
+    table = entity.model.__table__
+    statement = orm_execute_state.statement
+    query = select(table)
+    if statement.whereclause is not None:
+        query = query.where(statement.whereclause)
+    session = orm_execute_state.session
+    rows = session.connection().execute(query).all()
+
+    if orm_execute_state.is_delete:
+        # Logged ahead of the statement, in the same transaction.
+        _log_rows(session.connection(), [(entity, row, "delete") for row in rows])
+    else:
+        # Logged once the statement has run, see _log_after_bulk_update.
+        session.info.setdefault("sync_bulk", []).append(rows)
+    return None
+
+
+def _log_after_bulk_update(context):
+    entity = _BY_MODEL.get(context.mapper.class_)
+    pending = context.session.info.get("sync_bulk")
+    if entity is None or not pending:
+        return
+    before = pending.pop()
+    if not before:
+        return
+    table = entity.model.__table__
+    connection = context.session.connection()
+    after = connection.execute(
+        select(table).where(table.c.id.in_([row.id for row in before]))
+    ).all()
+    # Logged under the new scope, and under the old one too for rows the
+    # update moved, so both the new and the previous owners pick them up.
+    new_scope = {row.id: entity.scope(row) for row in after}
+    moved = [row for row in before if entity.scope(row) != new_scope.get(row.id)]
+    _log_rows(connection, [(entity, row, "upsert") for row in after + moved])
+
+
+_LISTENERS = (
+    ("after_flush", _log_flush),
+    ("do_orm_execute", _log_bulk),
+    ("after_bulk_update", _log_after_bulk_update),
+)
+
+
+def register_listeners():
+    """Log SYNC_ENTITIES writes to ChangeLog; called by create_app."""
+    for name, listener in _LISTENERS:
+        if not event.contains(RoutingSession, name, listener):
+            event.listen(RoutingSession, name, listener)
+
+
+# -------------------------------------------------------------------
+# Reading it
+# -------------------------------------------------------------------
+
+
+class SyncReset(Exception):
+    """The cursor predates the retained log; the client must reload everything."""
+
+
+def _visible_lessons(identity):
+    queries = []
+    if identity.coach_id:
+        queries.append(
+            select(Association_CoachLesson.lesson_id).where(
+                Association_CoachLesson.coach_id == identity.coach_id
+            )
+        )
+    if identity.player_id:
+        queries.append(
+            select(Association_PlayerLesson.lesson_id).where(
+                Association_PlayerLesson.player_id == identity.player_id
+            )
+        )
+        queries.append(
+            select(LessonInstance.lesson_id)
+            .join(
+                Association_PlayerLessonInstance,
+                Association_PlayerLessonInstance.lesson_instance_id == LessonInstance.id,
+            )
+            .where(Association_PlayerLessonInstance.player_id == identity.player_id)
+        )
+    if not queries:
+        return None
+    return union(*queries) if len(queries) > 1 else queries[0]
+
+
+def visible_to(identity):
+    """Filter on ChangeLog for the changes `identity` may see."""
+    clauses = [
+        ChangeLog.user_id == identity.user_id,
+        ChangeLog.conversation_id.in_(
+            select(ConversationParticipant.conversation_id).where(
+                ConversationParticipant.user_id == identity.user_id
+            )
+        ),
+    ]
+    lessons = _visible_lessons(identity)
+    if lessons is not None:
+        clauses.append(ChangeLog.lesson_id.in_(lessons))
+    if identity.coach_id:
+        clauses.append(ChangeLog.coach_id == identity.coach_id)
+    if identity.player_id:
+        clauses.append(ChangeLog.player_id == identity.player_id)
+    return or_(*clauses)
+
+
+def latest_cursor():
+    return db.session.query(func.coalesce(func.max(ChangeLog.id), 0)).scalar()
+
+
+def latest_change(identity, entities):
+    """
+    (oldest retained id, newest id) of the changes to `entities` that
+    `identity` can see; a version for caching responses built from them.
+    The oldest id moves when the log is pruned, so the pair never
+    repeats an earlier value.
+    """
+    oldest = db.session.query(func.min(ChangeLog.id)).scalar_subquery()
+    newest = (
+        db.session.query(func.max(ChangeLog.id))
+        .filter(ChangeLog.entity.in_(entities), visible_to(identity))
+        .scalar_subquery()
+    )
+    return tuple(db.session.query(oldest, newest).one())
+
+
+def changes_since(identity, since, limit=500, settle=NO_SETTLE):
+    """
+    Changes visible to `identity` after cursor `since`.
+
+    Returns (changes, cursor, has_more). `changes` maps entity name to
+    {"upserted": [current payloads], "deleted": [ids]}; each entity
+    appears once, in its latest state. Log rows younger than `settle`
+    are left for the next poll.
+
+    Raises:
+        SyncReset: If rows after `since` have already been pruned.
+    """
+    oldest = db.session.query(func.min(ChangeLog.id)).scalar()
+    if since and oldest is not None and since < oldest - 1:
+        raise SyncReset()
+
+    rows = (
+        db.session.query(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+        .filter(
+            ChangeLog.id > since,
+            ChangeLog.created_at <= datetime.utcnow() - settle,
+            visible_to(identity),
+        )
+        .order_by(ChangeLog.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = rows[-1].id if rows else since
+
+    latest = {}
+    for row in rows:
+        latest[(row.entity, row.entity_id)] = row.op
+
+    upserts, deletes = {}, {}
+    for (name, entity_id), op in latest.items():
+        (upserts if op == "upsert" else deletes).setdefault(name, []).append(entity_id)
+
+    context = {"identity": identity, "last_read_at": {}}
+    if "messages" in upserts:
+        context["last_read_at"] = dict(
+            db.session.query(
+                ConversationParticipant.conversation_id,
+                ConversationParticipant.last_read_at,
+            ).filter(ConversationParticipant.user_id == identity.user_id)
+        )
+
+    changes = {}
+    for name in dict.fromkeys(list(upserts) + list(deletes)):
+        entity = _BY_NAME[name]
+        ids = upserts.get(name, [])
+        objects = []
+        if ids:
+            objects = (
+                entity.model.query.options(*entity.options)
+                .filter(entity.model.id.in_(ids))
+                .order_by(entity.model.id)
+                .all()
+            )
+        found = {obj.id for obj in objects}
+        changes[name] = {
+            "upserted": [entity.serialize(obj, context) for obj in objects],
+            # Updated and then deleted since the last poll.
+            "deleted": sorted(set(deletes.get(name, [])) | (set(ids) - found)),
+        }
+    return changes, cursor, has_more
+
+
+def prune(before):
+    """Delete log rows created before `before`. Returns the number removed."""
+    return ChangeLog.query.filter(ChangeLog.created_at < before).delete(
+        synchronize_session=False
+    )
@@ -1,10 +1,10 @@
 import csv
-import os
+import io
+import zlib
 from datetime import datetime, date, timezone
 from dateutil import parser
 
 from flask import current_app, url_for, request
-from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
 
 
 def dict_to_table(data):
@@ -47,78 +47,90 @@ def is_float(value):
         return False
 
 
-def create_csv_for_model(model):
-    model_name = model.__name__.lower()
-    instances = model.query.all()
+def csv_columns(model, names=None):
+    """
+    Table columns to export, in table order.
 
-    filename = f"data/csv/{model_name}.csv"
-    file_path = current_app.root_path + url_for("static", filename=filename)
-    instances = [instance.get_dict() for instance in instances]
-    if instances:
-        fieldnames = instances[0].keys()
+    Args:
+        model: Model class.
+        names: Optional subset of column names.
 
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "w", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in instances:
-                writer.writerow(row)
+    Raises:
+        ValueError: If a requested column does not exist on the table.
+    """
+    columns = list(model.__table__.columns)
+    if not names:
+        return columns
+
+    by_name = {c.name: c for c in columns}
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return [by_name[n] for n in names]
 
-    return url_for("static", filename=filename)
 
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def stream_csv_for_model(model, columns=None, chunk_size=1000, compress=False):
+    """
+    Yield the model's table as CSV bytes, `chunk_size` rows at a time.
+
+    Rows are read as plain column tuples with yield_per, so memory stays
+    flat no matter how large the table is. With `compress` the output is
+    a gzip stream.
+    """
+    columns = csv_columns(model, columns)
+    query = (
+        model.query.with_entities(*columns)
+        .order_by(*model.__table__.primary_key.columns)
+        .yield_per(chunk_size)
+    )
+    gzipper = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(buffer):
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return gzipper.compress(data) if gzipper else data
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([c.name for c in columns])
+
+    for n, row in enumerate(query, start=1):
+        writer.writerow([_csv_value(v) for v in row])
+        if n % chunk_size == 0:
+            yield encode(buffer)
+
+    yield encode(buffer)
+    if gzipper:
+        yield gzipper.flush()
+
+
+def upload_csv_to_model(model, fileobj=None):
+    """
+    Import a CSV into the model's table with the bulk import engine.
+
+    Reads `fileobj` when given, else the file previously placed under
+    static/data/csv/<model>.csv. Returns an ImportResult.
+    """
+    from padel_app.tools.import_tools import import_csv
+
+    if fileobj is not None:
+        return import_csv(model, fileobj)
 
-def upload_csv_to_model(model):
     model_name = model.__name__.lower()
     filename = f"data/csv/{model_name}.csv"
     file_path = current_app.root_path + url_for("static", filename=filename)
 
-    hybrid_properties = get_hybrid_properties(model)
-
-    with open(file_path, mode="r") as csvfile:
-        reader = csv.DictReader(csvfile)
-
-        for row in reader:
-            filtered_data = {
-                k: try_convert(v) for k, v in row.items() if k not in hybrid_properties
-            }
-            if filtered_data.get("name"):
-                existing_instance = model.query.filter_by(
-                    name=filtered_data.get("name")
-                ).first()
-            else:
-                existing_instance = model.query.filter_by(
-                    id=filtered_data.get("id")
-                ).first()
-
-            if existing_instance:
-                existing_instance.update_with_dict(filtered_data)
-                existing_instance.save()
-            else:
-                empty_instance = model()
-                empty_instance.update_with_dict(filtered_data)
-                empty_instance.create()
-
-    return True
-
-
-def get_hybrid_properties(model):
-    hybrid_properties = []
-    for name, attr in model.__dict__.items():
-        if isinstance(attr, (hybrid_property, hybrid_method)):
-            hybrid_properties.append(name)
-    return hybrid_properties
-
-
-def try_convert(value):
-    if value == "":
-        return None
-    converters = [int, float, str_to_bool, str_to_date, str_to_datetime]
-    for conv in converters:
-        try:
-            return conv(value)
-        except ValueError:
-            pass
-    return value
+    with open(file_path, mode="r", newline="") as csvfile:
+        return import_csv(model, csvfile)
 
 
 def str_to_bool(s):